@@ -2,7 +2,8 @@
 from django.contrib import admin
 from .models import (
     District, Taluka, Subject, School, Student, Assignment, 
-    TaskEvaluation, DDPIProfile, BEOProfile, PrincipalProfile
+    StudentEvaluation, DDPIProfile, BEOProfile, PrincipalProfile, TaskProgress,
+    ReportJob, LoadCheckpoint, DataVersion, CachedReport
 )
 
 admin.site.register(District)
@@ -11,7 +12,12 @@ admin.site.register(Subject)
 admin.site.register(School)
 admin.site.register(Student)
 admin.site.register(Assignment)
-admin.site.register(TaskEvaluation)
+admin.site.register(StudentEvaluation)
 admin.site.register(DDPIProfile)
 admin.site.register(BEOProfile)
-admin.site.register(PrincipalProfile)
\ No newline at end of file
+admin.site.register(PrincipalProfile)
+admin.site.register(TaskProgress)
+admin.site.register(ReportJob)
+admin.site.register(LoadCheckpoint)
+admin.site.register(DataVersion)
+admin.site.register(CachedReport)
@@ -0,0 +1,612 @@
+# core/data_loading.py
+import csv
+import hashlib
+import io
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import django
+import numpy as np
+import pandas as pd
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Q
+from openpyxl import load_workbook
+from .models import LoadCheckpoint, School, Student, Taluka
+from .rollup import refresh_progress
+from .stats_cache import invalidate_on_commit
+
+SCHOOL_FIELDS = ['name', 'taluka', 'type', 'school_type', 'location', 'medium']
+STUDENT_FIELDS = ['name', 'gender', 'standard']
+DEFAULT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 10000
+
+# Spreadsheet columns the loader reads; everything else in the files is skipped
+SCHOOL_COLUMNS = ['Udise Code', 'School Name', 'Block Name', 'Type', 'School Location', 'medinstr1', 'Management']
+STUDENT_COLUMNS = ['Udise code', 'SATS  No.', 'Student Name', 'Gender', 'Standard']
+
+GENDERS = {'b': 'male', 'g': 'female'}
+
+# Values a school or student row is compared on in incremental loads; the
+# district and taluka are compared by name so new ones need no ids yet
+SCHOOL_FINGERPRINT_FIELDS = [
+    'name', 'taluka__district__name', 'taluka__name', 'type', 'school_type', 'location', 'medium',
+]
+
+
+def read_excel_chunks(path, columns, chunk_size=READ_CHUNK_SIZE):
+    """DataFrames of `columns` from the first sheet of an .xlsx file, `chunk_size` rows at a time.
+
+    openpyxl's read-only mode streams the sheet, so memory depends on the
+    chunk size rather than on the length of the file. Cells keep the types
+    openpyxl reads (whole numbers stay int, empty cells are None).
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        positions = {}
+        for position, name in enumerate(next(rows, ())):
+            positions.setdefault(name, position)
+        missing = [name for name in columns if name not in positions]
+        if missing:
+            raise ValueError(f'Columns not found in {path}: {", ".join(missing)}')
+
+        indices = [positions[name] for name in columns]
+        chunk = []
+        for row in rows:
+            chunk.append([row[i] if i < len(row) else None for i in indices])
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, dtype=object)
+    finally:
+        workbook.close()
+
+
+def read_schools(path):
+    """The school list as one DataFrame of SCHOOL_COLUMNS (a district has a few thousand schools)"""
+    chunks = list(read_excel_chunks(path, SCHOOL_COLUMNS))
+    if not chunks:
+        return pd.DataFrame(columns=SCHOOL_COLUMNS, dtype=object)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _text(column):
+    return column.astype(str).str.strip()
+
+
+def _contains(lowered, word):
+    return lowered.str.contains(word, regex=False).to_numpy()
+
+
+def school_talukas(school_df):
+    """Distinct block names of the school list"""
+    return list(_text(school_df['Block Name'].dropna()).unique())
+
+
+def normalize_schools(school_df):
+    """Normalized school columns, computed column-wise.
+
+    Rows without UDISE code, name or block are dropped; type, location and
+    medium are derived from their free-text columns and kept as categories.
+    """
+    df = school_df.dropna(subset=['Udise Code', 'School Name', 'Block Name'])
+    school_type = df['Type'].astype(str).str.lower()
+    boys, girls = _contains(school_type, 'boys'), _contains(school_type, 'girls')
+    medium = df['medinstr1'].astype(str).str.lower()
+    management = df['Management']
+
+    return pd.DataFrame({
+        'udise_code': _text(df['Udise Code']),
+        'name': _text(df['School Name']),
+        'block_name': _text(df['Block Name']).astype('category'),
+        'type': pd.Categorical(np.select([boys & ~girls, girls & ~boys], ['boys', 'girls'], 'coed')),
+        'school_type': management.where(management.notna(), 'Government').astype(str).astype('category'),
+        'location': pd.Categorical(
+            np.where(_contains(df['School Location'].astype(str).str.lower(), 'urban'), 'urban', 'rural')
+        ),
+        'medium': pd.Categorical(np.select(
+            [_contains(medium, 'urdu'), _contains(medium, 'english'), _contains(medium, 'marathi')],
+            ['urdu', 'english', 'marathi'],
+            'kannada',
+        )),
+    }, index=df.index)
+
+
+def normalize_students(student_df, warn=print):
+    """Normalized student columns, computed column-wise.
+
+    Rows without UDISE code, SATS number or name are dropped, as are rows
+    whose standard isn't a number (with a warning); a missing standard is 1.
+    """
+    df = student_df.dropna(subset=['Udise code', 'SATS  No.', 'Student Name'])
+    standard = pd.to_numeric(df['Standard'], errors='coerce')
+    invalid = (standard.isna() & df['Standard'].notna()).to_numpy()
+    for sts_number, value in zip(_text(df['SATS  No.'][invalid]), df['Standard'][invalid]):
+        warn(f'Error processing student {sts_number}: invalid standard {value!r}')
+    df, standard = df[~invalid], standard[~invalid]
+
+    return pd.DataFrame({
+        'udise_code': _text(df['Udise code']).astype('category'),
+        'sts_number': _text(df['SATS  No.']),
+        'name': _text(df['Student Name']),
+        'gender': pd.Categorical(df['Gender'].astype(str).str.lower().map(GENDERS).fillna('other')),
+        'standard': standard.fillna(1).astype(int),
+    }, index=df.index)
+
+
+def school_rows(school_df):
+    """Normalized school dicts of a school list DataFrame"""
+    yield from normalize_schools(school_df).to_dict('records')
+
+
+def student_rows(path, chunk_size=READ_CHUNK_SIZE, warn=print):
+    """Normalized student dicts of a student list file, read and normalized one chunk at a time"""
+    for chunk in read_excel_chunks(path, STUDENT_COLUMNS, chunk_size):
+        yield from normalize_students(chunk, warn).to_dict('records')
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_load_schools(rows, district, batch_size=DEFAULT_BATCH_SIZE, warn=print):
+    """Create and update schools from normalized school rows with bulk queries.
+
+    Talukas and existing schools are looked up once; only new schools and
+    schools whose values differ are written. Counts follow the row-by-row
+    loader: every row of an existing (or already seen) UDISE code counts
+    as updated. Returns (created, updated).
+    """
+    talukas = {taluka.name: taluka for taluka in Taluka.objects.filter(district=district)}
+    rows = list(rows)
+    existing = School.objects.in_bulk({row['udise_code'] for row in rows}, field_name='udise_code')
+
+    new_schools = {}
+    changed_schools = {}
+    created = updated = 0
+    for row in rows:
+        taluka = talukas.get(row['block_name'])
+        if taluka is None:
+            warn(f"Taluka not found: {row['block_name']}")
+            continue
+
+        values = {field: row[field] for field in SCHOOL_FIELDS if field != 'taluka'}
+        values['taluka'] = taluka
+        udise_code = row['udise_code']
+        school = new_schools.get(udise_code) or existing.get(udise_code)
+        if school is None:
+            new_schools[udise_code] = School(udise_code=udise_code, **values)
+            created += 1
+            continue
+
+        updated += 1
+        if any(getattr(school, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(school, field, value)
+            if school.pk is not None:
+                changed_schools[udise_code] = school
+
+    School.objects.bulk_create(new_schools.values(), batch_size=batch_size)
+    School.objects.bulk_update(changed_schools.values(), SCHOOL_FIELDS, batch_size=batch_size)
+    return created, updated
+
+
+def bulk_load_students(rows, batch_size=DEFAULT_BATCH_SIZE, warn=print):
+    """Create and update students from normalized student rows, one batch of rows at a time.
+
+    Schools are mapped by UDISE code once; each batch looks up its existing
+    students with a single query and writes new and changed students with
+    bulk_create/bulk_update, so memory is bounded by the batch size.
+    Returns (created, updated) with the row-by-row loader's counting.
+    """
+    school_ids = dict(School.objects.values_list('udise_code', 'id'))
+    created = updated = 0
+
+    for batch in batches(rows, batch_size):
+        keyed = []
+        for row in batch:
+            school_id = school_ids.get(row['udise_code'])
+            if school_id is None:
+                warn(f"School not found: {row['udise_code']}")
+                continue
+            keyed.append(((row['sts_number'], school_id), {field: row[field] for field in STUDENT_FIELDS}))
+
+        existing = {
+            (student.sts_number, student.school_id): student
+            for student in Student.objects.filter(
+                sts_number__in={key[0] for key, _ in keyed},
+                school_id__in={key[1] for key, _ in keyed},
+            )
+        }
+        new_students = {}
+        changed_students = {}
+        for key, values in keyed:
+            student = new_students.get(key) or existing.get(key)
+            if student is None:
+                new_students[key] = Student(sts_number=key[0], school_id=key[1], **values)
+                created += 1
+                continue
+
+            updated += 1
+            if any(getattr(student, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(student, field, value)
+                if student.pk is not None:
+                    changed_students[key] = student
+
+        Student.objects.bulk_create(new_students.values(), batch_size=batch_size)
+        Student.objects.bulk_update(changed_students.values(), STUDENT_FIELDS, batch_size=batch_size)
+
+    return created, updated
+
+
+def _copy_batch(cursor, table, columns, rows):
+    """COPY row tuples into `table` through the psycopg 3 or psycopg2 cursor under Django's"""
+    raw = cursor.cursor
+    if hasattr(raw, 'copy'):
+        with raw.copy(f'COPY {table} ({", ".join(columns)}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+
+    buffer = io.StringIO()
+    # Quoted, so an empty string stays one instead of becoming NULL
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+    raw.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _stage(cursor, table, columns, rows, batch_size):
+    """Stream normalized rows into a new temporary table, numbering them in file order.
+
+    `columns` maps row keys to SQL types. The table is dropped at commit.
+    """
+    definitions = ', '.join(f'{column} {sql_type}' for column, sql_type in columns.items())
+    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    cursor.execute(f'CREATE TEMPORARY TABLE {table} (row_number bigint, {definitions}) ON COMMIT DROP')
+    for batch in batches(enumerate(rows), batch_size):
+        _copy_batch(cursor, table, ['row_number', *columns], [
+            (number, *(row[column] for column in columns)) for number, row in batch
+        ])
+
+
+def _upsert(cursor, table, keys, fields, select, params):
+    """INSERT ... ON CONFLICT DO UPDATE of the rows of `select`, writing only rows whose fields differ"""
+    columns = [*keys, *fields]
+    current = ', '.join(f'{table}.{field}' for field in fields)
+    excluded = ', '.join(f'EXCLUDED.{field}' for field in fields)
+    cursor.execute(
+        f'INSERT INTO {table} ({", ".join(columns)}) {select} '
+        f'ON CONFLICT ({", ".join(keys)}) DO UPDATE SET '
+        f'{", ".join(f"{field} = EXCLUDED.{field}" for field in fields)} '
+        f'WHERE ({current}) IS DISTINCT FROM ({excluded})',
+        params,
+    )
+
+
+def copy_load_schools(rows, district, batch_size=DEFAULT_BATCH_SIZE, warn=print):
+    """PostgreSQL version of bulk_load_schools(): COPY into a staging table, then one upsert.
+
+    Rows of a repeated UDISE code are merged in file order (the last one
+    wins), and counts follow bulk_load_schools(). Returns (created, updated).
+    """
+    schools, talukas = School._meta.db_table, Taluka._meta.db_table
+    staged = 'load_schools'
+    # ON COMMIT DROP needs a transaction around the staging table's lifetime
+    with transaction.atomic(), connection.cursor() as cursor:
+        _stage(cursor, staged, {
+            'udise_code': 'text', 'name': 'text', 'block_name': 'text', 'type': 'text',
+            'school_type': 'text', 'location': 'text', 'medium': 'text',
+        }, rows, batch_size)
+        joined = f'{staged} s JOIN {talukas} t ON t.name = s.block_name AND t.district_id = %s'
+
+        cursor.execute(
+            f'SELECT s.block_name FROM {staged} s '
+            f'LEFT JOIN {talukas} t ON t.name = s.block_name AND t.district_id = %s '
+            f'WHERE t.id IS NULL ORDER BY s.row_number',
+            [district.pk],
+        )
+        for block_name, in cursor.fetchall():
+            warn(f'Taluka not found: {block_name}')
+
+        cursor.execute(
+            f'SELECT count(*), count(DISTINCT s.udise_code) FILTER (WHERE c.id IS NULL) '
+            f'FROM {joined} LEFT JOIN {schools} c ON c.udise_code = s.udise_code',
+            [district.pk],
+        )
+        total, created = cursor.fetchone()
+
+        _upsert(
+            cursor, schools, ['udise_code'], ['name', 'taluka_id', 'type', 'school_type', 'location', 'medium'],
+            f'SELECT DISTINCT ON (s.udise_code) s.udise_code, s.name, t.id, s.type, s.school_type, s.location, '
+            f's.medium FROM {joined} ORDER BY s.udise_code, s.row_number DESC',
+            [district.pk],
+        )
+    return created, total - created
+
+
+def copy_load_students(rows, batch_size=DEFAULT_BATCH_SIZE, warn=print):
+    """PostgreSQL version of bulk_load_students(): COPY into a staging table, then one upsert.
+
+    Rows of a repeated (SATS number, school) are merged in file order (the
+    last one wins), and counts follow bulk_load_students(). Returns
+    (created, updated).
+    """
+    schools, students = School._meta.db_table, Student._meta.db_table
+    staged = 'load_students'
+    with transaction.atomic(), connection.cursor() as cursor:
+        _stage(cursor, staged, {
+            'udise_code': 'text', 'sts_number': 'text', 'name': 'text', 'gender': 'text', 'standard': 'integer',
+        }, rows, batch_size)
+        joined = f'{staged} s JOIN {schools} c ON c.udise_code = s.udise_code'
+
+        cursor.execute(
+            f'SELECT s.udise_code FROM {staged} s LEFT JOIN {schools} c ON c.udise_code = s.udise_code '
+            f'WHERE c.id IS NULL ORDER BY s.row_number'
+        )
+        for udise_code, in cursor.fetchall():
+            warn(f'School not found: {udise_code}')
+
+        cursor.execute(
+            f'SELECT count(*), count(DISTINCT (s.sts_number, c.id)) FILTER (WHERE st.id IS NULL) '
+            f'FROM {joined} LEFT JOIN {students} st ON st.sts_number = s.sts_number AND st.school_id = c.id'
+        )
+        total, created = cursor.fetchone()
+
+        _upsert(
+            cursor, students, ['sts_number', 'school_id'], STUDENT_FIELDS,
+            f'SELECT DISTINCT ON (s.sts_number, c.id) s.sts_number, c.id, s.name, s.gender, s.standard '
+            f'FROM {joined} ORDER BY s.sts_number, c.id, s.row_number DESC',
+            [],
+        )
+    return created, total - created
+
+
+def fingerprint(values):
+    """Compact digest of a row's normalized field values"""
+    return hashlib.blake2b(repr(tuple(values)).encode(), digest_size=16).digest()
+
+
+def sync_schools(rows, district_name, batch_size=DEFAULT_BATCH_SIZE, delete=False, dry_run=False, warn=print):
+    """Write only the differences between normalized school rows and the database.
+
+    Schools are compared by fingerprint, so unchanged schools are neither
+    built as models nor written; the last row of a repeated UDISE code
+    wins. With `delete`, schools of the district missing from the rows are
+    deleted along with their students and evaluations. With `dry_run`
+    nothing is written. Returns a Counter of created, updated, unchanged
+    and deleted schools.
+    """
+    rows = {row['udise_code']: row for row in rows}
+    current = {}
+    district_schools = set()
+    for udise_code, pk, district, *values in School.objects.filter(
+        Q(udise_code__in=list(rows)) | Q(taluka__district__name=district_name)
+    ).values_list('udise_code', 'pk', 'taluka__district__name', *SCHOOL_FINGERPRINT_FIELDS):
+        current[udise_code] = (pk, fingerprint(values))
+        if district == district_name:
+            district_schools.add(udise_code)
+    talukas = {taluka.name: taluka for taluka in Taluka.objects.filter(district__name=district_name)}
+
+    counts = Counter()
+    new_schools, changed_schools = [], []
+    for udise_code, row in rows.items():
+        pk, digest = current.get(udise_code, (None, None))
+        values = [row['name'], district_name, row['block_name'], row['type'], row['school_type'],
+                  row['location'], row['medium']]
+        if digest == fingerprint(values):
+            counts['unchanged'] += 1
+            continue
+        if dry_run:
+            counts['updated' if pk else 'created'] += 1
+            continue
+
+        taluka = talukas.get(row['block_name'])
+        if taluka is None:
+            warn(f"Taluka not found: {row['block_name']}")
+            continue
+        counts['updated' if pk else 'created'] += 1
+        school = School(pk=pk, udise_code=udise_code, taluka=taluka,
+                        **{field: row[field] for field in SCHOOL_FIELDS if field != 'taluka'})
+        (changed_schools if pk else new_schools).append(school)
+
+    stale = [current[udise_code][0] for udise_code in district_schools - set(rows)] if delete else []
+    counts['deleted'] = len(stale)
+    if not dry_run:
+        # Capture the talukas and districts that moved and deleted schools leave
+        changed = [school.pk for school in changed_schools] + stale
+        taluka_ids = {school.taluka_id for school in new_schools}
+        district_ids = {taluka.district_id for taluka in talukas.values()} if new_schools else set()
+        for pks in batches(changed, batch_size):
+            for taluka_id, district_id in School.objects.filter(pk__in=pks).values_list(
+                'taluka_id', 'taluka__district_id'
+            ).distinct():
+                taluka_ids.add(taluka_id)
+                district_ids.add(district_id)
+
+        School.objects.bulk_create(new_schools, batch_size=batch_size)
+        School.objects.bulk_update(changed_schools, SCHOOL_FIELDS, batch_size=batch_size)
+        for pks in batches(stale, batch_size):
+            School.objects.filter(pk__in=pks).delete()
+        if changed or taluka_ids:
+            invalidate_on_commit(school_ids=changed, taluka_ids=taluka_ids, district_ids=district_ids)
+    return counts
+
+
+def sync_students(rows, district_name, batch_size=DEFAULT_BATCH_SIZE, delete=False, dry_run=False,
+                  new_schools=(), warn=print):
+    """Write only the differences between normalized student rows and the database.
+
+    Rows are compared by fingerprint one batch at a time, so memory is
+    bounded by the batch size plus the ids of the students seen. Schools
+    whose students changed get their TaskProgress rollup refreshed and
+    their cached statistics evicted. With `delete`, students of the
+    district missing from the rows are deleted. With `dry_run` nothing is
+    written; `new_schools` are the UDISE codes a dry run of sync_schools()
+    would have created, whose students all count as created. Returns a
+    Counter of created, updated, unchanged and deleted students.
+    """
+    school_ids = dict(School.objects.values_list('udise_code', 'id'))
+    new_schools = set(new_schools)
+    counts = Counter()
+    seen = set()
+    planned = {}  # dry run: (pk, fingerprint) the run would have written, by key
+    touched_schools = set()
+
+    for batch in batches(rows, batch_size):
+        incoming = []
+        for row in batch:
+            if row['udise_code'] not in school_ids and row['udise_code'] not in new_schools:
+                warn(f"School not found: {row['udise_code']}")
+                continue
+            incoming.append(((row['sts_number'], row['udise_code']), [row[field] for field in STUDENT_FIELDS]))
+
+        state = {
+            (sts_number, udise_code): (pk, fingerprint(values))
+            for pk, sts_number, udise_code, *values in Student.objects.filter(
+                sts_number__in={key[0] for key, _ in incoming},
+                school__udise_code__in={key[1] for key, _ in incoming},
+            ).values_list('pk', 'sts_number', 'school__udise_code', *STUDENT_FIELDS)
+        }
+        state.update((key, planned[key]) for key, _ in incoming if key in planned)
+
+        new_students, changed_students = {}, {}
+        for key, values in incoming:
+            digest = fingerprint(values)
+            pk, current = state.get(key, (None, None))
+            if pk is not None:
+                seen.add(pk)
+            if current == digest:
+                counts['unchanged'] += 1
+                continue
+
+            state[key] = (pk, digest)
+            counts['updated' if current else 'created'] += 1
+            if dry_run:
+                planned[key] = (pk, digest)
+                continue
+            student = Student(pk=pk, sts_number=key[0], school_id=school_ids[key[1]],
+                              **dict(zip(STUDENT_FIELDS, values)))
+            (changed_students if pk else new_students)[key] = student
+            touched_schools.add(student.school_id)
+
+        if not dry_run:
+            Student.objects.bulk_create(new_students.values(), batch_size=batch_size)
+            Student.objects.bulk_update(changed_students.values(), STUDENT_FIELDS, batch_size=batch_size)
+            seen.update(student.pk for student in new_students.values())
+
+    if delete:
+        stale = [
+            pk for pk in Student.objects.filter(school__taluka__district__name=district_name)
+            .values_list('pk', flat=True).iterator()
+            if pk not in seen
+        ]
+        counts['deleted'] = len(stale)
+        if not dry_run:
+            for pks in batches(stale, batch_size):
+                touched_schools.update(Student.objects.filter(pk__in=pks).values_list('school_id', flat=True))
+                Student.objects.filter(pk__in=pks).delete()
+
+    # Bulk writes bypass the signals that keep the rollup and caches current
+    for school_ids in batches(sorted(touched_schools), batch_size):
+        refresh_progress(schools=school_ids)
+    if touched_schools:
+        invalidate_on_commit(school_ids=touched_schools)
+    return counts
+
+
+def hash_passwords(passwords, workers=1):
+    """make_password() of each password, spread over a process pool when there are enough of them"""
+    passwords = list(passwords)
+    if workers <= 1 or len(passwords) <= workers:
+        return [make_password(password) for password in passwords]
+
+    # django.setup as initializer, like the report workers: it imports without the app registry
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def provision_accounts(accounts, group, profile_model, field, workers=1, batch_size=DEFAULT_BATCH_SIZE):
+    """Create missing users in bulk and attach their group and profile.
+
+    `accounts` are (username, password, user defaults, profile target)
+    tuples; a repeated username keeps its last target. Only new users get a
+    password, hashed up front in `workers` processes; existing users keep
+    theirs. Every user gets `group`, and a `profile_model` row whose
+    `field` points at the target. Returns the number of users created.
+    """
+    accounts = {username: (password, defaults, target) for username, password, defaults, target in accounts}
+    existing = set(User.objects.filter(username__in=list(accounts)).values_list('username', flat=True))
+    new = [username for username in accounts if username not in existing]
+    hashes = hash_passwords([accounts[username][0] for username in new], workers)
+    User.objects.bulk_create([
+        User(username=username, password=password_hash, **accounts[username][1])
+        for username, password_hash in zip(new, hashes)
+    ], batch_size=batch_size)
+
+    user_ids = dict(User.objects.filter(username__in=list(accounts)).values_list('username', 'id'))
+    Membership = User.groups.through
+    Membership.objects.bulk_create(
+        [Membership(user_id=user_id, group_id=group.pk) for user_id in user_ids.values()],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+
+    profiles = {profile.user_id: profile for profile in profile_model.objects.filter(user_id__in=user_ids.values())}
+    new_profiles, changed_profiles = [], []
+    for username, user_id in user_ids.items():
+        target = accounts[username][2]
+        profile = profiles.get(user_id)
+        if profile is None:
+            new_profiles.append(profile_model(user_id=user_id, **{field: target}))
+        elif getattr(profile, f'{field}_id') != target.pk:
+            setattr(profile, field, target)
+            changed_profiles.append(profile)
+    profile_model.objects.bulk_create(new_profiles, batch_size=batch_size)
+    profile_model.objects.bulk_update(changed_profiles, [field], batch_size=batch_size)
+    return len(new)
+
+
+def file_checksum(path):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def start_checkpoint(district_name, phase, path, resume=False, warn=print):
+    """LoadCheckpoint to record a chunked load phase in.
+
+    With `resume`, the checkpoint of an earlier run over the same file (by
+    checksum) is returned as is, so the load can skip its committed rows;
+    otherwise, or when the file changed, the checkpoint starts over.
+    """
+    checksum = file_checksum(path)
+    checkpoint, created = LoadCheckpoint.objects.get_or_create(
+        district=district_name, phase=phase, defaults={'file_path': path, 'checksum': checksum},
+    )
+    if created:
+        return checkpoint
+    if resume and checkpoint.checksum == checksum:
+        return checkpoint
+    if resume:
+        warn(f'{path} changed since the last {phase} checkpoint, loading it from the start')
+
+    checkpoint.file_path = path
+    checkpoint.checksum = checksum
+    checkpoint.rows_done = 0
+    checkpoint.completed = False
+    checkpoint.save()
+    return checkpoint
@@ -0,0 +1,131 @@
+# core/evaluations.py
+from django.db import transaction
+from django.utils import timezone
+from .models import Student, StudentEvaluation
+from .rollup import refresh_progress
+from .stats_cache import invalidate_on_commit
+
+STATUS_CODES = StudentEvaluation.STATUS_CODES
+STATUSES_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
+WRITE_BATCH_SIZE = 500
+
+
+def decode_statuses(statuses, task_count):
+    """Expand a StudentEvaluation.statuses string into 'solved'/'unsolved'/None per task"""
+    statuses = statuses or ''
+    return [STATUSES_BY_CODE.get(statuses[i]) if i < len(statuses) else None for i in range(task_count)]
+
+
+def encode_statuses(statuses):
+    """Inverse of decode_statuses()"""
+    return ''.join(STATUS_CODES.get(status, StudentEvaluation.NOT_EVALUATED) for status in statuses)
+
+
+def evaluation_statuses(assignment, students):
+    """Map student id -> StudentEvaluation.statuses for `students` (a queryset) in one query"""
+    return dict(
+        StudentEvaluation.objects.filter(
+            assignment=assignment,
+            student__in=students,
+        ).values_list('student_id', 'statuses')
+    )
+
+
+def evaluation_grid(assignment, students):
+    """Pre-shaped evaluation rows for the grading grid.
+
+    Loads the StudentEvaluation of every student in `students` (a queryset)
+    for the assignment in one query and returns a list of
+    {'student': student, 'cells': [{'index', 'task', 'status'}, ...]}.
+    Cells without an evaluation default to 'unsolved'.
+    """
+    task_count = len(assignment.tasks)
+    statuses = evaluation_statuses(assignment, students)
+
+    rows = []
+    for student in students:
+        student_statuses = decode_statuses(statuses.get(student.id), task_count)
+        rows.append({
+            'student': student,
+            'cells': [
+                {'index': i, 'task': task, 'status': student_statuses[i] or 'unsolved'}
+                for i, task in enumerate(assignment.tasks)
+            ],
+        })
+    return rows
+
+
+def save_evaluations(assignment, school, cells, user):
+    """Upsert the given cells of the school's grading grid for an assignment.
+
+    `cells` maps (student_id, task_index) to 'solved' or 'unsolved'; it may
+    be the whole grid or just a few edited cells. The touched students'
+    StudentEvaluation rows are loaded once and only rows whose statuses
+    actually changed are written, in batches. The TaskProgress rollup is
+    refreshed in the same transaction. Returns the number of changed cells.
+    """
+    students = Student.objects.filter(school=school, standard=assignment.standard)
+    task_count = len(assignment.tasks)
+
+    with transaction.atomic():
+        # Only the students touched by this batch, so a single-cell save stays small
+        student_ids = set(students.filter(
+            id__in={student_id for student_id, _ in cells}
+        ).values_list('id', flat=True))
+        existing = {
+            student_id: (pk, codes)
+            for pk, student_id, codes in StudentEvaluation.objects.filter(
+                assignment=assignment,
+                student_id__in=student_ids,
+            ).values_list('id', 'student_id', 'statuses')
+        }
+
+        updated = {}
+        for (student_id, task_index), status in cells.items():
+            if student_id not in student_ids or not 0 <= task_index < task_count:
+                raise ValueError(f'Cell ({student_id}, {task_index}) is not part of this grid')
+            if status not in STATUS_CODES:
+                raise ValueError(f'Invalid status: {status}')
+
+            if student_id not in updated:
+                _, codes = existing.get(student_id, (None, ''))
+                updated[student_id] = list(codes.ljust(task_count, StudentEvaluation.NOT_EVALUATED))
+            updated[student_id][task_index] = STATUS_CODES[status]
+
+        now = timezone.now()
+        changed = 0
+        to_create = []
+        to_update = []
+        for student_id, codes in updated.items():
+            pk, old_codes = existing.get(student_id, (None, ''))
+            old_codes = old_codes.ljust(task_count, StudentEvaluation.NOT_EVALUATED)
+            changed_cells = sum(1 for old, new in zip(old_codes, codes) if old != new)
+            if not changed_cells:
+                continue
+            changed += changed_cells
+
+            evaluation = StudentEvaluation(
+                pk=pk, student_id=student_id, assignment=assignment,
+                statuses=''.join(codes), evaluated_by=user, evaluated_at=now,
+            )
+            (to_create if pk is None else to_update).append(evaluation)
+
+        if to_create:
+            # update_conflicts covers a row inserted concurrently since we read
+            StudentEvaluation.objects.bulk_create(
+                to_create,
+                batch_size=WRITE_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['student', 'assignment'],
+                update_fields=['statuses', 'evaluated_by', 'evaluated_at'],
+            )
+        if to_update:
+            StudentEvaluation.objects.bulk_update(
+                to_update, ['statuses', 'evaluated_by', 'evaluated_at'], batch_size=WRITE_BATCH_SIZE
+            )
+
+        if changed:
+            refresh_progress(school=school, assignment=assignment)
+            # Bulk writes bypass the post_save signals that evict cached statistics
+            invalidate_on_commit(school_ids=[school.pk])
+    return changed
@@ -2,10 +2,49 @@
 from django import forms
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.forms import UserCreationForm
+from django.urls import reverse
 from .models import (
     District, Taluka, Subject, School, Student, Assignment, 
-    DDPIProfile, BEOProfile, PrincipalProfile, TaskEvaluation
+    DDPIProfile, BEOProfile, PrincipalProfile
 )
+from .reports import SUMMARY_OPTIONS, available_formats
+
+class SearchSelect(forms.Select):
+    """Select for a ModelChoiceField with too many choices to embed in the page.
+
+    Only the empty and the selected option are rendered; the browser looks
+    up the rest from the role-scoped choice_search endpoint, narrowed by the
+    current values of the form fields named in `filters`.
+    """
+    def __init__(self, search, filters=(), attrs=None):
+        super().__init__(attrs)
+        self.search = search
+        self.filters = filters
+    
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-search-url'] = reverse('choice_search', args=[self.search])
+        if self.filters:
+            context['widget']['attrs']['data-search-filters'] = ' '.join(self.filters)
+        return context
+    
+    def optgroups(self, name, value, attrs=None):
+        all_choices = self.choices
+        self.choices = self.selected_choices(value)
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = all_choices
+    
+    def selected_choices(self, value):
+        # self.choices is the field's ModelChoiceIterator
+        field = self.choices.field
+        choices = [('', field.empty_label)] if field.empty_label is not None else []
+        selected = [pk for pk in value if str(pk).isdigit()]
+        if selected:
+            choices += [self.choices.choice(obj) for obj in self.choices.queryset.filter(pk__in=selected)]
+        return choices
+
 
 class TalukaForm(forms.ModelForm):
     class Meta:
@@ -61,7 +100,7 @@ class SchoolForm(forms.ModelForm):
             self.fields['taluka'].queryset = Taluka.objects.filter(id=taluka.id)
 
 class PrincipalCreationForm(UserCreationForm):
-    school = forms.ModelChoiceField(queryset=School.objects.all(), required=True)
+    school = forms.ModelChoiceField(queryset=School.objects.all(), required=True, widget=SearchSelect('schools'))
     
     class Meta:
         model = User
@@ -109,32 +148,6 @@ class AssignmentForm(forms.ModelForm):
         tasks_list = [task.strip() for task in tasks_text.split('\n') if task.strip()]
         return tasks_list
 
-class TaskEvaluationForm(forms.Form):
-    def __init__(self, *args, **kwargs):
-        assignment = kwargs.pop('assignment')
-        students = kwargs.pop('students')
-        super().__init__(*args, **kwargs)
-        
-        for student in students:
-            for i, task in enumerate(assignment.tasks):
-                field_name = f'student_{student.id}_task_{i}'
-                try:
-                    evaluation = TaskEvaluation.objects.get(
-                        student=student, 
-                        assignment=assignment, 
-                        task_index=i
-                    )
-                    initial_value = evaluation.status
-                except TaskEvaluation.DoesNotExist:
-                    initial_value = 'unsolved'
-                
-                self.fields[field_name] = forms.ChoiceField(
-                    choices=[('solved', 'SOLVED'), ('unsolved', 'UNSOLVED')],
-                    widget=forms.RadioSelect(attrs={'class': 'mr-2'}),
-                    initial=initial_value,
-                    required=False
-                )
-
 class PrincipalUpdateForm(forms.ModelForm):
     new_password = forms.CharField(
         max_length=128,
@@ -150,7 +163,7 @@ class PrincipalUpdateForm(forms.ModelForm):
         model = PrincipalProfile
         fields = ['school']
         widgets = {
-            'school': forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}),
+            'school': SearchSelect('schools', attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}),
         }
     
     def __init__(self, *args, **kwargs):
@@ -208,26 +221,32 @@ class ReportFilterForm(forms.Form):
     
     standard = forms.ChoiceField(choices=CLASS_CHOICES, required=False, widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
     taluka = forms.ModelChoiceField(queryset=Taluka.objects.all(), required=False, empty_label="All Talukas", widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
-    school = forms.ModelChoiceField(queryset=School.objects.all(), required=False, empty_label="All Schools", widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
+    school = forms.ModelChoiceField(queryset=School.objects.all(), required=False, empty_label="All Schools", widget=SearchSelect('schools', filters=['taluka'], attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
     subject = forms.ModelChoiceField(queryset=Subject.objects.all(), required=False, empty_label="All Subjects", widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
-    assignment = forms.ModelChoiceField(queryset=Assignment.objects.all(), required=False, empty_label="All Assignments", widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
+    assignment = forms.ModelChoiceField(queryset=Assignment.objects.select_related('subject'), required=False, empty_label="All Assignments", widget=SearchSelect('assignments', filters=['standard', 'subject'], attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
     start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md', 'type': 'date'}))
     end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md', 'type': 'date'}))
+    format = forms.ChoiceField(choices=[], required=False, widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
+    summary = forms.ChoiceField(choices=[('', 'Student sheets only')] + list(SUMMARY_OPTIONS.items()), required=False, widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md'}))
+    
+    FORMAT_LABELS = {
+        'xlsx': 'Excel (.xlsx)',
+        'csv': 'CSV (.csv, one row per task)',
+        'parquet': 'Parquet (.parquet, one row per task)',
+    }
     
     def __init__(self, *args, **kwargs):
-        user = kwargs.pop('user', None)
+        role = kwargs.pop('role', None)
         super().__init__(*args, **kwargs)
+        self.fields['format'].choices = [(name, self.FORMAT_LABELS[name]) for name in available_formats()]
         
-        if user:
-            if user.groups.filter(name='Principal').exists():
-                principal_profile = PrincipalProfile.objects.get(user=user)
-                self.fields['school'].queryset = School.objects.filter(id=principal_profile.school.id)
-                self.fields['taluka'].queryset = Taluka.objects.filter(id=principal_profile.school.taluka.id)
-            elif user.groups.filter(name='BEO').exists():
-                beo_profile = BEOProfile.objects.get(user=user)
-                self.fields['school'].queryset = School.objects.filter(taluka=beo_profile.taluka)
-                self.fields['taluka'].queryset = Taluka.objects.filter(id=beo_profile.taluka.id)
-            elif user.groups.filter(name='DDPI').exists():
-                ddpi_profile = DDPIProfile.objects.get(user=user)
-                self.fields['taluka'].queryset = Taluka.objects.filter(district=ddpi_profile.district)
-                self.fields['school'].queryset = School.objects.filter(taluka__district=ddpi_profile.district)
\ No newline at end of file
+        if role:
+            if role.is_principal:
+                self.fields['school'].queryset = School.objects.filter(id=role.school_id)
+                self.fields['taluka'].queryset = Taluka.objects.filter(id=role.taluka_id)
+            elif role.is_beo:
+                self.fields['school'].queryset = School.objects.filter(taluka=role.taluka)
+                self.fields['taluka'].queryset = Taluka.objects.filter(id=role.taluka_id)
+            elif role.is_ddpi:
+                self.fields['taluka'].queryset = Taluka.objects.filter(district=role.district)
+                self.fields['school'].queryset = School.objects.filter(taluka__district=role.district)
\ No newline at end of file
@@ -0,0 +1,145 @@
+import random
+import time
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from core.models import (
+    District, Taluka, School, Student, Subject, Assignment, TaskEvaluation, StudentEvaluation
+)
+from core.task_statistics import status_count
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the storage added by and the aggregate query time of per-task TaskEvaluation rows '
+        'and per-student StudentEvaluation rows on synthetic data (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000, help='Number of synthetic students')
+        parser.add_argument('--assignments', type=int, default=10, help='Number of assignments')
+        parser.add_argument('--tasks', type=int, default=10, help='Tasks per assignment')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing runs per query (best is reported)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Tables may hold real evaluations, so only the growth from the synthetic rows is compared
+            sizes = {model: self.table_size(model) for model in (TaskEvaluation, StudentEvaluation)}
+            taluka = self.populate(options['students'], options['assignments'], options['tasks'])
+            sizes = {model: self.size_added(model, before) for model, before in sizes.items()}
+
+            legacy = TaskEvaluation.objects.filter(student__school__taluka=taluka)
+            compact = StudentEvaluation.objects.filter(student__school__taluka=taluka)
+            legacy_query = lambda: list(legacy.values('student__school_id', 'assignment_id').annotate(
+                solved=Count('id', filter=Q(status='solved')),
+                unsolved=Count('id', filter=Q(status='unsolved')),
+            ).order_by())
+            compact_query = lambda: list(compact.values('student__school_id', 'assignment_id').annotate(
+                solved=Sum(status_count(StudentEvaluation.SOLVED)),
+                unsolved=Sum(status_count(StudentEvaluation.UNSOLVED)),
+            ).order_by())
+
+            results = [
+                ('TaskEvaluation', legacy.count(), sizes[TaskEvaluation],
+                 self.best_time(legacy_query, options['repeat'])),
+                ('StudentEvaluation', compact.count(), sizes[StudentEvaluation],
+                 self.best_time(compact_query, options['repeat'])),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'Storage':<20}{'Rows':>12}{'Added (KiB)':>14}{'Aggregate (ms)':>18}")
+        for name, rows, size, seconds in results:
+            size_text = f'{size / 1024:,.0f}' if size is not None else 'n/a'
+            self.stdout.write(f'{name:<20}{rows:>12,}{size_text:>14}{seconds * 1000:>18.1f}')
+
+        (_, _, legacy_size, legacy_time), (_, _, compact_size, compact_time) = results
+        if legacy_size and compact_size:
+            self.stdout.write(f'Size ratio:      {legacy_size / compact_size:.1f}x smaller')
+        self.stdout.write(f'Aggregate ratio: {legacy_time / compact_time:.1f}x faster')
+        self.stdout.write(self.style.SUCCESS('Synthetic data rolled back'))
+
+    def populate(self, student_count, assignment_count, task_count):
+        """Same evaluations written in both storage formats"""
+        rng = random.Random(42)
+        district = District.objects.create(name='BENCHMARK DISTRICT')
+        taluka = Taluka.objects.create(name='BENCHMARK TALUKA', district=district)
+        user = User.objects.create(username='benchmark-evaluator')
+        subject = Subject.objects.create(name='Benchmark Subject')
+
+        schools = School.objects.bulk_create([
+            School(udise_code=f'BENCH{i:06d}', name=f'Benchmark School {i}', taluka=taluka,
+                   type='coed', school_type='Government', location='rural', medium='kannada')
+            for i in range(max(student_count // 50, 1))
+        ])
+        students = Student.objects.bulk_create([
+            Student(name=f'Student {i}', sts_number=f'BENCH{i:09d}', gender='female', standard=5,
+                    school=schools[i % len(schools)])
+            for i in range(student_count)
+        ], batch_size=BATCH_SIZE)
+        assignments = Assignment.objects.bulk_create([
+            Assignment(title=f'Benchmark {i}', tasks=[f'Task {t}' for t in range(task_count)],
+                       subject=subject, standard=5, start_date=date(2025, 6, 1),
+                       end_date=date(2025, 6, 30), created_by=user)
+            for i in range(assignment_count)
+        ])
+
+        # 70% solved, 20% unsolved, 10% not evaluated
+        legacy_rows = []
+        compact_rows = []
+        for student in students:
+            for assignment in assignments:
+                statuses = rng.choices(['solved', 'unsolved', None], weights=[7, 2, 1], k=task_count)
+                legacy_rows.extend(
+                    TaskEvaluation(student=student, assignment=assignment, task_index=i,
+                                   status=status, evaluated_by=user)
+                    for i, status in enumerate(statuses) if status
+                )
+                compact_rows.append(StudentEvaluation(
+                    student=student, assignment=assignment, evaluated_by=user,
+                    statuses=''.join(StudentEvaluation.STATUS_CODES.get(status, StudentEvaluation.NOT_EVALUATED)
+                                     for status in statuses),
+                ))
+            if len(legacy_rows) >= BATCH_SIZE:
+                TaskEvaluation.objects.bulk_create(legacy_rows, batch_size=BATCH_SIZE)
+                legacy_rows = []
+        TaskEvaluation.objects.bulk_create(legacy_rows, batch_size=BATCH_SIZE)
+        StudentEvaluation.objects.bulk_create(compact_rows, batch_size=BATCH_SIZE)
+        return taluka
+
+    def table_size(self, model):
+        """On-disk bytes of a model's table and indexes, None when the backend can't tell"""
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+                return cursor.fetchone()[0]
+            if connection.vendor == 'sqlite':
+                try:
+                    cursor.execute(
+                        'SELECT SUM(pgsize) FROM dbstat WHERE name IN '
+                        '(SELECT name FROM sqlite_master WHERE tbl_name = %s)',
+                        [table],
+                    )
+                except Exception:
+                    return None  # SQLite built without the dbstat table
+                return cursor.fetchone()[0]
+        return None
+
+    def size_added(self, model, before):
+        """Bytes a model's table and indexes grew by since `before`, None when unknown"""
+        after = self.table_size(model)
+        if before is None or after is None:
+            return None
+        return after - before
+
+    def best_time(self, query, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
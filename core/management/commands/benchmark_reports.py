@@ -0,0 +1,214 @@
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import date
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core.middleware import resolve_role
+from core.models import (
+    Assignment, BEOProfile, DDPIProfile, District, PrincipalProfile, School, Student, StudentEvaluation,
+    Subject, Taluka,
+)
+from core.reports import REPORT_FORMATS, SUMMARY_OPTIONS
+from core.rollup import refresh_progress
+from core.views import GenerateReportView
+
+BATCH_SIZE = 5000
+ROLES = ('principal', 'beo', 'ddpi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Time GenerateReportView downloads for principal, BEO and DDPI scopes on a synthetic '
+        'district and write wall time, peak memory, query count and output size to a JSON file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--talukas', type=int, default=3, help='Talukas in the synthetic district')
+        parser.add_argument('--schools', type=int, default=10, help='Schools per taluka')
+        parser.add_argument('--classes', type=int, default=5, help='Classes per school (Class 1 upwards)')
+        parser.add_argument('--students', type=int, default=20, help='Students per class and school')
+        parser.add_argument('--assignments', type=int, default=2, help='Assignments per class')
+        parser.add_argument('--tasks', type=int, default=10, help='Tasks per assignment')
+        parser.add_argument('--formats', default='xlsx,csv', help=f'Comma separated, of: {", ".join(REPORT_FORMATS)}')
+        parser.add_argument('--summary', choices=list(SUMMARY_OPTIONS), default='', help='Excel summary sheet option')
+        parser.add_argument('--repeat', type=int, default=3, help='Timing runs per export (best is reported)')
+        parser.add_argument('--output', default='report_benchmark.json', help='JSON file the results are written to')
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Commit the synthetic district instead of rolling it back (REPORT_WORKERS > 1 needs committed data)',
+        )
+
+    def handle(self, *args, **options):
+        formats = [name.strip() for name in options['formats'].split(',') if name.strip()]
+        unknown = set(formats) - set(REPORT_FORMATS)
+        if unknown:
+            raise CommandError(f'Unknown report format(s): {", ".join(sorted(unknown))}')
+        if not 1 <= options['classes'] <= 10:
+            raise CommandError('--classes must be between 1 and 10')
+
+        if options['keep']:
+            users, student_count = self.populate(options)
+            results = self.run_benchmarks(users, formats, options)
+        else:
+            with transaction.atomic():
+                users, student_count = self.populate(options)
+                results = self.run_benchmarks(users, formats, options)
+                transaction.set_rollback(True)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'commit': self.git_commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'scale': {
+                key: options[key] for key in ('talukas', 'schools', 'classes', 'students', 'assignments', 'tasks')
+            },
+            'students': student_count,
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.stdout.write(f"{'Role':<10}{'Format':<9}{'Wall (ms)':>12}{'Peak (KiB)':>13}{'Queries':>9}{'Size (KiB)':>13}")
+        for row in results:
+            self.stdout.write(
+                f"{row['role']:<10}{row['format']:<9}{row['wall_seconds'] * 1000:>12.1f}"
+                f"{row['peak_memory_bytes'] / 1024:>13,.0f}{row['queries']:>9}{row['output_bytes'] / 1024:>13,.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        if not options['keep']:
+            self.stdout.write(self.style.SUCCESS('Synthetic data rolled back'))
+
+    def populate(self, options):
+        """Synthetic district with one user per role; returns ({role: user}, student count)"""
+        rng = random.Random(42)
+        tag = timezone.now().strftime('%y%m%d%H%M%S')
+        district = District.objects.create(name=f'BENCHMARK DISTRICT {tag}')
+        creator = User.objects.create(username=f'benchmark-{tag}-creator')
+        subjects = [
+            Subject.objects.get_or_create(name=name)[0] for name in ('Benchmark Kannada', 'Benchmark Maths')
+        ]
+
+        schools = []
+        for t in range(options['talukas']):
+            taluka = Taluka.objects.create(name=f'BENCHMARK TALUKA {t}', district=district)
+            schools += School.objects.bulk_create([
+                School(udise_code=f'B{tag}{len(schools) + s:05d}', name=f'Benchmark School {t}-{s}', taluka=taluka,
+                       type='coed', school_type='Government', location='rural', medium='kannada')
+                for s in range(options['schools'])
+            ])
+
+        standards = range(1, options['classes'] + 1)
+        students = Student.objects.bulk_create([
+            Student(name=f'Student {school.pk}-{standard}-{i}', sts_number=f'{school.udise_code}{standard:02d}{i:04d}',
+                    gender=rng.choice(['male', 'female']), standard=standard, school=school)
+            for school in schools for standard in standards for i in range(options['students'])
+        ], batch_size=BATCH_SIZE)
+        assignments = Assignment.objects.bulk_create([
+            Assignment(title=f'Benchmark {standard}-{i}', tasks=[f'Task {t}' for t in range(options['tasks'])],
+                       subject=subjects[i % len(subjects)], standard=standard, start_date=date(2025, 6, 1),
+                       end_date=date(2025, 6, 30), created_by=creator)
+            for standard in standards for i in range(options['assignments'])
+        ])
+
+        # 70% solved, 20% unsolved, 10% not evaluated
+        codes = [StudentEvaluation.SOLVED, StudentEvaluation.UNSOLVED, StudentEvaluation.NOT_EVALUATED]
+        assignments_by_standard = {standard: [a for a in assignments if a.standard == standard] for standard in standards}
+        evaluations = []
+        for student in students:
+            for assignment in assignments_by_standard[student.standard]:
+                evaluations.append(StudentEvaluation(
+                    student=student, assignment=assignment, evaluated_by=creator,
+                    statuses=''.join(rng.choices(codes, weights=[7, 2, 1], k=options['tasks'])),
+                ))
+            if len(evaluations) >= BATCH_SIZE:
+                StudentEvaluation.objects.bulk_create(evaluations, batch_size=BATCH_SIZE)
+                evaluations = []
+        StudentEvaluation.objects.bulk_create(evaluations, batch_size=BATCH_SIZE)
+        for assignment in assignments:
+            refresh_progress(assignment=assignment)
+
+        users = {}
+        for role, group_name in zip(ROLES, ('Principal', 'BEO', 'DDPI')):
+            users[role] = User.objects.create(username=f'benchmark-{tag}-{role}')
+            users[role].groups.add(Group.objects.get_or_create(name=group_name)[0])
+        PrincipalProfile.objects.create(user=users['principal'], school=schools[0])
+        BEOProfile.objects.create(user=users['beo'], taluka=schools[0].taluka)
+        DDPIProfile.objects.create(user=users['ddpi'], district=district)
+        return users, len(students)
+
+    def run_benchmarks(self, users, formats, options):
+        results = []
+        # Like the test client: finishing a response must not close the connection
+        # (and with it the transaction holding the synthetic district)
+        request_finished.disconnect(close_old_connections)
+        try:
+            self.time_downloads(users, formats, options, results)
+        finally:
+            request_finished.connect(close_old_connections)
+        return results
+
+    def time_downloads(self, users, formats, options, results):
+        # Every run generates its report; none is served from the report cache
+        with override_settings(REPORT_CACHE_MAX_ENTRY_BYTES=0):
+            for role in ROLES:
+                for report_format in formats:
+                    timings = []
+                    for _ in range(max(options['repeat'], 1)):
+                        started = time.perf_counter()
+                        with CaptureQueriesContext(connection) as queries:
+                            size = self.download(users[role], report_format, options['summary'])
+                        timings.append(time.perf_counter() - started)
+
+                    # Separate run, tracemalloc slows allocation-heavy code down
+                    tracemalloc.start()
+                    try:
+                        self.download(users[role], report_format, options['summary'])
+                        _, peak = tracemalloc.get_traced_memory()
+                    finally:
+                        tracemalloc.stop()
+
+                    results.append({
+                        'role': role,
+                        'format': report_format,
+                        'wall_seconds': round(min(timings), 4),
+                        'peak_memory_bytes': peak,
+                        'queries': len(queries),
+                        'output_bytes': size,
+                    })
+
+    def download(self, user, report_format, summary):
+        """POST a download to GenerateReportView and return the size of the streamed file"""
+        data = {'download': '1', 'format': report_format}
+        if summary:
+            data['summary'] = summary
+        request = RequestFactory().post(reverse('reports'), data)
+        request.user = user
+        request.role = resolve_role(user)
+
+        response = GenerateReportView.as_view()(request)
+        try:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        finally:
+            response.close()
+
+    def git_commit(self):
+        """Commit of the checked out code, so results can be compared across commits"""
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip() or None
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -2,8 +2,8 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from django.db import transaction
 from core.models import (
-    District, Taluka, School, Student, Subject, Assignment, TaskEvaluation,
-    DDPIProfile, BEOProfile, PrincipalProfile
+    District, Taluka, School, Student, Subject, Assignment,
+    StudentEvaluation, DDPIProfile, BEOProfile, PrincipalProfile
 )
 
 
@@ -39,10 +39,10 @@ class Command(BaseCommand):
     def clear_all_data(self):
         # Delete in reverse order of dependencies to avoid foreign key constraints
         
-        # 1. Delete TaskEvaluations
-        task_evaluations_count = TaskEvaluation.objects.count()
-        TaskEvaluation.objects.all().delete()
-        self.stdout.write(f'Deleted {task_evaluations_count} task evaluations')
+        # 1. Delete evaluations (legacy per-task rows go with their students)
+        student_evaluations_count = StudentEvaluation.objects.count()
+        StudentEvaluation.objects.all().delete()
+        self.stdout.write(f'Deleted {student_evaluations_count} student evaluations')
 
         # 2. Delete Assignments
         assignments_count = Assignment.objects.count()
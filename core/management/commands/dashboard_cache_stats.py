@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from core.stats_cache import cache_counters, is_per_process, reset_counters
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the dashboard statistics cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        if is_per_process():
+            self.stdout.write(self.style.WARNING(
+                'The cache backend is per process: these counters are only those of this command, '
+                'not of the web workers. Configure a shared backend (e.g. DatabaseCache).'
+            ))
+        counters = cache_counters()
+        self.stdout.write(f"Hits:     {counters['hits']}")
+        self.stdout.write(f"Misses:   {counters['misses']}")
+        self.stdout.write(f"Hit rate: {counters['hit_rate']}%")
+
+        if options['reset']:
+            reset_counters()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -1,15 +1,81 @@
-from django.core.management.base import BaseCommand
+import csv
+import io
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User, Group
-from django.db import transaction
-import pandas as pd
+from django.db import connection, transaction
 import os
-from core.models import District, Taluka, School, Student, DDPIProfile, BEOProfile, PrincipalProfile
+from core.data_loading import (
+    DEFAULT_BATCH_SIZE, READ_CHUNK_SIZE, batches, bulk_load_schools, bulk_load_students, copy_load_schools,
+    copy_load_students, provision_accounts, read_schools, school_rows, school_talukas, start_checkpoint,
+    student_rows, sync_schools, sync_students,
+)
+from core.models import (
+    District, Taluka, School, Student, DDPIProfile, BEOProfile, PrincipalProfile, LoadCheckpoint,
+)
+from core.rollup import refresh_progress
+from core.stats_cache import invalidate_on_commit
+from core.workers import database_names, setup_worker
+
+DISTRICT_NAME = 'BELAGAVI'
+DDPI_PASSWORD = 'ddpi@0831'
+MANIFEST_COLUMNS = ['district', 'school_file', 'student_file']
+# Options a manifest load passes on to the load of each district
+DISTRICT_OPTIONS = [
+    'bulk', 'batch_size', 'chunk_size', 'incremental', 'delete_missing', 'dry_run', 'hash_workers', 'commit_every',
+    'resume',
+]
+
+
+def _load_district(district, school_file, student_file, options):
+    """Process pool task: load one district; returns (district, error, summary, output, seconds)"""
+    command = Command()
+    output = io.StringIO()
+    started = time.perf_counter()
+    try:
+        call_command(
+            command, district=district, school_file=school_file, student_file=student_file, stdout=output,
+            **options,
+        )
+        error = None
+    except Exception as e:
+        error = str(e)
+    return district, error, getattr(command, 'summary', []), output.getvalue(), time.perf_counter() - started
+
+
+def beo_username(district, taluka):
+    return f'{district.name}_{taluka.name}'.lower().replace(' ', '_')
 
 
 class Command(BaseCommand):
     help = 'Load data from Excel files into the database'
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            '--district',
+            type=str,
+            default=DISTRICT_NAME,
+            help='District the school and student files belong to'
+        )
+        parser.add_argument(
+            '--manifest',
+            type=str,
+            help='CSV file with district, school_file and student_file columns; each district is loaded '
+                 'in its own transaction (relative paths are relative to the manifest)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Districts of a manifest loaded in parallel (default: one per CPU; always 1 on SQLite)'
+        )
         parser.add_argument(
             '--school-file',
             type=str,
@@ -22,18 +88,79 @@ class Command(BaseCommand):
             default='student_list.xlsx',
             help='Path to the student list Excel file'
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Write schools and students in bulk instead of row by row '
+                 '(COPY and INSERT ... ON CONFLICT on PostgreSQL, batched ORM queries elsewhere)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Rows per bulk query in --bulk mode'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=READ_CHUNK_SIZE,
+            help='Student rows read from the spreadsheet at a time'
+        )
+        parser.add_argument(
+            '--hash-workers',
+            type=int,
+            default=0,
+            help='Processes hashing the passwords of new BEO and principal accounts (default: one per CPU; '
+                 'serial inside a parallel --manifest load)'
+        )
+        parser.add_argument(
+            '--commit-every',
+            type=int,
+            default=0,
+            help='Commit schools and students every N rows and record progress in a checkpoint '
+                 '(default: the whole load is one transaction)'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='With --commit-every, continue after the last committed chunk of an unchanged file'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Compare the files with the database and write only new and changed schools and students'
+        )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='With --incremental, delete schools and students of the district that are not in the files'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print what an incremental load would create, update and delete without writing anything'
+        )
 
     def handle(self, *args, **options):
+        if options['delete_missing'] and not (options['incremental'] or options['dry_run']):
+            raise CommandError('--delete-missing needs --incremental or --dry-run')
+        if options['resume'] and not options['commit_every']:
+            raise CommandError('--resume needs --commit-every')
+        if options['commit_every'] and options['delete_missing']:
+            raise CommandError('--delete-missing needs the whole files in one transaction, not --commit-every')
+        if options['manifest']:
+            self.load_manifest(options)
+            return
+
+        district_name = options['district'].strip().upper()
         school_file = options['school_file']
         student_file = options['student_file']
         
         # If relative paths, make them absolute from the project root
         if not os.path.isabs(school_file):
-            from django.conf import settings
             school_file = os.path.join(settings.BASE_DIR, school_file)
         
         if not os.path.isabs(student_file):
-            from django.conf import settings
             student_file = os.path.join(settings.BASE_DIR, student_file)
         
         # Debug: List files in current directory and BASE_DIR
@@ -54,21 +181,212 @@ class Command(BaseCommand):
         
         # Check if files exist
         if not os.path.exists(school_file):
-            self.stdout.write(self.style.ERROR(f'School file not found: {school_file}'))
-            return
+            raise CommandError(f'School file not found: {school_file}')
         
         if not os.path.exists(student_file):
-            self.stdout.write(self.style.ERROR(f'Student file not found: {student_file}'))
-            return
-        
+            raise CommandError(f'Student file not found: {student_file}')
+
+        self.summary = []
+        batch_size = max(options['batch_size'], 1)
+        chunk_size = max(options['chunk_size'], 1)
         try:
-            with transaction.atomic():
-                self.load_data(school_file, student_file)
+            if options['dry_run']:
+                self.preview(
+                    district_name, school_file, student_file, batch_size, chunk_size, options['delete_missing'],
+                )
+                self.stdout.write(self.style.SUCCESS('Dry run complete, nothing was written'))
+                return
+            load = partial(
+                self.load_data, school_file, student_file, options['bulk'], batch_size, chunk_size,
+                options['incremental'], options['delete_missing'], district_name,
+                options['hash_workers'] or os.cpu_count() or 1, max(options['commit_every'], 0), options['resume'],
+            )
+            if options['commit_every']:
+                # Chunked loads commit as they go
+                load()
+            else:
+                with transaction.atomic():
+                    load()
             self.stdout.write(self.style.SUCCESS('Data loaded successfully!'))
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error loading data: {str(e)}'))
+            raise CommandError(f'Error loading data: {str(e)}') from e
+
+    def load_manifest(self, options):
+        """Load every district of a manifest, in a process pool when the database allows it"""
+        entries = self.read_manifest(options['manifest'])
+        district_options = {key: options[key] for key in DISTRICT_OPTIONS}
+        workers = options['workers'] or os.cpu_count() or 1
+        if connection.vendor == 'sqlite':
+            # SQLite has a single writer; parallel transactions would only wait for each other
+            workers = 1
+        workers = min(workers, len(entries))
+        if workers > 1:
+            # Every district already has a process; a hashing pool in each would multiply them
+            district_options['hash_workers'] = 1
+
+        if not options['dry_run']:
+            # Created up front so district loads don't race to create them
+            for name in ('DDPI', 'BEO', 'Principal'):
+                Group.objects.get_or_create(name=name)
+
+        self.stdout.write(f'Loading {len(entries)} districts with {workers} worker(s)...')
+        if workers > 1:
+            # As for report workers: an initializer from a module that doesn't import the models
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=setup_worker, initargs=(database_names(),)
+            ) as pool:
+                futures = [pool.submit(_load_district, *entry, district_options) for entry in entries]
+                results = [future.result() for future in futures]
+        else:
+            results = [_load_district(*entry, district_options) for entry in entries]
 
-    def load_data(self, school_file, student_file):
+        for district, error, summary, output, seconds in results:
+            self.stdout.write(f'\n=== {district} ===')
+            self.stdout.write(output.rstrip())
+
+        self.stdout.write('\nSummary:')
+        for district, error, summary, output, seconds in results:
+            if error:
+                self.stdout.write(self.style.ERROR(f'{district:<20}failed in {seconds:.1f}s: {error}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{district:<20}loaded in {seconds:.1f}s: {"; ".join(summary)}'))
+
+        failed = [district for district, error, *_ in results if error]
+        if failed:
+            raise CommandError(f'{len(failed)} of {len(results)} districts failed: {", ".join(failed)}')
+
+    def read_manifest(self, path):
+        """(district, school file, student file) entries of a manifest CSV"""
+        try:
+            with open(path, newline='') as f:
+                reader = csv.DictReader(f)
+                missing = set(MANIFEST_COLUMNS) - set(reader.fieldnames or [])
+                if missing:
+                    raise CommandError(f'Manifest is missing columns: {", ".join(sorted(missing))}')
+                rows = [row for row in reader if any((value or '').strip() for value in row.values())]
+        except OSError as e:
+            raise CommandError(f'Cannot read manifest: {e}') from e
+
+        directory = os.path.dirname(os.path.abspath(path))
+        entries = []
+        for row in rows:
+            district, school_file, student_file = (row[column].strip() for column in MANIFEST_COLUMNS)
+            entries.append((
+                district.upper(),
+                os.path.join(directory, school_file),
+                os.path.join(directory, student_file),
+            ))
+        districts = [entry[0] for entry in entries]
+        duplicates = sorted({district for district in districts if districts.count(district) > 1})
+        if duplicates:
+            raise CommandError(f'Districts listed more than once: {", ".join(duplicates)}')
+        if not entries:
+            raise CommandError('Manifest lists no districts')
+        return entries
+
+    def load_data(self, school_file, student_file, bulk=False, batch_size=DEFAULT_BATCH_SIZE,
+                  chunk_size=READ_CHUNK_SIZE, incremental=False, delete_missing=False, district_name=DISTRICT_NAME,
+                  hash_workers=1, commit_every=0, resume=False):
+        with transaction.atomic():
+            district, groups, school_df = self.load_talukas(school_file, district_name)
+
+        # PostgreSQL bulk loads take the COPY path, other databases batched ORM queries
+        if connection.vendor == 'postgresql':
+            load_schools_bulk, load_students_bulk = copy_load_schools, copy_load_students
+        else:
+            load_schools_bulk, load_students_bulk = bulk_load_schools, bulk_load_students
+
+        # Step 4: Load schools
+        self.stdout.write('Loading schools...')
+        if incremental:
+            load = partial(
+                sync_schools, district_name=district.name, batch_size=batch_size, delete=delete_missing,
+                warn=self.warn,
+            )
+        elif bulk:
+            load = partial(load_schools_bulk, district=district, batch_size=batch_size, warn=self.warn)
+        else:
+            load = partial(self.load_schools, district=district)
+        result = self.run_phase(
+            LoadCheckpoint.SCHOOLS, district.name, school_file, school_rows(school_df), load, commit_every, resume,
+        )
+        if incremental:
+            self.record(self.diff_message('schools', result))
+        else:
+            self.record(f'{result[0]} schools created, {result[1]} schools updated')
+
+        # Step 5: Load students
+        self.stdout.write('Loading students...')
+        if incremental:
+            load = partial(
+                sync_students, district_name=district.name, batch_size=batch_size, delete=delete_missing,
+                warn=self.warn,
+            )
+        elif bulk:
+            load = partial(load_students_bulk, batch_size=batch_size, warn=self.warn)
+        else:
+            load = self.load_students
+        result = self.run_phase(
+            LoadCheckpoint.STUDENTS, district.name, student_file,
+            student_rows(student_file, chunk_size, warn=self.warn), load, commit_every, resume,
+        )
+        if incremental:
+            self.record(self.diff_message('students', result))
+        else:
+            self.record(f'{result[0]} students created, {result[1]} students updated')
+
+            # Rebuild the district's rollup (sync_students refreshes the schools it touched)
+            self.stdout.write('Refreshing task progress...')
+            with transaction.atomic():
+                refresh_progress(district=district)
+                # Bulk and COPY writes bypass the signals that evict cached statistics
+                invalidate_on_commit(
+                    school_ids=School.objects.filter(taluka__district=district).values_list('id', flat=True),
+                    district_ids=[district.pk],
+                )
+
+        with transaction.atomic():
+            self.create_accounts(district, *groups, hash_workers)
+
+    def run_phase(self, phase, district_name, path, rows, load, commit_every=0, resume=False):
+        """Pass the normalized rows of a file to `load` and return its counts.
+
+        With `commit_every`, rows are loaded and committed in chunks of that
+        many, each together with the phase's LoadCheckpoint, and `resume`
+        skips the rows an interrupted run over the same file committed.
+        Counts then cover the rows loaded by this run.
+        """
+        if not commit_every:
+            return load(rows)
+
+        checkpoint = start_checkpoint(district_name, phase, path, resume, warn=self.warn)
+        if checkpoint.completed:
+            self.stdout.write(f'{path} was already loaded completely, skipping {phase}')
+            return load([])
+        if checkpoint.rows_done:
+            self.stdout.write(f'Resuming {phase} after row {checkpoint.rows_done}')
+
+        total = None
+        for chunk in batches(islice(rows, checkpoint.rows_done, None), commit_every):
+            with transaction.atomic():
+                result = load(chunk)
+                checkpoint.rows_done += len(chunk)
+                checkpoint.save(update_fields=['rows_done', 'updated_at'])
+            if total is None:
+                total = result
+            elif isinstance(result, Counter):
+                total.update(result)
+            else:
+                total = tuple(a + b for a, b in zip(total, result))
+            self.stdout.write(f'{phase.title()}: {checkpoint.rows_done} rows committed')
+
+        checkpoint.completed = True
+        checkpoint.save(update_fields=['completed', 'updated_at'])
+        return total if total is not None else load([])
+
+    def load_talukas(self, school_file, district_name):
+        """Steps 1-3: groups, district and talukas; returns (district, groups, school DataFrame)"""
         # Step 1: Create user groups
         self.stdout.write('Creating user groups...')
         ddpi_group, created = Group.objects.get_or_create(name='DDPI')
@@ -83,18 +401,18 @@ class Command(BaseCommand):
         if created:
             self.stdout.write(self.style.SUCCESS('Created Principal group'))
 
-        # Step 2: Create Belagavi District
-        self.stdout.write('Creating Belagavi District...')
-        district, created = District.objects.get_or_create(name='BELAGAVI')
+        # Step 2: Create the district
+        self.stdout.write(f'Creating {district_name.title()} District...')
+        district, created = District.objects.get_or_create(name=district_name)
         if created:
-            self.stdout.write(self.style.SUCCESS('Belagavi District created'))
+            self.stdout.write(self.style.SUCCESS(f'{district_name.title()} District created'))
         else:
-            self.stdout.write('Belagavi District already exists')
+            self.stdout.write(f'{district_name.title()} District already exists')
 
         # Step 3: Load talukas from school list
         self.stdout.write('Loading talukas...')
-        school_df = pd.read_excel(school_file)
-        unique_talukas = school_df['Block Name'].unique()
+        school_df = read_schools(school_file)
+        unique_talukas = school_talukas(school_df)
         
         talukas_created = 0
         for taluka_name in unique_talukas:
@@ -106,60 +424,69 @@ class Command(BaseCommand):
                 talukas_created += 1
         
         self.stdout.write(self.style.SUCCESS(f'{talukas_created} talukas created, {len(unique_talukas) - talukas_created} already existed'))
+        return district, (ddpi_group, beo_group, principal_group), school_df
 
-        # Step 4: Load schools
-        self.stdout.write('Loading schools...')
+    def preview(self, district_name, school_file, student_file, batch_size, chunk_size, delete_missing):
+        """Print the changes an incremental load of the files would make, without writing"""
+        school_df = read_schools(school_file)
+        talukas = school_talukas(school_df)
+        existing = Taluka.objects.filter(district__name=district_name, name__in=talukas).count()
+        self.stdout.write(f'Talukas: {len(talukas) - existing} to create, {existing} existing')
+
+        rows = list(school_rows(school_df))
+        counts = sync_schools(rows, district_name, batch_size, delete_missing, dry_run=True, warn=self.warn)
+        self.record(self.diff_message('Schools', counts, dry_run=True))
+
+        udise_codes = {row['udise_code'] for row in rows}
+        new_schools = udise_codes - set(
+            School.objects.filter(udise_code__in=udise_codes).values_list('udise_code', flat=True)
+        )
+        counts = sync_students(
+            student_rows(student_file, chunk_size, warn=self.warn), district_name, batch_size, delete_missing,
+            dry_run=True, new_schools=new_schools, warn=self.warn,
+        )
+        self.record(self.diff_message('Students', counts, dry_run=True))
+
+    def record(self, message):
+        """Write a result line and keep it for the summary of a manifest load"""
+        self.summary.append(message)
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def diff_message(self, name, counts, dry_run=False):
+        if dry_run:
+            return (
+                f"{name}: {counts['created']} to create, {counts['updated']} to update, "
+                f"{counts['unchanged']} unchanged, {counts['deleted']} to delete"
+            )
+        return (
+            f"{counts['created']} {name} created, {counts['updated']} {name} updated, "
+            f"{counts['unchanged']} unchanged, {counts['deleted']} deleted"
+        )
+
+    def warn(self, message):
+        self.stdout.write(self.style.WARNING(message))
+
+    def load_schools(self, rows, district):
+        """Row-by-row school loader over normalized school rows; returns (created, updated)"""
         schools_created = 0
         schools_updated = 0
         
-        for _, row in school_df.iterrows():
-            udise_code = str(row['Udise Code']).strip()
-            school_name = str(row['School Name']).strip()
-            block_name = str(row['Block Name']).strip()
-            
-            # Skip if essential data is missing
-            if pd.isna(row['Udise Code']) or pd.isna(row['School Name']) or pd.isna(row['Block Name']):
-                continue
+        for row in rows:
+            udise_code = row['udise_code']
+            block_name = row['block_name']
                 
             try:
                 taluka = Taluka.objects.get(name=block_name, district=district)
                 
-                # Determine school type (boys/girls/coed)
-                type_str = str(row['Type']).lower()
-                if 'boys' in type_str and 'girls' not in type_str:
-                    school_type = 'boys'
-                elif 'girls' in type_str and 'boys' not in type_str:
-                    school_type = 'girls'
-                else:
-                    school_type = 'coed'
-                
-                # Determine location
-                location_str = str(row['School Location']).lower()
-                if 'urban' in location_str:
-                    location = 'urban'
-                else:
-                    location = 'rural'
-                
-                # Determine medium of instruction
-                medium_str = str(row['medinstr1']).lower()
-                if 'urdu' in medium_str:
-                    medium = 'urdu'
-                elif 'english' in medium_str:
-                    medium = 'english'
-                elif 'marathi' in medium_str:
-                    medium = 'marathi'
-                else:
-                    medium = 'kannada'
-                
                 school, created = School.objects.get_or_create(
                     udise_code=udise_code,
                     defaults={
-                        'name': school_name,
+                        'name': row['name'],
                         'taluka': taluka,
-                        'type': school_type,
-                        'school_type': str(row['Management']) if not pd.isna(row['Management']) else 'Government',
-                        'location': location,
-                        'medium': medium,
+                        'type': row['type'],
+                        'school_type': row['school_type'],
+                        'location': row['location'],
+                        'medium': row['medium'],
                     }
                 )
                 
@@ -167,12 +494,12 @@ class Command(BaseCommand):
                     schools_created += 1
                 else:
                     # Update existing school
-                    school.name = school_name
+                    school.name = row['name']
                     school.taluka = taluka
-                    school.type = school_type
-                    school.school_type = str(row['Management']) if not pd.isna(row['Management']) else 'Government'
-                    school.location = location
-                    school.medium = medium
+                    school.type = row['type']
+                    school.school_type = row['school_type']
+                    school.location = row['location']
+                    school.medium = row['medium']
                     school.save()
                     schools_updated += 1
                     
@@ -183,45 +510,27 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f'Error processing school {udise_code}: {str(e)}'))
                 continue
         
-        self.stdout.write(self.style.SUCCESS(f'{schools_created} schools created, {schools_updated} schools updated'))
+        return schools_created, schools_updated
 
-        # Step 5: Load students
-        self.stdout.write('Loading students...')
-        student_df = pd.read_excel(student_file)
+    def load_students(self, rows):
+        """Row-by-row student loader over normalized student rows; returns (created, updated)"""
         students_created = 0
         students_updated = 0
         
-        for _, row in student_df.iterrows():
-            udise_code = str(row['Udise code']).strip()
-            sts_number = str(row['SATS  No.']).strip()
-            student_name = str(row['Student Name']).strip()
-            
-            # Skip if essential data is missing
-            if pd.isna(row['Udise code']) or pd.isna(row['SATS  No.']) or pd.isna(row['Student Name']):
-                continue
+        for row in rows:
+            udise_code = row['udise_code']
+            sts_number = row['sts_number']
             
             try:
                 school = School.objects.get(udise_code=udise_code)
                 
-                # Determine gender
-                gender_str = str(row['Gender']).lower()
-                if gender_str == 'b':
-                    gender = 'male'
-                elif gender_str == 'g':
-                    gender = 'female'
-                else:
-                    gender = 'other'
-                
-                # Get standard
-                standard = int(row['Standard']) if not pd.isna(row['Standard']) else 1
-                
                 student, created = Student.objects.get_or_create(
                     sts_number=sts_number,
                     school=school,
                     defaults={
-                        'name': student_name,
-                        'gender': gender,
-                        'standard': standard,
+                        'name': row['name'],
+                        'gender': row['gender'],
+                        'standard': row['standard'],
                     }
                 )
                 
@@ -229,9 +538,9 @@ class Command(BaseCommand):
                     students_created += 1
                 else:
                     # Update existing student
-                    student.name = student_name
-                    student.gender = gender
-                    student.standard = standard
+                    student.name = row['name']
+                    student.gender = row['gender']
+                    student.standard = row['standard']
                     student.save()
                     students_updated += 1
                     
@@ -242,21 +551,36 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f'Error processing student {sts_number}: {str(e)}'))
                 continue
         
-        self.stdout.write(self.style.SUCCESS(f'{students_created} students created, {students_updated} students updated'))
+        return students_created, students_updated
 
+    def rename_beo_accounts(self, district, usernames):
+        """Move BEO accounts off the old taluka-only usernames, keeping their passwords"""
+        taken = set(User.objects.filter(username__in=list(usernames.values())).values_list('username', flat=True))
+        renamed = []
+        for user in User.objects.filter(beoprofile__taluka__district=district).select_related('beoprofile__taluka'):
+            taluka = user.beoprofile.taluka
+            username = usernames.get(taluka.pk)
+            if username and username not in taken and user.username == taluka.name.lower().replace(' ', '_'):
+                user.username, user.email = username, f'{username}@prerane.in'
+                renamed.append(user)
+        User.objects.bulk_update(renamed, ['username', 'email'])
+        if renamed:
+            self.stdout.write(f'{len(renamed)} BEO accounts renamed to include the district')
+
+    def create_accounts(self, district, ddpi_group, beo_group, principal_group, hash_workers=1):
         # Step 6: Create user accounts
         self.stdout.write('Creating user accounts...')
         
-        # Create DDPI account for Belagavi district
-        ddpi_username = 'belagavi_ddpi'
-        ddpi_password = 'ddpi@0831'
+        # Create DDPI account for the district (belagavi_ddpi for BELAGAVI)
+        ddpi_username = f"{district.name.lower().replace(' ', '_')}_ddpi"
+        ddpi_password = DDPI_PASSWORD
         
         ddpi_user, created = User.objects.get_or_create(
             username=ddpi_username,
             defaults={
                 'email': f'{ddpi_username}@prerane.in',
                 'first_name': 'DDPI',
-                'last_name': 'Belagavi',
+                'last_name': district.name.title(),
                 'is_staff': True,
             }
         )
@@ -280,73 +604,47 @@ class Command(BaseCommand):
             ddpi_profile.district = district
             ddpi_profile.save()
 
-        # Create BEO accounts for each taluka
-        beo_created = 0
-        for taluka in Taluka.objects.filter(district=district):
-            beo_username = taluka.name.lower().replace(' ', '_')
-            beo_password = taluka.name[::-1].lower()  # Reverse of taluka name
-            
-            beo_user, created = User.objects.get_or_create(
-                username=beo_username,
-                defaults={
-                    'email': f'{beo_username}@prerane.in',
+        # Create BEO accounts for each taluka; passwords are hashed up front, in parallel.
+        # Taluka names repeat across districts, so the username carries the district (belagavi_athani)
+        talukas = list(Taluka.objects.filter(district=district))
+        beo_usernames = {taluka.pk: beo_username(district, taluka) for taluka in talukas}
+        self.rename_beo_accounts(district, beo_usernames)
+        beo_accounts = [
+            (
+                beo_usernames[taluka.pk],
+                taluka.name[::-1].lower(),  # Reverse of taluka name
+                {
+                    'email': f'{beo_usernames[taluka.pk]}@prerane.in',
                     'first_name': 'BEO',
                     'last_name': taluka.name,
                     'is_staff': True,
-                }
-            )
-            
-            if created:
-                beo_user.set_password(beo_password)
-                beo_user.save()
-                beo_created += 1
-            
-            # Assign BEO user to BEO group
-            beo_user.groups.add(beo_group)
-            
-            # Create or update BEO profile
-            beo_profile, created = BEOProfile.objects.get_or_create(
-                user=beo_user,
-                defaults={'taluka': taluka}
+                },
+                taluka,
             )
-            if not created:
-                beo_profile.taluka = taluka
-                beo_profile.save()
+            for taluka in talukas
+        ]
+        beo_created = provision_accounts(beo_accounts, beo_group, BEOProfile, 'taluka', hash_workers)
         
         self.stdout.write(self.style.SUCCESS(f'{beo_created} BEO accounts created'))
 
         # Create Principal accounts for each school
-        principal_created = 0
-        for school in School.objects.filter(taluka__district=district):
-            principal_username = school.udise_code.lower()
-            principal_password = school.udise_code[::-1].lower()  # Reverse of UDISE code
-            
-            principal_user, created = User.objects.get_or_create(
-                username=principal_username,
-                defaults={
-                    'email': f'{principal_username}@prerane.in',
+        principal_accounts = [
+            (
+                school.udise_code.lower(),
+                school.udise_code[::-1].lower(),  # Reverse of UDISE code
+                {
+                    'email': f'{school.udise_code.lower()}@prerane.in',
                     'first_name': 'Principal',
                     'last_name': school.name[:50],  # Limit last name length
                     'is_staff': True,
-                }
+                },
+                school,
             )
-            
-            if created:
-                principal_user.set_password(principal_password)
-                principal_user.save()
-                principal_created += 1
-            
-            # Assign Principal user to Principal group
-            principal_user.groups.add(principal_group)
-            
-            # Create or update Principal profile
-            principal_profile, created = PrincipalProfile.objects.get_or_create(
-                user=principal_user,
-                defaults={'school': school}
-            )
-            if not created:
-                principal_profile.school = school
-                principal_profile.save()
+            for school in School.objects.filter(taluka__district=district).only('udise_code', 'name')
+        ]
+        principal_created = provision_accounts(
+            principal_accounts, principal_group, PrincipalProfile, 'school', hash_workers
+        )
         
         self.stdout.write(self.style.SUCCESS(f'{principal_created} Principal accounts created'))
         
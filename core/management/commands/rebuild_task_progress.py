@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.models import TaskProgress
+from core.rollup import refresh_progress, verify_progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the TaskProgress rollup table from StudentEvaluation and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the rollup table, do not rebuild it',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            self.stdout.write('Rebuilding task progress rollup...')
+            with transaction.atomic():
+                rows = refresh_progress()
+            self.stdout.write(self.style.SUCCESS(f'{rows} rollup rows written'))
+
+        self.stdout.write('Verifying task progress rollup...')
+        mismatches = verify_progress()
+        if mismatches:
+            for key, expected, actual in mismatches[:20]:
+                school_id, standard, assignment_id = key
+                self.stdout.write(self.style.WARNING(
+                    f'school={school_id} standard={standard} assignment={assignment_id}: '
+                    f'expected {expected}, found {actual}'
+                ))
+            raise CommandError(f'{len(mismatches)} rollup rows do not match StudentEvaluation')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rollup verified: {TaskProgress.objects.count()} rows match StudentEvaluation'
+        ))
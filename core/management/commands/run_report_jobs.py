@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core.reports import claim_next_job, run_report_job
+
+
+class Command(BaseCommand):
+    help = 'Generate queued Excel report jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued and exit instead of polling',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Waiting for report jobs...' if not options['once'] else 'Processing queued report jobs...')
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            started = time.monotonic()
+            job = run_report_job(job)
+            elapsed = time.monotonic() - started
+            if job.status == job.DONE:
+                self.stdout.write(self.style.SUCCESS(f'Job {job.pk} done in {elapsed:.1f}s: {job.file.name}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Job {job.pk} failed: {job.error}'))
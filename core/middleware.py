@@ -0,0 +1,89 @@
+# core/middleware.py
+from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Exists, OuterRef
+from django.utils.functional import SimpleLazyObject
+
+ROLE_NAMES = ('DDPI', 'BEO', 'Principal')  # in order of precedence
+PROFILE_ATTRIBUTES = {'DDPI': 'ddpiprofile', 'BEO': 'beoprofile', 'Principal': 'principalprofile'}
+
+
+class Role:
+    """Role, profile and scope of the signed-in user for one request"""
+
+    def __init__(self, groups=(), profile=None):
+        self.groups = frozenset(groups)
+        self.name = next((name for name in ROLE_NAMES if name in self.groups), None)
+        self.profile = profile
+        self.district = self.taluka = self.school = None
+
+        if self.name == 'DDPI' and profile:
+            self.district = profile.district
+        elif self.name == 'BEO' and profile:
+            self.taluka = profile.taluka
+            self.district = self.taluka.district
+        elif self.name == 'Principal' and profile:
+            self.school = profile.school
+            self.taluka = self.school.taluka
+            self.district = self.taluka.district
+
+    @property
+    def is_ddpi(self):
+        return 'DDPI' in self.groups
+
+    @property
+    def is_beo(self):
+        return 'BEO' in self.groups
+
+    @property
+    def is_principal(self):
+        return 'Principal' in self.groups
+
+    @property
+    def district_id(self):
+        return self.district.pk if self.district else None
+
+    @property
+    def taluka_id(self):
+        return self.taluka.pk if self.taluka else None
+
+    @property
+    def school_id(self):
+        return self.school.pk if self.school else None
+
+
+def resolve_role(user):
+    """Load group membership and the role profile with a single query"""
+    if not user.is_authenticated:
+        return Role()
+
+    membership = User.groups.through.objects.filter(user=OuterRef('pk'))
+    row = User.objects.select_related(
+        'ddpiprofile__district',
+        'beoprofile__taluka__district',
+        'principalprofile__school__taluka__district',
+    ).annotate(
+        in_ddpi=Exists(membership.filter(group__name='DDPI')),
+        in_beo=Exists(membership.filter(group__name='BEO')),
+        in_principal=Exists(membership.filter(group__name='Principal')),
+    ).get(pk=user.pk)
+
+    groups = [name for name in ROLE_NAMES if getattr(row, f'in_{name.lower()}')]
+    profile = None
+    if groups:
+        try:
+            profile = getattr(row, PROFILE_ATTRIBUTES[groups[0]])
+        except ObjectDoesNotExist:
+            pass
+    return Role(groups, profile)
+
+
+class RoleMiddleware:
+    """Attach a lazily resolved `request.role` (needs AuthenticationMiddleware first)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: resolve_role(request.user))
+        return self.get_response(request)
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:08
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F
+
+BATCH_SIZE = 2000
+
+
+def backfill_task_progress(apps, schema_editor):
+    """Build the TaskProgress rollup from the evaluations already in the database"""
+    Student = apps.get_model('core', 'Student')
+    Assignment = apps.get_model('core', 'Assignment')
+    TaskEvaluation = apps.get_model('core', 'TaskEvaluation')
+    TaskProgress = apps.get_model('core', 'TaskProgress')
+
+    schools_by_standard = defaultdict(list)
+    for row in Student.objects.values('school_id', 'standard').annotate(count=Count('id')).order_by():
+        schools_by_standard[row['standard']].append((row['school_id'], row['count']))
+
+    counts = Counter()
+    for row in TaskEvaluation.objects.filter(
+        assignment__standard=F('student__standard'),
+    ).values('student__school_id', 'assignment_id', 'status').annotate(count=Count('id')).order_by():
+        counts[(row['student__school_id'], row['assignment_id'], row['status'])] = row['count']
+
+    TaskProgress.objects.all().delete()
+    batch = []
+    for assignment_id, standard, tasks in Assignment.objects.values_list('id', 'standard', 'tasks').order_by():
+        for school_id, student_count in schools_by_standard.get(standard, []):
+            batch.append(TaskProgress(
+                school_id=school_id, standard=standard, assignment_id=assignment_id,
+                total_count=student_count * len(tasks or []),
+                solved_count=counts[(school_id, assignment_id, 'solved')],
+                unsolved_count=counts[(school_id, assignment_id, 'unsolved')],
+            ))
+            if len(batch) >= BATCH_SIZE:
+                TaskProgress.objects.bulk_create(batch)
+                batch = []
+    TaskProgress.objects.bulk_create(batch)
+
+
+def clear_task_progress(apps, schema_editor):
+    apps.get_model('core', 'TaskProgress').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_assignment_core_assign_standar_2f0fb6_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('standard', models.IntegerField(choices=[(1, 'Class 1'), (2, 'Class 2'), (3, 'Class 3'), (4, 'Class 4'), (5, 'Class 5'), (6, 'Class 6'), (7, 'Class 7'), (8, 'Class 8'), (9, 'Class 9'), (10, 'Class 10')])),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('solved_count', models.PositiveIntegerField(default=0)),
+                ('unsolved_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.assignment')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.school')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['assignment'], name='core_taskpr_assignm_5710d2_idx')],
+                'unique_together': {('school', 'standard', 'assignment')},
+            },
+        ),
+        migrations.RunPython(backfill_task_progress, clear_task_progress),
+    ]
@@ -0,0 +1,73 @@
+from itertools import groupby
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+CODES = {'solved': 'S', 'unsolved': 'U'}
+
+
+def keep_timestamps(model):
+    # Historical models keep auto_now, which would stamp every copied row with now()
+    model._meta.get_field('evaluated_at').auto_now = False
+
+
+def pack_task_evaluations(apps, schema_editor):
+    """Fold TaskEvaluation rows into one StudentEvaluation per (student, assignment)"""
+    TaskEvaluation = apps.get_model('core', 'TaskEvaluation')
+    StudentEvaluation = apps.get_model('core', 'StudentEvaluation')
+    keep_timestamps(StudentEvaluation)
+
+    rows = TaskEvaluation.objects.order_by('student_id', 'assignment_id', 'task_index').values_list(
+        'student_id', 'assignment_id', 'task_index', 'status', 'evaluated_by_id', 'evaluated_at'
+    ).iterator(chunk_size=BATCH_SIZE)
+
+    batch = []
+    for (student_id, assignment_id), tasks in groupby(rows, key=lambda row: row[:2]):
+        tasks = list(tasks)
+        statuses = ['-'] * (max(task[2] for task in tasks) + 1)
+        for _, _, task_index, status, _, _ in tasks:
+            statuses[task_index] = CODES.get(status, '-')
+        latest = max(tasks, key=lambda task: task[5])
+        batch.append(StudentEvaluation(
+            student_id=student_id, assignment_id=assignment_id, statuses=''.join(statuses),
+            evaluated_by_id=latest[4], evaluated_at=latest[5],
+        ))
+        if len(batch) >= BATCH_SIZE:
+            StudentEvaluation.objects.bulk_create(batch)
+            batch = []
+    StudentEvaluation.objects.bulk_create(batch)
+    TaskEvaluation.objects.all().delete()
+
+
+def unpack_student_evaluations(apps, schema_editor):
+    TaskEvaluation = apps.get_model('core', 'TaskEvaluation')
+    StudentEvaluation = apps.get_model('core', 'StudentEvaluation')
+    keep_timestamps(TaskEvaluation)
+    statuses_by_code = {code: status for status, code in CODES.items()}
+
+    batch = []
+    for evaluation in StudentEvaluation.objects.iterator(chunk_size=BATCH_SIZE):
+        for task_index, code in enumerate(evaluation.statuses):
+            if code not in statuses_by_code:
+                continue
+            batch.append(TaskEvaluation(
+                student_id=evaluation.student_id, assignment_id=evaluation.assignment_id,
+                task_index=task_index, status=statuses_by_code[code],
+                evaluated_by_id=evaluation.evaluated_by_id, evaluated_at=evaluation.evaluated_at,
+            ))
+        if len(batch) >= BATCH_SIZE:
+            TaskEvaluation.objects.bulk_create(batch)
+            batch = []
+    TaskEvaluation.objects.bulk_create(batch)
+    StudentEvaluation.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_studentevaluation'),
+    ]
+
+    operations = [
+        migrations.RunPython(pack_task_evaluations, unpack_student_evaluations),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='format',
+            field=models.CharField(default='xlsx', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_reportjob_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='summary',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
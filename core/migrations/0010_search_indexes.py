@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+# Trigram indexes serve the UPPER(column::text) LIKE '%term%' of icontains searches
+TRIGRAM_INDEXES = {
+    'core_school_name_trgm': ('core_school', 'name'),
+    'core_assignment_title_trgm': ('core_assignment', 'title'),
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, (table, column) in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_reportjob_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['title'], name='core_assign_title_f770e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='school',
+            index=models.Index(fields=['name'], name='core_school_name_f5e185_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district', models.CharField(max_length=100)),
+                ('phase', models.CharField(choices=[('schools', 'Schools'), ('students', 'Students')], max_length=10)),
+                ('file_path', models.CharField(max_length=500)),
+                ('checksum', models.CharField(max_length=64)),
+                ('rows_done', models.PositiveIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('district', 'phase')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_loadcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('size', models.PositiveIntegerField()),
+                ('last_used', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used'], name='core_cached_last_us_7f13d1_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope_type', models.CharField(max_length=10)),
+                ('scope_id', models.PositiveIntegerField()),
+                ('token', models.BigIntegerField()),
+            ],
+            options={
+                'unique_together': {('scope_type', 'scope_id')},
+            },
+        ),
+    ]
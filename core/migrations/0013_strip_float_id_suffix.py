@@ -0,0 +1,57 @@
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+# How pandas wrote an integer id read from a numeric column with blank cells
+FLOAT_ID = re.compile(r'^(\d+)\.0$')
+
+
+def strip_float_suffix(apps, schema_editor):
+    """'1001.0' -> '1001' for the UDISE codes and SATS numbers of earlier loads.
+
+    load_data reads integer cells as ints since it streams the files with
+    openpyxl, so without this a reload would create a second school or
+    student next to every one stored with the suffix (and its evaluations).
+    Values whose normalized form already exists are left alone.
+    """
+    School = apps.get_model('core', 'School')
+    Student = apps.get_model('core', 'Student')
+
+    taken = set(School.objects.values_list('udise_code', flat=True))
+    schools = []
+    for school in School.objects.filter(udise_code__endswith='.0').only('pk', 'udise_code'):
+        match = FLOAT_ID.match(school.udise_code)
+        if match and match.group(1) not in taken:
+            school.udise_code = match.group(1)
+            taken.add(school.udise_code)
+            schools.append(school)
+    School.objects.bulk_update(schools, ['udise_code'], batch_size=BATCH_SIZE)
+
+    candidates = list(Student.objects.filter(sts_number__endswith='.0').only('pk', 'sts_number', 'school_id'))
+    for start in range(0, len(candidates), BATCH_SIZE):
+        batch = [
+            (student, match.group(1)) for student in candidates[start:start + BATCH_SIZE]
+            if (match := FLOAT_ID.match(student.sts_number))
+        ]
+        taken = set(Student.objects.filter(
+            sts_number__in={sts_number for _, sts_number in batch},
+        ).values_list('sts_number', 'school_id'))
+        students = []
+        for student, sts_number in batch:
+            if (sts_number, student.school_id) not in taken:
+                student.sts_number = sts_number
+                taken.add((sts_number, student.school_id))
+                students.append(student)
+        Student.objects.bulk_update(students, ['sts_number'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_report_cache_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_float_suffix, migrations.RunPython.noop),
+    ]
@@ -3,23 +3,27 @@ from django.contrib.auth.mixins import UserPassesTestMixin, LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from .models import DDPIProfile, BEOProfile, PrincipalProfile
 
+# Role checks read request.role, which core.middleware.RoleMiddleware resolves
+# once per request (groups and profile in a single query). A group member
+# without the role's profile has no scope and is refused.
+
 class DDPIRequiredMixin(UserPassesTestMixin):
     def test_func(self):
-        return self.request.user.groups.filter(name='DDPI').exists()
+        return self.request.role.is_ddpi and self.request.role.district is not None
     
     def handle_no_permission(self):
         raise PermissionDenied("You must be a DDPI to access this page.")
 
 class BEORequiredMixin(UserPassesTestMixin):
     def test_func(self):
-        return self.request.user.groups.filter(name='BEO').exists()
+        return self.request.role.is_beo and self.request.role.taluka is not None
     
     def handle_no_permission(self):
         raise PermissionDenied("You must be a BEO to access this page.")
 
 class PrincipalRequiredMixin(UserPassesTestMixin):
     def test_func(self):
-        return self.request.user.groups.filter(name='Principal').exists()
+        return self.request.role.is_principal and self.request.role.school is not None
     
     def handle_no_permission(self):
         raise PermissionDenied("You must be a Principal to access this page.")
@@ -27,20 +31,12 @@ class PrincipalRequiredMixin(UserPassesTestMixin):
 class RoleContextMixin:
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        
-        context['is_ddpi'] = user.groups.filter(name='DDPI').exists()
-        context['is_beo'] = user.groups.filter(name='BEO').exists()
-        context['is_principal'] = user.groups.filter(name='Principal').exists()
+        role = self.request.role
         
-        try:
-            if context['is_ddpi']:
-                context['user_profile'] = DDPIProfile.objects.get(user=user)
-            elif context['is_beo']:
-                context['user_profile'] = BEOProfile.objects.get(user=user)
-            elif context['is_principal']:
-                context['user_profile'] = PrincipalProfile.objects.get(user=user)
-        except:
-            context['user_profile'] = None
+        context['role'] = role
+        context['is_ddpi'] = role.is_ddpi
+        context['is_beo'] = role.is_beo
+        context['is_principal'] = role.is_principal
+        context['user_profile'] = role.profile
             
         return context
\ No newline at end of file
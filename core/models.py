@@ -67,6 +67,7 @@ class School(models.Model):
         indexes = [
             models.Index(fields=['taluka']),
             models.Index(fields=['udise_code']),
+            models.Index(fields=['name']),
         ]
 
 class Student(models.Model):
@@ -117,9 +118,11 @@ class Assignment(models.Model):
             models.Index(fields=['subject', 'standard']),
             models.Index(fields=['start_date', 'end_date']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['title']),
         ]
 
 class TaskEvaluation(models.Model):
+    # Legacy one-row-per-task storage, superseded by StudentEvaluation
     STATUS_CHOICES = [
         ('solved', 'SOLVED'),
         ('unsolved', 'UNSOLVED'),
@@ -140,6 +143,26 @@ class TaskEvaluation(models.Model):
             models.Index(fields=['assignment', 'status']),
         ]
 
+class StudentEvaluation(models.Model):
+    """Task statuses of one student for one assignment.
+
+    `statuses` holds one character per task in assignment.tasks order:
+    'S' solved, 'U' unsolved, '-' not evaluated yet.
+    """
+    SOLVED = 'S'
+    UNSOLVED = 'U'
+    NOT_EVALUATED = '-'
+    STATUS_CODES = {'solved': SOLVED, 'unsolved': UNSOLVED}
+    
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
+    statuses = models.TextField(default='')
+    evaluated_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    evaluated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'assignment']
+
 # Profile Extensions
 class DDPIProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -160,4 +183,108 @@ class PrincipalProfile(models.Model):
     school = models.ForeignKey(School, on_delete=models.CASCADE)
     
     def __str__(self):
-        return f"Principal: {self.user.username} - {self.school.name}"
\ No newline at end of file
+        return f"Principal: {self.user.username} - {self.school.name}"
+
+class TaskProgress(models.Model):
+    """Rollup of evaluation counts per (school, standard, assignment)"""
+    school = models.ForeignKey(School, on_delete=models.CASCADE)
+    standard = models.IntegerField(choices=Student.CLASS_CHOICES)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
+    total_count = models.PositiveIntegerField(default=0)  # students x tasks
+    solved_count = models.PositiveIntegerField(default=0)
+    unsolved_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.school.name} - {self.assignment.title}: {self.solved_count}/{self.total_count}"
+    
+    class Meta:
+        unique_together = ['school', 'standard', 'assignment']
+        indexes = [
+            models.Index(fields=['assignment']),
+        ]
+
+class ReportJob(models.Model):
+    """Excel report generated in the background by the run_report_jobs command"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    parameters = models.JSONField(default=dict)  # StatisticsScope.to_parameters()
+    format = models.CharField(max_length=10, default='xlsx')  # key of core.reports.REPORT_FORMATS
+    summary = models.CharField(max_length=10, blank=True, default='')  # key of core.reports.SUMMARY_OPTIONS
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(upload_to='reports/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Report job {self.pk} ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['fingerprint', 'status']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+class LoadCheckpoint(models.Model):
+    """Progress of a chunked load_data run, so an interrupted load can resume"""
+    SCHOOLS = 'schools'
+    STUDENTS = 'students'
+    PHASE_CHOICES = [
+        (SCHOOLS, 'Schools'),
+        (STUDENTS, 'Students'),
+    ]
+    
+    district = models.CharField(max_length=100)
+    phase = models.CharField(max_length=10, choices=PHASE_CHOICES)
+    file_path = models.CharField(max_length=500)
+    checksum = models.CharField(max_length=64)  # SHA-256 of the file
+    rows_done = models.PositiveIntegerField(default=0)  # normalized rows committed so far
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.district} {self.phase}: {self.rows_done} rows{' (completed)' if self.completed else ''}"
+    
+    class Meta:
+        unique_together = ['district', 'phase']
+
+class DataVersion(models.Model):
+    """Version token of the data of a district, taluka or school (or of all data), see core.report_cache"""
+    scope_type = models.CharField(max_length=10)  # 'all', 'district', 'taluka' or 'school'
+    scope_id = models.PositiveIntegerField()
+    token = models.BigIntegerField()
+    
+    def __str__(self):
+        return f"{self.scope_type} {self.scope_id}: {self.token}"
+    
+    class Meta:
+        unique_together = ['scope_type', 'scope_id']
+
+class CachedReport(models.Model):
+    """Size and last use of a report in the report cache, for least recently used eviction"""
+    key = models.CharField(max_length=100, unique=True)
+    size = models.PositiveIntegerField()
+    last_used = models.DateTimeField()
+    expires_at = models.DateTimeField()  # when the cache drops the report by its timeout
+    
+    def __str__(self):
+        return f"{self.key} ({self.size} bytes)"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used']),
+        ]
@@ -0,0 +1,108 @@
+# core/report_cache.py
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Sum
+from django.utils import timezone
+from .models import CachedReport, DataVersion
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'report_cache'
+
+# Data versions and the size index live in the database, so every web
+# process and worker agrees on them whichever backend holds the reports.
+
+
+def _cache():
+    return caches[getattr(settings, 'REPORT_CACHE_ALIAS', 'reports')]
+
+
+def data_version(scope):
+    """Version token of the most specific district/taluka/school of a StatisticsScope.
+
+    Tokens are replaced with the current time, never incremented, so a
+    reset or restored table can't hand out a token of older cache entries.
+    """
+    for scope_type in ('school', 'taluka', 'district'):
+        value = getattr(scope, scope_type)
+        if value is not None:
+            scope_id = getattr(value, 'pk', value)
+            break
+    else:
+        scope_type, scope_id = 'all', 0
+
+    version, _ = DataVersion.objects.get_or_create(
+        scope_type=scope_type, scope_id=scope_id, defaults={'token': time.time_ns()},
+    )
+    return version.token
+
+
+def bump_data_versions(school_ids, taluka_ids, district_ids):
+    """Give the scopes a new data version after their evaluations, students or assignments changed"""
+    token = time.time_ns()
+    scopes = [('all', 0)]
+    scopes += [('school', school_id) for school_id in school_ids]
+    scopes += [('taluka', taluka_id) for taluka_id in taluka_ids]
+    scopes += [('district', district_id) for district_id in district_ids]
+    DataVersion.objects.bulk_create(
+        [DataVersion(scope_type=scope_type, scope_id=scope_id, token=token) for scope_type, scope_id in scopes],
+        update_conflicts=True, unique_fields=['scope_type', 'scope_id'], update_fields=['token'],
+    )
+
+
+def report_key(scope, report_format, *options):
+    """Cache key of a report: scope and filters, format and options, and current data version"""
+    return f'{CACHE_PREFIX}:{scope.fingerprint(report_format, *options, data_version(scope))}'
+
+
+def get_report(key):
+    """Cached report bytes, or None"""
+    content = _cache().get(key)
+    if content is None:
+        logger.info('Report cache miss for %s', key)
+        # The cache may have dropped it on its own
+        CachedReport.objects.filter(key=key).delete()
+        return None
+
+    logger.info('Report cache hit for %s (%d bytes)', key, len(content))
+    CachedReport.objects.filter(key=key).update(last_used=timezone.now())
+    return content
+
+
+def store_report(key, content):
+    """Cache report bytes, evicting least recently used reports to stay within the byte budget"""
+    max_entry = settings.REPORT_CACHE_MAX_ENTRY_BYTES
+    if len(content) > max_entry:
+        logger.info('Report %s not cached: %d bytes is over the %d byte entry limit', key, len(content), max_entry)
+        return False
+
+    cache = _cache()
+    now = timezone.now()
+    # Forget reports the cache already dropped by their timeout
+    CachedReport.objects.filter(expires_at__lte=now).delete()
+    CachedReport.objects.update_or_create(key=key, defaults={
+        'size': len(content),
+        'last_used': now,
+        'expires_at': now + timedelta(seconds=settings.REPORT_CACHE_TIMEOUT),
+    })
+
+    total = CachedReport.objects.aggregate(total=Sum('size'))['total']
+    evicted = []
+    if total > settings.REPORT_CACHE_MAX_BYTES:
+        for old_key, size in CachedReport.objects.exclude(key=key).order_by('last_used', 'pk').values_list(
+            'key', 'size'
+        ):
+            if total <= settings.REPORT_CACHE_MAX_BYTES:
+                break
+            evicted.append(old_key)
+            total -= size
+            logger.info('Evicted cached report %s (%d bytes)', old_key, size)
+    if evicted:
+        cache.delete_many(evicted)
+        CachedReport.objects.filter(key__in=evicted).delete()
+
+    cache.set(key, content, timeout=settings.REPORT_CACHE_TIMEOUT)
+    return True
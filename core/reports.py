@@ -0,0 +1,502 @@
+# core/reports.py
+import csv
+import logging
+import multiprocessing
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, connections
+from django.db.models import Max, OuterRef, Q, Subquery
+from django.db.models.functions import Length
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from .evaluations import decode_statuses, evaluation_statuses
+from .models import Assignment, ReportJob, Student, StudentEvaluation
+from .report_cache import data_version, get_report, report_key, store_report
+from .task_statistics import StatisticsScope, grouped_statistics
+from .workers import database_names, setup_worker
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for Parquet exports
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+STUDENT_HEADERS = ['Student Name', 'STS Number', 'Gender', 'Class', 'School', 'Taluka']
+STUDENT_CHUNK_SIZE = 500
+MAX_COLUMN_WIDTH = 50
+
+# Optional summary sheet at the front of Excel reports
+SUMMARY_INCLUDE = 'include'
+SUMMARY_ONLY = 'only'
+SUMMARY_OPTIONS = {
+    SUMMARY_INCLUDE: 'Summary sheet and student sheets',
+    SUMMARY_ONLY: 'Summary sheet only',
+}
+SUMMARY_STATISTICS_HEADERS = [
+    'Total Tasks', 'Solved', 'Unsolved', 'Not Evaluated', 'Solved %', 'Unsolved %', 'Not Evaluated %',
+]
+SUMMARY_STATISTICS_KEYS = [
+    'total_tasks', 'solved_tasks', 'unsolved_tasks', 'unassigned_tasks',
+    'solved_percentage', 'unsolved_percentage', 'unassigned_percentage',
+]
+SUMMARY_COLUMN_WIDTHS = [20, 40, 14, 10, 20, 30] + [len(header) + 4 for header in SUMMARY_STATISTICS_HEADERS]
+
+# format -> (content type, file extension)
+REPORT_FORMATS = {
+    'xlsx': (XLSX_CONTENT_TYPE, 'xlsx'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Long format shared by CSV and Parquet: one row per student and task
+LONG_COLUMNS = [
+    'student', 'sts_number', 'gender', 'class', 'school', 'udise_code', 'taluka',
+    'assignment', 'subject', 'task_index', 'task', 'status',
+]
+LONG_STATUSES = {'solved': 'SOLVED', 'unsolved': 'UNSOLVED', None: 'NOT EVALUATED'}
+CSV_LINES_PER_CHUNK = 1000
+PARQUET_BATCH_SIZE = 50000
+
+
+def available_formats():
+    """Report formats this installation can produce"""
+    return [name for name in REPORT_FORMATS if name != 'parquet' or pyarrow is not None]
+
+
+def report_assignments(scope):
+    """Assignments covered by a report, one worksheet or block of rows each"""
+    if scope.assignment:
+        return [scope.assignment]
+    # Assignments matching the filters for standards present in the user's scope
+    return scope.assignments().select_related('subject').distinct().order_by('standard', 'subject__name', 'title')
+
+
+def write_excel_report(scope, file, summary=''):
+    """Write the student report for a StatisticsScope to `file` as XLSX.
+
+    Uses openpyxl's write-only mode: rows are serialized as they are
+    appended and students are read with a server-side iterator, so memory
+    stays flat however many students the scope covers. `file` may be a
+    path or a binary file object. `summary` is one of SUMMARY_OPTIONS to
+    put a summary sheet first, optionally without the student sheets.
+    """
+    wb = Workbook(write_only=True)
+    if summary:
+        _write_summary_sheet(wb, scope)
+        if summary == SUMMARY_ONLY:
+            wb.save(file)
+            return
+
+    students = _report_students(scope)
+
+    if scope.assignment:
+        # Single assignment selected - create one worksheet
+        assignment = scope.assignment
+        title = f"{assignment.title[:20]}..."[:31] if len(assignment.title) > 20 else assignment.title
+        _write_assignment_sheet(wb, title, students, assignment)
+    else:
+        assignments = list(report_assignments(scope))
+
+        if not assignments:
+            ws = wb.create_sheet("No Assignments Found")
+            ws.append(["No assignments found matching the selected criteria."])
+
+        workers = min(settings.REPORT_WORKERS, len(assignments))
+        # Worker processes can't see the rows of an open transaction
+        if workers > 1 and not connection.in_atomic_block:
+            _write_assignment_sheets_parallel(wb, scope, assignments, workers)
+        else:
+            for assignment in assignments:
+                _write_assignment_sheet(wb, _sheet_title(assignment), students.filter(standard=assignment.standard), assignment)
+
+    wb.save(file)
+
+
+def _report_students(scope):
+    return scope.students().select_related('school', 'school__taluka').order_by('name', 'id')
+
+
+def _sheet_title(assignment):
+    # Worksheet names are limited to 31 characters by Excel
+    return f"Class{assignment.standard}-{assignment.subject.name[:10]}-{assignment.title[:10]}"[:31]
+
+
+def _assignment_headers(assignment):
+    headers = list(STUDENT_HEADERS)
+    for i, task in enumerate(assignment.tasks):
+        headers.append(f'Task {i+1}: {task[:30]}...' if len(task) > 30 else f'Task {i+1}: {task}')
+    return headers
+
+
+def _assignment_rows(students, assignment):
+    """Yield the student rows of an assignment worksheet"""
+    # One query per sheet; the compact status strings are decoded row by row
+    task_count = len(assignment.tasks)
+    statuses_by_student = evaluation_statuses(assignment, students)
+    for student in students.iterator(chunk_size=STUDENT_CHUNK_SIZE):
+        statuses = decode_statuses(statuses_by_student.get(student.id), task_count)
+
+        yield [
+            student.name,
+            student.sts_number,
+            student.get_gender_display(),
+            f'Class {student.standard}',
+            student.school.name,
+            student.school.taluka.name,
+            *[(status or 'unsolved').upper() for status in statuses],
+        ]
+
+
+def _write_assignment_sheet(wb, title, students, assignment):
+    headers = _assignment_headers(assignment)
+    widths = _column_widths(students, assignment, headers)
+    _write_sheet(wb, title, headers, widths, _assignment_rows(students, assignment))
+
+
+def _write_sheet(wb, title, headers, widths, rows):
+    ws = wb.create_sheet(title)
+
+    # Write-only sheets need their widths before the first row is appended
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    ws.append(_header_cells(ws, headers))
+    for row in rows:
+        ws.append(row)
+
+
+def _write_assignment_sheets_parallel(wb, scope, assignments, workers):
+    """Prepare assignment worksheets in a process pool and add them to `wb` in order.
+
+    Each worker queries its assignment and spools the finished rows to a
+    temporary file in chunks; the parent streams them into the write-only
+    sheets as the workers complete, so memory stays flat here as well.
+    """
+    parameters = scope.to_parameters()
+    context = multiprocessing.get_context('spawn')
+    # Spawned workers start without Django. The initializer must come from a module
+    # that imports without it: unpickling anything from core.reports loads the models.
+    with tempfile.TemporaryDirectory() as directory, ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=setup_worker, initargs=(database_names(),)
+    ) as pool:
+        futures = [
+            pool.submit(_prepare_assignment_sheet, parameters, assignment.pk, directory)
+            for assignment in assignments
+        ]
+        for assignment, future in zip(assignments, futures):
+            widths, path = future.result()
+            _write_sheet(wb, _sheet_title(assignment), _assignment_headers(assignment), widths, _spooled_rows(path))
+
+
+def _prepare_assignment_sheet(parameters, assignment_id, directory):
+    """Process pool task: column widths and a spool file of one assignment's rows"""
+    try:
+        scope = StatisticsScope.from_parameters(parameters)
+        assignment = Assignment.objects.select_related('subject').get(pk=assignment_id)
+        students = _report_students(scope).filter(standard=assignment.standard)
+        widths = _column_widths(students, assignment, _assignment_headers(assignment))
+
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.rows', delete=False) as spool:
+            chunk = []
+            for row in _assignment_rows(students, assignment):
+                chunk.append(row)
+                if len(chunk) >= STUDENT_CHUNK_SIZE:
+                    pickle.dump(chunk, spool)
+                    chunk = []
+            pickle.dump(chunk, spool)
+        return widths, spool.name
+    finally:
+        connections.close_all()
+
+
+def _spooled_rows(path):
+    with open(path, 'rb') as spool:
+        while True:
+            try:
+                yield from pickle.load(spool)
+            except EOFError:
+                return
+
+
+def _header_cells(ws, headers):
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+        cells.append(cell)
+    return cells
+
+
+def _write_summary_sheet(wb, scope):
+    """Counts and rates per school x assignment and per taluka x subject.
+
+    Both tables come from one grouped query each over the TaskProgress
+    rollup, so the sheet costs the same however many students are covered.
+    """
+    ws = wb.create_sheet('Summary')
+    for col, width in enumerate(SUMMARY_COLUMN_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    title = WriteOnlyCell(ws, value='By School and Assignment')
+    title.font = Font(bold=True, size=12)
+    ws.append([title])
+    ws.append(_header_cells(ws, ['Taluka', 'School', 'UDISE Code', 'Class', 'Subject', 'Assignment']
+                            + SUMMARY_STATISTICS_HEADERS))
+    for row in grouped_statistics(scope, 'school_assignment'):
+        ws.append([
+            row['school__taluka__name'],
+            row['school__name'],
+            row['school__udise_code'],
+            f"Class {row['assignment__standard']}",
+            row['assignment__subject__name'],
+            row['assignment__title'],
+            *[row[key] for key in SUMMARY_STATISTICS_KEYS],
+        ])
+
+    ws.append([])
+    title = WriteOnlyCell(ws, value='By Taluka and Subject')
+    title.font = Font(bold=True, size=12)
+    ws.append([title])
+    ws.append(_header_cells(ws, ['Taluka', 'Subject'] + SUMMARY_STATISTICS_HEADERS))
+    for row in grouped_statistics(scope, 'taluka_subject'):
+        ws.append([
+            row['school__taluka__name'],
+            row['assignment__subject__name'],
+            *[row[key] for key in SUMMARY_STATISTICS_KEYS],
+        ])
+
+
+def _column_widths(students, assignment, headers):
+    """Column widths from the longest value of each column, measured in the database"""
+    longest = students.aggregate(
+        name_length=Max(Length('name')),
+        sts_number_length=Max(Length('sts_number')),
+        school_length=Max(Length('school__name')),
+        taluka_length=Max(Length('school__taluka__name')),
+    )
+    value_lengths = [
+        longest['name_length'] or 0,
+        longest['sts_number_length'] or 0,
+        max(len(label) for _, label in Student.GENDER_CHOICES),
+        len(f'Class {assignment.standard}'),
+        longest['school_length'] or 0,
+        longest['taluka_length'] or 0,
+    ] + [len('UNSOLVED')] * len(assignment.tasks)
+
+    return [
+        min(max(len(header), value_length) + 2, MAX_COLUMN_WIDTH)
+        for header, value_length in zip(headers, value_lengths)
+    ]
+
+
+def report_rows(scope):
+    """Yield LONG_COLUMNS tuples for every student and task of the report.
+
+    Each assignment is read with one query that joins the student's
+    compact status string, iterated in chunks (a server-side cursor on
+    PostgreSQL), so rows are produced without loading the scope in memory.
+    """
+    genders = dict(Student.GENDER_CHOICES)
+    for assignment in report_assignments(scope):
+        statuses = StudentEvaluation.objects.filter(
+            student=OuterRef('pk'),
+            assignment=assignment,
+        ).values('statuses')[:1]
+        students = scope.students().filter(standard=assignment.standard).annotate(
+            evaluation=Subquery(statuses)
+        ).order_by('name', 'id').values_list(
+            'name', 'sts_number', 'gender', 'standard',
+            'school__name', 'school__udise_code', 'school__taluka__name', 'evaluation',
+        )
+
+        tasks = assignment.tasks
+        for name, sts_number, gender, standard, school, udise_code, taluka, codes in students.iterator(
+            chunk_size=STUDENT_CHUNK_SIZE
+        ):
+            for index, status in enumerate(decode_statuses(codes, len(tasks))):
+                yield (
+                    name, sts_number, genders.get(gender, gender), standard, school, udise_code, taluka,
+                    assignment.title, assignment.subject.name, index, tasks[index], LONG_STATUSES[status],
+                )
+
+
+class _Echo:
+    """File-like object whose write() hands back the written line"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv_report(scope):
+    """Yield the long-format report as CSV text, a chunk of lines at a time"""
+    writer = csv.writer(_Echo())
+    lines = [writer.writerow(LONG_COLUMNS)]
+    for row in report_rows(scope):
+        lines.append(writer.writerow(row))
+        if len(lines) >= CSV_LINES_PER_CHUNK:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+def write_parquet_report(scope, file):
+    """Write the long-format report to `file` as Parquet, in columnar batches"""
+    if pyarrow is None:
+        raise RuntimeError('Parquet reports need the pyarrow package')
+
+    schema = pyarrow.schema([
+        (column, pyarrow.int16() if column in ('class', 'task_index') else pyarrow.string())
+        for column in LONG_COLUMNS
+    ])
+    with pyarrow.parquet.ParquetWriter(file, schema) as writer:
+        batch = []
+        for row in report_rows(scope):
+            batch.append(row)
+            if len(batch) >= PARQUET_BATCH_SIZE:
+                writer.write_batch(_record_batch(batch, schema))
+                batch = []
+        if batch:
+            writer.write_batch(_record_batch(batch, schema))
+
+
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def write_report(scope, file, report_format='xlsx', summary=''):
+    """Write a report in any of REPORT_FORMATS to a binary file object"""
+    if report_format == 'xlsx':
+        write_excel_report(scope, file, summary)
+    elif report_format == 'parquet':
+        write_parquet_report(scope, file)
+    elif report_format == 'csv':
+        for chunk in stream_csv_report(scope):
+            file.write(chunk.encode())
+    else:
+        raise ValueError(f'Unknown report format: {report_format}')
+
+
+def report_options(report_format, summary=''):
+    """Options that change the report file, for cache keys and job fingerprints"""
+    # Only Excel workbooks have a summary sheet
+    return [summary] if summary and report_format == 'xlsx' else []
+
+
+def cached_report(scope, report_format, file, summary=''):
+    """Write a report to `file`, from the report cache when the data hasn't changed.
+
+    Returns True on a cache hit. Freshly generated reports are cached
+    (size permitting) for the next identical request.
+    """
+    key = report_key(scope, report_format, *report_options(report_format, summary))
+    content = get_report(key)
+    if content is not None:
+        file.write(content)
+        return True
+
+    write_report(scope, file, report_format, summary)
+    if file.tell() <= settings.REPORT_CACHE_MAX_ENTRY_BYTES:
+        file.seek(0)
+        store_report(key, file.read())
+    return False
+
+
+def cache_csv_stream(scope):
+    """stream_csv_report() that serves from and fills the report cache"""
+    key = report_key(scope, 'csv')
+    content = get_report(key)
+    if content is not None:
+        yield content
+        return
+
+    chunks = []
+    size = 0
+    for chunk in stream_csv_report(scope):
+        chunk = chunk.encode()
+        yield chunk
+        # Stop collecting once the report can no longer fit in the cache
+        if chunks is not None:
+            size += len(chunk)
+            if size <= settings.REPORT_CACHE_MAX_ENTRY_BYTES:
+                chunks.append(chunk)
+            else:
+                chunks = None
+    if chunks is not None:
+        store_report(key, b''.join(chunks))
+
+
+def enqueue_report(scope, user, report_format='xlsx', summary=''):
+    """Report job for a scope, reusing an identical pending, running or recent one.
+
+    The data version is part of the fingerprint, so a finished job is not
+    handed out again once evaluations, students or assignments changed.
+    """
+    options = report_options(report_format, summary)
+    fingerprint = scope.fingerprint(report_format, *options, data_version(scope))
+    reuse_after = timezone.now() - timedelta(seconds=settings.REPORT_JOB_REUSE_SECONDS)
+    job = ReportJob.objects.filter(
+        Q(status__in=[ReportJob.PENDING, ReportJob.RUNNING]) |
+        Q(status=ReportJob.DONE, finished_at__gte=reuse_after),
+        fingerprint=fingerprint,
+    ).order_by('-created_at').first()
+
+    if job is None:
+        job = ReportJob.objects.create(
+            requested_by=user,
+            parameters=scope.to_parameters(),
+            format=report_format,
+            summary=options[0] if options else '',
+            fingerprint=fingerprint,
+        )
+    return job
+
+
+def claim_next_job():
+    """Mark the oldest pending job as running and return it, or None.
+
+    The status check is part of the UPDATE, so concurrent workers never
+    pick up the same job.
+    """
+    for job_id in ReportJob.objects.filter(status=ReportJob.PENDING).order_by('created_at').values_list('id', flat=True)[:10]:
+        claimed = ReportJob.objects.filter(id=job_id, status=ReportJob.PENDING).update(
+            status=ReportJob.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return ReportJob.objects.get(id=job_id)
+    return None
+
+
+def run_report_job(job):
+    """Generate the report of a claimed job into the configured file storage"""
+    try:
+        scope = StatisticsScope.from_parameters(job.parameters)
+        _, extension = REPORT_FORMATS[job.format]
+        with tempfile.TemporaryFile(suffix=f'.{extension}') as report:
+            cached_report(scope, job.format, report, job.summary)
+            report.seek(0)
+            timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
+            job.file.save(f'student_report_{job.pk}_{timestamp}.{extension}', File(report), save=False)
+        job.status = ReportJob.DONE
+    except Exception as e:
+        logger.exception('Report job %s failed', job.pk)
+        job.status = ReportJob.FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'error', 'finished_at'])
+    return job
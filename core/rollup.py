@@ -0,0 +1,118 @@
+# core/rollup.py
+from collections import defaultdict
+from django.db.models import Count, Sum
+from .models import Assignment, StudentEvaluation, TaskProgress
+from .task_statistics import StatisticsScope, status_count
+
+
+def compute_progress(district=None, school=None, standard=None, assignment=None, schools=None):
+    """Compute rollup rows from StudentEvaluation for the given restriction.
+
+    `schools` restricts it to a collection of school ids. Returns a dict
+    keyed by (school_id, standard, assignment_id) holding
+    total/solved/unsolved counts. Only grouped queries are issued.
+    """
+    scope = StatisticsScope(district=district, school=school, standard=standard, assignment=assignment)
+    students = scope.students()
+    assignments = Assignment.objects.filter(scope.assignment_filter())
+    evaluations = scope.evaluations()
+    if schools is not None:
+        students = students.filter(school__in=schools)
+        evaluations = evaluations.filter(student__school__in=schools)
+
+    # Number of students per (school, standard)
+    schools_by_standard = defaultdict(list)
+    for row in students.values('school_id', 'standard').annotate(count=Count('id')).order_by():
+        schools_by_standard[row['standard']].append((row['school_id'], row['count']))
+
+    # Evaluation counts per (school, assignment)
+    evaluation_counts = {}
+    for row in evaluations.values('student__school_id', 'assignment_id').annotate(
+        solved=Sum(status_count(StudentEvaluation.SOLVED)),
+        unsolved=Sum(status_count(StudentEvaluation.UNSOLVED)),
+    ).order_by():
+        evaluation_counts[(row['student__school_id'], row['assignment_id'])] = (row['solved'], row['unsolved'])
+
+    progress = {}
+    for assignment_id, assignment_standard, tasks in assignments.values_list('id', 'standard', 'tasks').order_by():
+        for school_id, student_count in schools_by_standard.get(assignment_standard, []):
+            solved, unsolved = evaluation_counts.get((school_id, assignment_id), (0, 0))
+            progress[(school_id, assignment_standard, assignment_id)] = {
+                'total_count': student_count * len(tasks or []),
+                'solved_count': solved,
+                'unsolved_count': unsolved,
+            }
+    return progress
+
+
+def refresh_progress(district=None, school=None, standard=None, assignment=None, schools=None):
+    """Recompute the rollup rows matching the given restriction.
+
+    Call inside the transaction that changed evaluations, students or
+    assignments so the rollup never drifts from the source rows. With no
+    arguments the whole table is rebuilt.
+    """
+    if schools is not None:
+        schools = list(schools)
+    progress = compute_progress(
+        district=district, school=school, standard=standard, assignment=assignment, schools=schools,
+    )
+    existing = TaskProgress.objects.all()
+    if district is not None:
+        existing = existing.filter(school__taluka__district=district)
+    if school is not None:
+        existing = existing.filter(school=school)
+    if schools is not None:
+        existing = existing.filter(school__in=schools)
+    if standard is not None:
+        existing = existing.filter(standard=standard)
+    if assignment is not None:
+        # Every standard: the assignment may have just moved to another one
+        existing = existing.filter(assignment=assignment)
+
+    # Drop rows whose school/standard/assignment combination no longer has students
+    stale_ids = [
+        row_id
+        for row_id, school_id, row_standard, assignment_id in existing.values_list(
+            'id', 'school_id', 'standard', 'assignment_id'
+        )
+        if (school_id, row_standard, assignment_id) not in progress
+    ]
+    if stale_ids:
+        TaskProgress.objects.filter(id__in=stale_ids).delete()
+
+    TaskProgress.objects.bulk_create(
+        [
+            TaskProgress(school_id=school_id, standard=row_standard, assignment_id=assignment_id, **counts)
+            for (school_id, row_standard, assignment_id), counts in progress.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['school', 'standard', 'assignment'],
+        update_fields=['total_count', 'solved_count', 'unsolved_count', 'updated_at'],
+    )
+    return len(progress)
+
+
+def verify_progress():
+    """Compare the rollup table with a fresh computation.
+
+    Returns a list of (key, expected, actual) tuples for every mismatch.
+    """
+    expected = compute_progress()
+    actual = {
+        (row['school_id'], row['standard'], row['assignment_id']): {
+            'total_count': row['total_count'],
+            'solved_count': row['solved_count'],
+            'unsolved_count': row['unsolved_count'],
+        }
+        for row in TaskProgress.objects.values(
+            'school_id', 'standard', 'assignment_id', 'total_count', 'solved_count', 'unsolved_count'
+        )
+    }
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        if expected.get(key) != actual.get(key):
+            mismatches.append((key, expected.get(key), actual.get(key)))
+    return mismatches
+
@@ -0,0 +1,62 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Assignment, School, Student, StudentEvaluation
+from .stats_cache import invalidate_on_commit
+
+
+@receiver(post_save, sender=StudentEvaluation)
+@receiver(post_delete, sender=StudentEvaluation)
+def student_evaluation_changed(sender, instance, **kwargs):
+    # The school is looked up once per transaction, for all evaluations together
+    invalidate_on_commit(student_ids=[instance.student_id])
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, instance, **kwargs):
+    invalidate_on_commit(school_ids=[instance.school_id])
+
+
+@receiver(pre_save, sender=School)
+def school_saving(sender, instance, **kwargs):
+    # A reassigned school leaves its old taluka and district
+    instance._previous_scope = None
+    if instance.pk:
+        instance._previous_scope = School.objects.filter(pk=instance.pk).values_list(
+            'taluka_id', 'taluka__district_id'
+        ).first()
+
+
+@receiver(post_save, sender=School)
+def school_saved(sender, instance, **kwargs):
+    taluka_id, district_id = getattr(instance, '_previous_scope', None) or (None, None)
+    invalidate_on_commit(
+        school_ids=[instance.pk], taluka_ids={instance.taluka_id, taluka_id} - {None},
+        district_ids={district_id} - {None},
+    )
+
+
+@receiver(pre_delete, sender=School)
+def school_deleting(sender, instance, **kwargs):
+    # Capture the taluka and district while the school still exists
+    district_id = School.objects.filter(pk=instance.pk).values_list('taluka__district_id', flat=True).first()
+    invalidate_on_commit(school_ids=[instance.pk], taluka_ids=[instance.taluka_id], district_ids=[district_id])
+
+
+@receiver(pre_save, sender=Assignment)
+def assignment_saving(sender, instance, **kwargs):
+    instance._previous_standard = None
+    if instance.pk:
+        instance._previous_standard = Assignment.objects.filter(pk=instance.pk).values_list(
+            'standard', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    standards = {instance.standard, getattr(instance, '_previous_standard', None)} - {None}
+    invalidate_on_commit(school_ids=School.objects.filter(
+        student__standard__in=standards,
+    ).values_list('id', flat=True).distinct())
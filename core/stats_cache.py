@@ -0,0 +1,141 @@
+# core/stats_cache.py
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from .models import School, Student
+from .report_cache import bump_data_versions
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'dashboard_stats'
+SCOPE_TYPES = ('district', 'taluka', 'school')
+LOOKUP_BATCH_SIZE = 1000
+
+# Pending invalidation of the current transaction, per thread like the connection
+_pending = threading.local()
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_STATS_CACHE_TIMEOUT', 300)
+
+
+def stats_key(scope_type, scope_id):
+    return f'{CACHE_PREFIX}:{scope_type}:{scope_id}'
+
+
+def _count(name):
+    key = f'{CACHE_PREFIX}:{name}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter was evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def get_statistics(scope_type, scope_id, compute):
+    """Return the cached statistics dict for a scope, computing it on a miss"""
+    key = stats_key(scope_type, scope_id)
+    statistics = cache.get(key)
+    if statistics is not None:
+        _count('hits')
+        logger.debug('Dashboard statistics cache hit for %s', key)
+        return statistics
+
+    _count('misses')
+    logger.debug('Dashboard statistics cache miss for %s', key)
+    statistics = compute()
+    cache.set(key, statistics, timeout=_timeout())
+    return statistics
+
+
+def invalidate_schools(schools, taluka_ids=(), district_ids=()):
+    """Evict the school, taluka and district entries covering the given schools.
+
+    Also bumps the report data versions of the same scopes, so cached
+    reports covering them are no longer served. The talukas and districts
+    of deleted schools cannot be looked up any more; callers capture them
+    before the delete and pass them in.
+    """
+    school_ids, taluka_ids, district_ids = set(schools), set(taluka_ids), set(district_ids)
+    for taluka_id, district_id in School.objects.filter(pk__in=school_ids).values_list(
+        'taluka_id', 'taluka__district_id'
+    ).distinct():
+        taluka_ids.add(taluka_id)
+        district_ids.add(district_id)
+
+    keys = [stats_key('school', school_id) for school_id in school_ids]
+    keys += [stats_key('taluka', taluka_id) for taluka_id in taluka_ids]
+    keys += [stats_key('district', district_id) for district_id in district_ids]
+    if keys:
+        cache.delete_many(keys)
+        logger.debug('Evicted %d dashboard statistics entries', len(keys))
+        bump_data_versions(school_ids, taluka_ids, district_ids)
+
+
+class PendingInvalidation:
+    """Scopes changed in one transaction, evicted together once it commits"""
+
+    def __init__(self):
+        self.school_ids = set()
+        self.taluka_ids = set()
+        self.district_ids = set()
+        self.student_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        school_ids = set(self.school_ids)
+        student_ids = list(self.student_ids)
+        for start in range(0, len(student_ids), LOOKUP_BATCH_SIZE):
+            school_ids.update(Student.objects.filter(
+                pk__in=student_ids[start:start + LOOKUP_BATCH_SIZE],
+            ).values_list('school_id', flat=True).distinct())
+        invalidate_schools(school_ids, self.taluka_ids, self.district_ids)
+
+
+def invalidate_on_commit(school_ids=(), taluka_ids=(), district_ids=(), student_ids=()):
+    """Evict the scopes of the given schools (or students' schools) after commit.
+
+    Evicting after commit keeps a concurrent reader from re-caching
+    uncommitted numbers. All ids passed during one transaction are
+    collected and evicted by a single on_commit callback; outside a
+    transaction they are evicted at once.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(_pending, 'invalidation', None)
+    # A rollback discards the callback without running it
+    registered = pending is not None and not pending.done and any(
+        callback is pending for _, callback, _ in connection.run_on_commit
+    )
+    if not registered:
+        pending = _pending.invalidation = PendingInvalidation()
+    pending.school_ids.update(school_ids)
+    pending.taluka_ids.update(taluka_ids)
+    pending.district_ids.update(district_ids)
+    pending.student_ids.update(student_ids)
+    if not registered:
+        transaction.on_commit(pending)
+
+
+def cache_counters():
+    hits = cache.get(f'{CACHE_PREFIX}:hits', 0)
+    misses = cache.get(f'{CACHE_PREFIX}:misses', 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups * 100, 1) if lookups else 0,
+    }
+
+
+def is_per_process():
+    """Whether the cache lives in each process's own memory, so counters and evictions aren't shared"""
+    return isinstance(caches['default'], LocMemCache)
+
+
+def reset_counters():
+    cache.delete_many([f'{CACHE_PREFIX}:hits', f'{CACHE_PREFIX}:misses'])
@@ -0,0 +1,278 @@
+# core/task_statistics.py
+import hashlib
+import json
+from collections import defaultdict
+from datetime import date
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Length, NullIf, Replace
+from .models import (
+    Assignment, District, School, Student, StudentEvaluation, Subject, Taluka, TaskProgress
+)
+
+# Scope attributes holding model instances, serialized by primary key
+SCOPE_MODELS = {
+    'district': District,
+    'taluka': Taluka,
+    'school': School,
+    'subject': Subject,
+    'assignment': Assignment,
+}
+
+
+class StatisticsScope:
+    """Students and assignments covered by a statistics query.
+
+    Every filter is applied as a join condition, so no id lists are ever
+    pulled into Python or bound as query parameters.
+    """
+
+    def __init__(self, district=None, taluka=None, school=None, standard=None,
+                 subject=None, start_date=None, end_date=None, assignment=None):
+        self.district = district
+        self.taluka = taluka
+        self.school = school
+        self.standard = int(standard) if standard else None
+        self.subject = subject
+        self.start_date = start_date
+        self.end_date = end_date
+        self.assignment = assignment
+
+    @classmethod
+    def for_role(cls, role, **filters):
+        """Scope limited to the district, taluka or school of a request.role.
+
+        Raises PermissionDenied for a role without its profile (and so
+        without a scope), rather than returning an unlimited scope.
+        """
+        filters = {key: value for key, value in filters.items() if value}
+        if role.is_principal:
+            name, limit = 'school', role.school
+        elif role.is_beo:
+            name, limit = 'taluka', role.taluka
+        elif role.is_ddpi:
+            name, limit = 'district', role.district
+        else:
+            return cls(**filters)
+        if limit is None:
+            raise PermissionDenied("Your account has no profile for its role.")
+        filters.setdefault(name, limit)
+        return cls(**filters)
+
+    def to_parameters(self):
+        """JSON-serializable form of the scope (ids and ISO dates)"""
+        parameters = {}
+        for name in SCOPE_MODELS:
+            value = getattr(self, name)
+            if value is not None:
+                parameters[name] = getattr(value, 'pk', value)
+        if self.standard is not None:
+            parameters['standard'] = self.standard
+        for name in ('start_date', 'end_date'):
+            value = getattr(self, name)
+            if value is not None:
+                parameters[name] = value.isoformat()
+        return parameters
+
+    @classmethod
+    def from_parameters(cls, parameters):
+        """Inverse of to_parameters(); raises DoesNotExist for deleted objects"""
+        filters = {}
+        for name, model in SCOPE_MODELS.items():
+            if name in parameters:
+                filters[name] = model.objects.get(pk=parameters[name])
+        for name in ('start_date', 'end_date'):
+            if name in parameters:
+                filters[name] = date.fromisoformat(parameters[name])
+        return cls(standard=parameters.get('standard'), **filters)
+
+    def fingerprint(self, *extra):
+        """Stable hash of the scope (plus any extra values) for deduplication"""
+        payload = json.dumps([self.to_parameters(), *extra], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def student_filter(self, prefix=''):
+        """Q over Student-like fields (school, standard) with an optional join prefix"""
+        q = Q()
+        if self.district is not None:
+            q &= Q(**{f'{prefix}school__taluka__district': self.district})
+        if self.taluka is not None:
+            q &= Q(**{f'{prefix}school__taluka': self.taluka})
+        if self.school is not None:
+            q &= Q(**{f'{prefix}school': self.school})
+        if self.standard is not None:
+            q &= Q(**{f'{prefix}standard': self.standard})
+        if self.assignment is not None:
+            q &= Q(**{f'{prefix}standard': self.assignment.standard})
+        return q
+
+    def assignment_filter(self, prefix=''):
+        """Q over Assignment fields with an optional join prefix"""
+        q = Q()
+        if self.standard is not None:
+            q &= Q(**{f'{prefix}standard': self.standard})
+        if self.subject is not None:
+            q &= Q(**{f'{prefix}subject': self.subject})
+        if self.start_date is not None:
+            q &= Q(**{f'{prefix}start_date__gte': self.start_date})
+        if self.end_date is not None:
+            q &= Q(**{f'{prefix}end_date__lte': self.end_date})
+        if self.assignment is not None:
+            q &= Q(**{f'{prefix}pk': self.assignment.pk})
+        return q
+
+    def students(self):
+        return Student.objects.filter(self.student_filter())
+
+    def assignments(self):
+        """Assignments matching the filters for standards that have students in scope"""
+        return Assignment.objects.filter(
+            self.assignment_filter(),
+            standard__in=self.students().values('standard'),
+        )
+
+    def evaluations(self):
+        return StudentEvaluation.objects.filter(
+            self.student_filter('student__'),
+            self.assignment_filter('assignment__'),
+            assignment__standard=F('student__standard'),
+        )
+
+    def progress(self):
+        # TaskProgress carries school and standard just like Student
+        return TaskProgress.objects.filter(
+            self.student_filter(),
+            self.assignment_filter('assignment__'),
+        )
+
+
+def status_count(code, field='statuses'):
+    """Number of tasks with status `code` in a StudentEvaluation.statuses column"""
+    return Length(field) - Length(Replace(field, Value(code), Value('')))
+
+
+def summarize(total_tasks, solved_tasks, unsolved_tasks):
+    """Build the statistics dict shown on the dashboard and reports"""
+    unassigned_tasks = max(total_tasks - solved_tasks - unsolved_tasks, 0)
+    return {
+        'total_tasks': total_tasks,
+        'solved_tasks': solved_tasks,
+        'unsolved_tasks': unsolved_tasks,
+        'unassigned_tasks': unassigned_tasks,
+        'solved_percentage': round((solved_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1),
+        'unsolved_percentage': round((unsolved_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1),
+        'unassigned_percentage': round((unassigned_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1),
+    }
+
+
+def task_statistics(scope):
+    """Compute statistics for a scope directly from Student/Assignment/StudentEvaluation"""
+    students_by_standard = defaultdict(int)
+    for row in scope.students().values('standard').annotate(count=Count('id')).order_by():
+        students_by_standard[row['standard']] = row['count']
+
+    total_tasks = 0
+    for standard, tasks in scope.assignments().values_list('standard', 'tasks').order_by():
+        total_tasks += students_by_standard[standard] * len(tasks or [])
+
+    counts = scope.evaluations().aggregate(
+        solved=Sum(status_count(StudentEvaluation.SOLVED)),
+        unsolved=Sum(status_count(StudentEvaluation.UNSOLVED)),
+    )
+    return summarize(total_tasks, counts['solved'] or 0, counts['unsolved'] or 0)
+
+
+def rollup_statistics(scope):
+    """Same numbers as task_statistics(), read from the TaskProgress rollup"""
+    totals = scope.progress().aggregate(
+        total=Sum('total_count'),
+        solved=Sum('solved_count'),
+        unsolved=Sum('unsolved_count'),
+    )
+    return summarize(totals['total'] or 0, totals['solved'] or 0, totals['unsolved'] or 0)
+
+
+# Child scope levels of the drill-down: (group by field, display name field)
+BREAKDOWN_LEVELS = {
+    'taluka': ('school__taluka_id', 'school__taluka__name'),
+    'school': ('school_id', 'school__name'),
+    'standard': ('standard', 'standard'),
+}
+
+BREAKDOWN_SORTS = (
+    'name', 'total_tasks', 'solved_tasks', 'unsolved_tasks', 'unassigned_tasks',
+    'solved_percentage', 'unsolved_percentage', 'unassigned_percentage',
+)
+
+
+def breakdown_statistics(scope, level, sort='name', descending=False, limit=None):
+    """Statistics for every child scope at `level` in one grouped rollup query.
+
+    Sorting and top-N limiting happen in the database, so only `limit`
+    rows are returned even for districts with thousands of schools.
+    """
+    id_field, name_field = BREAKDOWN_LEVELS[level]
+    rows = scope.progress().values(id_field).annotate(
+        total_tasks=Sum('total_count'),
+        solved_tasks=Sum('solved_count'),
+        unsolved_tasks=Sum('unsolved_count'),
+    ).annotate(
+        unassigned_tasks=F('total_tasks') - F('solved_tasks') - F('unsolved_tasks'),
+        solved_percentage=_percentage('solved_tasks'),
+        unsolved_percentage=_percentage('unsolved_tasks'),
+        unassigned_percentage=_percentage('unassigned_tasks'),
+    )
+    if name_field != id_field:
+        rows = rows.annotate(name=F(name_field))
+
+    sort_field = name_field if sort == 'name' else sort
+    order = F(sort_field).desc(nulls_last=True) if descending else F(sort_field).asc(nulls_last=True)
+    rows = rows.order_by(order, id_field)
+    if limit:
+        rows = rows[:limit]
+
+    breakdown = []
+    for row in rows:
+        breakdown.append({
+            'id': row[id_field],
+            'name': row['name'] if name_field != id_field else f'Class {row[id_field]}',
+            **summarize(row['total_tasks'] or 0, row['solved_tasks'] or 0, row['unsolved_tasks'] or 0),
+        })
+    return breakdown
+
+
+# Groupings of the report summary sheet; ids keep same-named schools apart
+SUMMARY_GROUPS = {
+    'school_assignment': (
+        'school__taluka__name', 'school__name', 'school__udise_code', 'school_id',
+        'assignment__standard', 'assignment__subject__name', 'assignment__title', 'assignment_id',
+    ),
+    'taluka_subject': (
+        'school__taluka__name', 'school__taluka_id', 'assignment__subject__name', 'assignment__subject_id',
+    ),
+}
+
+
+def grouped_statistics(scope, group):
+    """Statistics per distinct combination of a SUMMARY_GROUPS entry in one grouped rollup query"""
+    fields = SUMMARY_GROUPS[group]
+    rows = scope.progress().values(*fields).annotate(
+        total_tasks=Sum('total_count'),
+        solved_tasks=Sum('solved_count'),
+        unsolved_tasks=Sum('unsolved_count'),
+    ).order_by(*fields)
+
+    return [
+        {
+            **{field: row[field] for field in fields},
+            **summarize(row['total_tasks'] or 0, row['solved_tasks'] or 0, row['unsolved_tasks'] or 0),
+        }
+        for row in rows
+    ]
+
+
+def _percentage(field):
+    return ExpressionWrapper(
+        Cast(F(field), FloatField()) * 100 / NullIf(F('total_tasks'), 0),
+        output_field=FloatField(),
+    )
@@ -1,3 +1,1307 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import UTC, date, datetime
+from importlib import import_module
+from unittest import mock, skipIf
+import openpyxl
+import pandas as pd
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import FileResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .data_loading import (
+    bulk_load_schools, bulk_load_students, copy_load_schools, copy_load_students, file_checksum, read_schools,
+    school_rows, student_rows,
+)
+from .middleware import resolve_role
+from .models import (
+    District, Taluka, Subject, School, Student, Assignment, TaskEvaluation, StudentEvaluation, TaskProgress,
+    BEOProfile, DDPIProfile, PrincipalProfile, ReportJob, LoadCheckpoint, DataVersion, CachedReport
+)
+from .report_cache import bump_data_versions, data_version, get_report, store_report
+from .reports import SUMMARY_ONLY, pyarrow, write_excel_report
+from .rollup import refresh_progress, verify_progress
+from .stats_cache import is_per_process, stats_key
+from .task_statistics import StatisticsScope, rollup_statistics, summarize, task_statistics
 
-# Create your tests here.
+
+class EvaluateAssignmentViewTests(TestCase):
+    def setUp(self):
+        district = District.objects.create(name='BELAGAVI')
+        taluka = Taluka.objects.create(name='ATHANI', district=district)
+        self.school = School.objects.create(
+            udise_code='29010100101', name='GHPS Athani', taluka=taluka,
+            type='coed', school_type='Government', location='rural', medium='kannada',
+        )
+        self.principal = User.objects.create_user(username='29010100101', password='secret')
+        self.principal.groups.add(Group.objects.create(name='Principal'))
+        PrincipalProfile.objects.create(user=self.principal, school=self.school)
+        self.assignment = Assignment.objects.create(
+            title='Fractions', tasks=[f'Task {i}' for i in range(10)],
+            subject=Subject.objects.create(name='Maths'), standard=5,
+            start_date=date(2025, 6, 1), end_date=date(2025, 6, 30), created_by=self.principal,
+        )
+        self.client.force_login(self.principal)
+
+    def add_students(self, count):
+        for i in range(count):
+            student = Student.objects.create(
+                name=f'Student {Student.objects.count()}', sts_number=str(Student.objects.count()),
+                gender='female', standard=5, school=self.school,
+            )
+            statuses = ['-'] * 10
+            statuses[i % 10] = 'S'
+            StudentEvaluation.objects.create(
+                student=student, assignment=self.assignment,
+                statuses=''.join(statuses), evaluated_by=self.principal,
+            )
+
+    def count_queries(self):
+        url = reverse('evaluate_assignment', args=[self.assignment.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        self.add_students(2)
+        small_class_queries, _ = self.count_queries()
+
+        self.add_students(58)
+        large_class_queries, response = self.count_queries()
+
+        self.assertEqual(small_class_queries, large_class_queries)
+        self.assertEqual(len(response.context['rows']), 60)
+
+    def test_grid_rows_carry_saved_statuses(self):
+        self.add_students(3)
+        _, response = self.count_queries()
+
+        for row in response.context['rows']:
+            statuses = [cell['status'] for cell in row['cells']]
+            self.assertEqual(len(statuses), 10)
+            self.assertEqual(statuses.count('solved'), 1)
+
+    def test_save_writes_only_changed_cells(self):
+        self.add_students(3)
+        url = reverse('evaluate_assignment', args=[self.assignment.pk])
+        students = list(Student.objects.filter(school=self.school).order_by('id'))
+        data = {f'student_{student.id}_task_0': 'solved' for student in students}
+
+        # 27 new cells, plus the saved task 1 and task 2 cells flipping to unsolved
+        response = self.client.post(url, data, follow=True)
+        self.assertContains(response, '29 cells changed')
+        self.assertEqual(
+            list(StudentEvaluation.objects.values_list('statuses', flat=True)), ['SUUUUUUUUU'] * 3
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(any(query['sql'].startswith(('INSERT', 'UPDATE')) for query in queries))
+
+        progress = TaskProgress.objects.get(school=self.school, assignment=self.assignment)
+        self.assertEqual((progress.total_count, progress.solved_count, progress.unsolved_count), (30, 3, 27))
+
+    def post_cells(self, cells):
+        url = reverse('evaluate_assignment_cells', args=[self.assignment.pk])
+        return self.client.post(url, json.dumps({'cells': cells}), content_type='application/json')
+
+    def test_cell_endpoint_saves_only_sent_cells(self):
+        self.add_students(60)
+        student = Student.objects.filter(school=self.school).order_by('id').first()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_cells([
+                {'student_id': student.id, 'task_index': 0, 'status': 'unsolved'},
+                {'student_id': student.id, 'task_index': 1, 'status': 'solved'},
+            ])
+        self.assertEqual(response.json(), {'changed': 2})
+        self.assertLess(len(queries), 20)
+        self.assertEqual(StudentEvaluation.objects.get(student=student).statuses, 'US--------')
+        self.assertEqual(StudentEvaluation.objects.count(), 60)
+
+    def test_cell_endpoint_rejects_cells_outside_the_grid(self):
+        self.add_students(1)
+        other_school = School.objects.create(
+            udise_code='29010100102', name='GHPS Other', taluka=self.school.taluka,
+            type='coed', school_type='Government', location='rural', medium='kannada',
+        )
+        outsider = Student.objects.create(
+            name='Outsider', sts_number='x1', gender='male', standard=5, school=other_school,
+        )
+
+        response = self.post_cells([{'student_id': outsider.id, 'task_index': 0, 'status': 'solved'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post_cells([{'student_id': 'a'}]).status_code, 400)
+        self.assertFalse(StudentEvaluation.objects.filter(student=outsider).exists())
+
+
+class ResolveRoleTests(TestCase):
+    def setUp(self):
+        self.district = District.objects.create(name='BELAGAVI')
+        self.taluka = Taluka.objects.create(name='ATHANI', district=self.district)
+        self.school = School.objects.create(
+            udise_code='29010100101', name='GHPS Athani', taluka=self.taluka,
+            type='coed', school_type='Government', location='rural', medium='kannada',
+        )
+
+    def user(self, username, group=None, **profile):
+        user = User.objects.create_user(username=username)
+        if group:
+            user.groups.add(Group.objects.get_or_create(name=group)[0])
+        profile_models = {'DDPI': DDPIProfile, 'BEO': BEOProfile, 'Principal': PrincipalProfile}
+        if profile:
+            profile_models[group].objects.create(user=user, **profile)
+        # A fresh instance, as the authentication middleware would load it
+        return User.objects.get(pk=user.pk)
+
+    def resolve(self, user):
+        # Groups, profile and the whole district/taluka/school chain in one query
+        with self.assertNumQueries(1):
+            role = resolve_role(user)
+            scope = (role.name, role.district_id, role.taluka_id, role.school_id)
+            names = [getattr(role, name).name for name in ('district', 'taluka', 'school') if getattr(role, name)]
+        return scope, names
+
+    def test_principal(self):
+        user = self.user('29010100101', 'Principal', school=self.school)
+        self.assertEqual(self.resolve(user), (
+            ('Principal', self.district.pk, self.taluka.pk, self.school.pk), ['BELAGAVI', 'ATHANI', 'GHPS Athani'],
+        ))
+
+    def test_beo(self):
+        user = self.user('athani', 'BEO', taluka=self.taluka)
+        self.assertEqual(self.resolve(user), (('BEO', self.district.pk, self.taluka.pk, None), ['BELAGAVI', 'ATHANI']))
+
+    def test_ddpi(self):
+        user = self.user('belagavi_ddpi', 'DDPI', district=self.district)
+        self.assertEqual(self.resolve(user), (('DDPI', self.district.pk, None, None), ['BELAGAVI']))
+
+    def test_no_role(self):
+        self.assertEqual(self.resolve(self.user('superadmin')), ((None, None, None, None), []))
+        # A group without its profile still resolves, without a scope
+        self.assertEqual(self.resolve(self.user('new-beo', 'BEO')), (('BEO', None, None, None), []))
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_role(AnonymousUser()).name)
+
+
+class ConvertTaskEvaluationsMigrationTests(TransactionTestCase):
+    before = [('core', '0005_studentevaluation')]
+    after = [('core', '0006_convert_task_evaluations')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_task_rows_are_packed_and_unpacked(self):
+        apps = self.migrate(self.before)
+        district = apps.get_model('core', 'District').objects.create(name='BELAGAVI')
+        school = apps.get_model('core', 'School').objects.create(
+            udise_code='29010100101', name='GHPS Athani',
+            taluka=apps.get_model('core', 'Taluka').objects.create(name='ATHANI', district=district),
+            type='coed', school_type='Government', location='rural', medium='kannada',
+        )
+        user = apps.get_model('auth', 'User').objects.create(username='beo-athani')
+        assignment = apps.get_model('core', 'Assignment').objects.create(
+            title='Worksheet 5', tasks=['Add', 'Subtract', 'Multiply', 'Divide'],
+            subject=apps.get_model('core', 'Subject').objects.create(name='Maths'), standard=5,
+            start_date=date(2025, 6, 1), end_date=date(2025, 6, 30), created_by=user,
+        )
+        Student = apps.get_model('core', 'Student')
+        asha, basu, chand = [
+            Student.objects.create(name=name, sts_number=str(number), gender='female', standard=5, school=school)
+            for number, name in enumerate(['Asha', 'Basu', 'Chand'])
+        ]
+        TaskEvaluation = apps.get_model('core', 'TaskEvaluation')
+        # Task 1 of Asha and the first task of Basu were never evaluated, Chand has no rows
+        rows = [(asha, 0, 'solved', 1), (asha, 2, 'unsolved', 3), (asha, 3, 'solved', 2), (basu, 1, 'unsolved', 1)]
+        for student, task_index, status, day in rows:
+            evaluation = TaskEvaluation.objects.create(
+                student=student, assignment=assignment, task_index=task_index, status=status, evaluated_by=user,
+            )
+            TaskEvaluation.objects.filter(pk=evaluation.pk).update(evaluated_at=datetime(2025, 6, day, tzinfo=UTC))
+
+        apps = self.migrate(self.after)
+        self.assertEqual(
+            sorted(apps.get_model('core', 'StudentEvaluation').objects.values_list(
+                'student__name', 'statuses', 'evaluated_at__day',
+            )),
+            [('Asha', 'S-US', 3), ('Basu', '-U', 1)],
+        )
+        self.assertFalse(apps.get_model('core', 'TaskEvaluation').objects.exists())
+
+        apps = self.migrate(self.before)
+        self.assertEqual(
+            sorted(apps.get_model('core', 'TaskEvaluation').objects.values_list(
+                'student__name', 'task_index', 'status', 'evaluated_by__username',
+            )),
+            [('Asha', 0, 'solved', 'beo-athani'), ('Asha', 2, 'unsolved', 'beo-athani'),
+             ('Asha', 3, 'solved', 'beo-athani'), ('Basu', 1, 'unsolved', 'beo-athani')],
+        )
+        self.assertFalse(apps.get_model('core', 'StudentEvaluation').objects.exists())
+
+
+class ReportTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(caches['reports'].clear)
+        # Commit the invalidation queued by the fixtures, so tests capture only their own
+        with self.captureOnCommitCallbacks(execute=True):
+            district = District.objects.create(name='BELAGAVI')
+            self.taluka = Taluka.objects.create(name='ATHANI', district=district)
+            self.school = School.objects.create(
+                udise_code='29010100101', name='GHPS Athani', taluka=self.taluka,
+                type='coed', school_type='Government', location='rural', medium='kannada',
+            )
+            self.beo = User.objects.create_user(username='beo-athani', password='secret')
+            self.beo.groups.add(Group.objects.create(name='BEO'))
+            BEOProfile.objects.create(user=self.beo, taluka=self.taluka)
+            subject = Subject.objects.create(name='Maths')
+            self.assignments = [
+                Assignment.objects.create(
+                    title=f'Worksheet {standard}', tasks=['Add', 'Subtract', 'Multiply'],
+                    subject=subject, standard=standard,
+                    start_date=date(2025, 6, 1), end_date=date(2025, 6, 30), created_by=self.beo,
+                )
+                for standard in (5, 6)
+            ]
+        self.client.force_login(self.beo)
+
+    def add_students(self, count):
+        # Run the on-commit cache invalidation that a real commit would trigger
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_students(count)
+
+    def _add_students(self, count):
+        for i in range(count):
+            number = Student.objects.count()
+            student = Student.objects.create(
+                name=f'Student {number:03d}', sts_number=str(number), gender='male',
+                standard=5 + number % 2, school=self.school,
+            )
+            StudentEvaluation.objects.create(
+                student=student, assignment=self.assignments[number % 2],
+                statuses='SU', evaluated_by=self.beo,
+            )
+
+
+class ExcelReportTests(ReportTestCase):
+    def download(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('reports'), {'download': '1'})
+            workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        return len(queries), workbook
+
+    def test_query_count_does_not_grow_with_students(self):
+        self.add_students(4)
+        small_report_queries, _ = self.download()
+
+        self.add_students(40)
+        large_report_queries, workbook = self.download()
+
+        self.assertEqual(small_report_queries, large_report_queries)
+        self.assertEqual([sheet.max_row for sheet in workbook], [23, 23])
+        first_row = [cell.value for cell in workbook.worksheets[0][2]]
+        self.assertEqual(first_row[6:], ['SOLVED', 'UNSOLVED', 'UNSOLVED'])
+
+    def test_summary_sheet_from_grouped_counts(self):
+        self.add_students(4)
+        refresh_progress()
+        response = self.client.post(reverse('reports'), {'download': '1', 'format': 'xlsx', 'summary': 'only'})
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(workbook.sheetnames, ['Summary'])
+
+        rows = [[cell.value for cell in row] for row in workbook['Summary'].iter_rows()]
+        # Two students per class, each with 1 of 3 tasks solved and 1 unsolved
+        self.assertEqual(rows[2], [
+            'ATHANI', 'GHPS Athani', '29010100101', 'Class 5', 'Maths', 'Worksheet 5', 6, 2, 2, 2, 33.3, 33.3, 33.3,
+        ])
+        self.assertEqual(rows[3][5], 'Worksheet 6')
+        self.assertEqual(rows[7][:9], ['ATHANI', 'Maths', 12, 4, 4, 4, 33.3, 33.3, 33.3])
+
+        response = self.client.post(reverse('reports'), {'download': '1', 'format': 'xlsx', 'summary': 'include'})
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(workbook.sheetnames), 3)
+        self.assertEqual(workbook.sheetnames[0], 'Summary')
+
+
+class ReportJobTests(ReportTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def enqueue(self, **filters):
+        response = self.client.post(reverse('report_jobs'), filters)
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_identical_filters_reuse_the_job(self):
+        first = self.enqueue(standard='5')
+        self.assertEqual(self.enqueue(standard='5')['id'], first['id'])
+        self.assertNotEqual(self.enqueue(standard='6')['id'], first['id'])
+
+    def test_worker_generates_a_downloadable_report(self):
+        self.add_students(4)
+        job = self.enqueue()
+        self.assertEqual(job['status'], ReportJob.PENDING)
+
+        # Between jobs the worker drops connections left in a transaction, which would end the
+        # test's own; the test client leaves them open for requests in the same way
+        with mock.patch('core.management.commands.run_report_jobs.close_old_connections'):
+            call_command('run_report_jobs', '--once', stdout=io.StringIO())
+
+        job = self.client.get(job['status_url']).json()
+        self.assertEqual(job['status'], ReportJob.DONE)
+        response = self.client.get(job['download_url'])
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual([sheet.max_row for sheet in workbook], [3, 3])
+
+        # A finished job is handed out again for the same filters
+        self.assertEqual(self.enqueue()['id'], job['id'])
+
+    def test_jobs_are_limited_to_the_role_scope(self):
+        job = self.enqueue()
+        other_taluka = Taluka.objects.create(name='GOKAK', district=self.taluka.district)
+        other_beo = User.objects.create_user(username='beo-gokak', password='secret')
+        other_beo.groups.add(Group.objects.get(name='BEO'))
+        BEOProfile.objects.create(user=other_beo, taluka=other_taluka)
+
+        self.client.force_login(other_beo)
+        self.assertEqual(self.client.get(job['status_url']).status_code, 403)
+
+    def test_role_without_its_profile_is_refused(self):
+        job = self.enqueue()
+        new_beo = User.objects.create_user(username='new-beo', password='secret')
+        new_beo.groups.add(Group.objects.get(name='BEO'))
+
+        # No profile means no scope, not an unlimited one
+        with self.assertRaises(PermissionDenied):
+            StatisticsScope.for_role(resolve_role(new_beo))
+        self.client.force_login(new_beo)
+        self.assertEqual(self.client.get(job['status_url']).status_code, 403)
+        self.assertEqual(self.client.post(reverse('report_jobs')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('dashboard_breakdown')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('manage_schools')).status_code, 403)
+
+
+class LongFormatReportTests(ReportTestCase):
+    def download(self, report_format):
+        response = self.client.post(reverse('reports'), {'download': '1', 'format': report_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_has_one_row_per_student_and_task(self):
+        self.add_students(4)
+        rows = list(csv.reader(io.StringIO(self.download('csv').decode())))
+
+        self.assertEqual(rows[0][-3:], ['task_index', 'task', 'status'])
+        self.assertEqual(len(rows), 1 + 4 * 3)
+        self.assertEqual(
+            [row[-1] for row in rows[1:4]], ['SOLVED', 'UNSOLVED', 'NOT EVALUATED']
+        )
+
+    @skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_matches_csv(self):
+        self.add_students(6)
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(self.download('parquet')))
+        rows = list(csv.reader(io.StringIO(self.download('csv').decode())))
+
+        self.assertEqual(table.column_names, rows[0])
+        self.assertEqual(table.num_rows, len(rows) - 1)
+        self.assertEqual(table.column('status').to_pylist(), [row[-1] for row in rows[1:]])
+
+
+class ReportCacheTests(ReportTestCase):
+    def download(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('reports'), {'download': '1', 'format': 'csv'})
+            content = b''.join(response.streaming_content)
+        return len(queries), content
+
+    def test_repeat_download_is_served_from_cache_until_data_changes(self):
+        self.add_students(3)
+        first_queries, first = self.download()
+        cached_queries, cached = self.download()
+        self.assertEqual(cached, first)
+        self.assertLess(cached_queries, first_queries)
+
+        # Any evaluation, student or assignment change in the scope bumps its data version
+        self.add_students(1)
+        _, refreshed = self.download()
+        self.assertEqual(refreshed.count(b'\n'), first.count(b'\n') + 3)
+
+    def add_school(self):
+        school = School.objects.create(
+            udise_code='29010100102', name='GUPS Athani', taluka=self.taluka,
+            type='coed', school_type='Government', location='urban', medium='urdu',
+        )
+        student = Student.objects.create(name='Other', sts_number='900', gender='male', standard=5, school=school)
+        StudentEvaluation.objects.create(
+            student=student, assignment=self.assignments[0], statuses='SS', evaluated_by=self.beo,
+        )
+        return school
+
+    def test_deleted_school_is_not_served_from_cache(self):
+        self.add_students(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            school = self.add_school()
+        _, first = self.download()
+        self.assertIn(b'GUPS Athani', first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            school.delete()
+        _, refreshed = self.download()
+        self.assertNotIn(b'GUPS Athani', refreshed)
+
+    def test_school_moved_to_another_taluka_is_not_served_from_cache(self):
+        self.add_students(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            school = self.add_school()
+        self.assertIn(b'GUPS Athani', self.download()[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            school.taluka = Taluka.objects.create(name='GOKAK', district=self.taluka.district)
+            school.save()
+        self.assertNotIn(b'GUPS Athani', self.download()[1])
+
+    def test_data_versions_are_shared_between_processes(self):
+        scope = StatisticsScope(school=self.school)
+        version = data_version(scope)
+        # Another process starts with its own, empty cache but reads the same versions
+        caches['reports'].clear()
+        self.assertEqual(data_version(scope), version)
+
+        # A write committed by another process retires the reports of its scopes
+        bump_data_versions([self.school.pk], [self.taluka.pk], [self.taluka.district_id])
+        self.assertNotEqual(data_version(scope), version)
+        self.assertEqual(
+            set(DataVersion.objects.values_list('scope_type', flat=True)), {'all', 'district', 'taluka', 'school'},
+        )
+
+    @override_settings(REPORT_CACHE_MAX_BYTES=25, REPORT_CACHE_MAX_ENTRY_BYTES=20)
+    def test_least_recently_used_reports_are_evicted_by_size(self):
+        store_report('report_cache:a', b'a' * 10)
+        store_report('report_cache:b', b'b' * 10)
+        get_report('report_cache:a')
+        store_report('report_cache:c', b'c' * 10)
+
+        self.assertIsNotNone(get_report('report_cache:a'))
+        self.assertIsNone(get_report('report_cache:b'))
+        self.assertIsNotNone(get_report('report_cache:c'))
+        self.assertFalse(store_report('report_cache:d', b'd' * 21))
+        self.assertEqual(sorted(CachedReport.objects.values_list('key', 'size')), [
+            ('report_cache:a', 10), ('report_cache:c', 10),
+        ])
+
+
+class StreamingExcelReportTests(ReportTestCase):
+    def test_report_is_streamed_from_a_temporary_file(self):
+        self.add_students(300)
+        response = self.client.post(reverse('reports'), {'download': '1', 'format': 'xlsx'})
+
+        self.assertIsInstance(response, FileResponse)
+        self.assertTrue(response.streaming)
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="student_report_\d+_\d+\.xlsx"$')
+        # Sent in blocks from the spooled file, not from an in-memory copy of the workbook
+        self.assertNotIsInstance(response.file_to_stream, io.BytesIO)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= response.block_size for chunk in chunks))
+
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(chunks)))
+        self.assertEqual([sheet.max_row for sheet in workbook], [151, 151])
+
+    def test_write_only_sheets_keep_header_style_and_column_widths(self):
+        self.add_students(2)
+        Student.objects.filter(sts_number='0').update(name='A' * 60)
+        output = io.BytesIO()
+        write_excel_report(StatisticsScope(taluka=self.taluka), output)
+
+        sheet = openpyxl.load_workbook(output).worksheets[0]
+        self.assertEqual(
+            [cell.value for cell in sheet[1]],
+            ['Student Name', 'STS Number', 'Gender', 'Class', 'School', 'Taluka',
+             'Task 1: Add', 'Task 2: Subtract', 'Task 3: Multiply'],
+        )
+        self.assertTrue(all(cell.font.bold and cell.fill.start_color.rgb.endswith('CCCCCC') for cell in sheet[1]))
+        self.assertFalse(sheet['A2'].font.bold)
+        # Longest value (capped at 50) or header, plus padding
+        self.assertEqual(
+            [sheet.column_dimensions[column].width for column in 'ABCDEFGHI'],
+            [50, 12, 8, 9, 13, 8, 13, 18, 18],
+        )
+
+
+class ParallelExcelReportTests(TransactionTestCase):
+    """Worker processes read committed rows from the (file) test database"""
+
+    def setUp(self):
+        district = District.objects.create(name='BELAGAVI')
+        self.taluka = Taluka.objects.create(name='ATHANI', district=district)
+        school = School.objects.create(
+            udise_code='29010100101', name='GHPS Athani', taluka=self.taluka,
+            type='coed', school_type='Government', location='rural', medium='kannada',
+        )
+        beo = User.objects.create_user(username='beo-athani')
+        assignments = [
+            Assignment.objects.create(
+                title=title, tasks=tasks, subject=Subject.objects.get_or_create(name=subject)[0], standard=standard,
+                start_date=date(2025, 6, 1), end_date=date(2025, 6, 30), created_by=beo,
+            )
+            for title, subject, standard, tasks in [
+                ('Worksheet 5', 'Maths', 5, ['Add', 'Subtract', 'Multiply']),
+                ('Experiments', 'Science', 5, ['Observe', 'Record']),
+                ('Worksheet 6', 'Maths', 6, ['Divide']),
+            ]
+        ]
+        for number in range(30):
+            student = Student.objects.create(
+                name=f'Student {number:03d}', sts_number=str(number), gender='female' if number % 3 else 'male',
+                standard=5 + number % 2, school=school,
+            )
+            for assignment in assignments:
+                if assignment.standard == student.standard and number % 4:
+                    StudentEvaluation.objects.create(
+                        student=student, assignment=assignment, statuses='SU-S'[number % 4:], evaluated_by=beo,
+                    )
+
+    def workbook(self, workers):
+        output = io.BytesIO()
+        with override_settings(REPORT_WORKERS=workers):
+            write_excel_report(StatisticsScope(taluka=self.taluka), output)
+        workbook = openpyxl.load_workbook(output)
+        return [
+            (
+                sheet.title,
+                [sheet.column_dimensions[column].width for column in 'ABCDEFGHI'],
+                [[cell.value for cell in row] for row in sheet.iter_rows()],
+            )
+            for sheet in workbook
+        ]
+
+    def test_parallel_sheets_match_serial_sheets(self):
+        serial = self.workbook(1)
+        self.assertEqual(
+            [(title, len(rows)) for title, _, rows in serial],
+            [('Class5-Maths-Worksheet ', 16), ('Class5-Science-Experiment', 16), ('Class6-Maths-Worksheet ', 16)],
+        )
+        self.assertEqual(self.workbook(2), serial)
+
+
+class TaskStatisticsTests(ReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_students(4)
+        gokak = Taluka.objects.create(name='GOKAK', district=self.taluka.district)
+        self.other_school = School.objects.create(
+            udise_code='29020100101', name='GHPS Gokak', taluka=gokak,
+            type='coed', school_type='Government', location='urban', medium='kannada',
+        )
+        science = Subject.objects.create(name='Science')
+        self.science = Assignment.objects.create(
+            title='Experiments', tasks=['Observe', 'Record'], subject=science, standard=5,
+            start_date=date(2025, 7, 1), end_date=date(2025, 7, 31), created_by=self.beo,
+        )
+        for number, (school, standard, statuses) in enumerate([
+            (self.other_school, 5, 'SSU'), (self.other_school, 5, '-U'), (self.other_school, 6, ''),
+            (self.school, 5, 'U-S'),
+        ]):
+            student = Student.objects.create(
+                name=f'Other {number}', sts_number=f'9{number}', gender='female', standard=standard, school=school,
+            )
+            StudentEvaluation.objects.create(
+                student=student, assignment=self.assignments[0] if standard == 5 else self.assignments[1],
+                statuses=statuses, evaluated_by=self.beo,
+            )
+            StudentEvaluation.objects.create(
+                student=student, assignment=self.science, statuses='SU', evaluated_by=self.beo,
+            )
+        # Left behind by a student who moved to standard 6: not counted
+        StudentEvaluation.objects.create(
+            student=Student.objects.get(sts_number='1'), assignment=self.science, statuses='SS', evaluated_by=self.beo,
+        )
+        refresh_progress()
+
+    def per_row_statistics(self, scope):
+        """The counts as the views computed them before, one task of one student at a time"""
+        total = solved = unsolved = 0
+        assignments = list(Assignment.objects.filter(scope.assignment_filter()))
+        for student in scope.students():
+            for assignment in assignments:
+                if assignment.standard != student.standard:
+                    continue
+                evaluation = StudentEvaluation.objects.filter(student=student, assignment=assignment).first()
+                statuses = evaluation.statuses if evaluation else ''
+                for task_index in range(len(assignment.tasks)):
+                    total += 1
+                    status = statuses[task_index] if task_index < len(statuses) else StudentEvaluation.NOT_EVALUATED
+                    solved += status == StudentEvaluation.SOLVED
+                    unsolved += status == StudentEvaluation.UNSOLVED
+        return summarize(total, solved, unsolved)
+
+    def test_grouped_and_rollup_counts_match_per_row_counts(self):
+        district = self.taluka.district
+        scopes = [
+            StatisticsScope(),
+            StatisticsScope(district=district),
+            StatisticsScope(taluka=self.taluka),
+            StatisticsScope(school=self.other_school),
+            StatisticsScope(district=district, standard=5),
+            StatisticsScope(school=self.school, subject=self.science.subject),
+            StatisticsScope(district=district, start_date=date(2025, 7, 1)),
+            StatisticsScope(assignment=self.assignments[0]),
+        ]
+        for scope in scopes:
+            with self.subTest(scope=scope.to_parameters()):
+                expected = self.per_row_statistics(scope)
+                self.assertEqual(task_statistics(scope), expected)
+                self.assertEqual(rollup_statistics(scope), expected)
+        # Worksheets: 4 solved from add_students and 3 here; science: one per standard 5 student here
+        self.assertEqual(self.per_row_statistics(StatisticsScope())['solved_tasks'], 10)
+
+    def test_show_summary_button_is_not_the_summary_select(self):
+        response = self.client.post(reverse('reports'), {'summary': SUMMARY_ONLY})
+        self.assertNotIn('statistics', response.context)
+
+        response = self.client.post(reverse('reports'), {'summary': SUMMARY_ONLY, 'show_summary': ''})
+        self.assertEqual(response.context['statistics'], task_statistics(StatisticsScope(taluka=self.taluka)))
+
+
+class DashboardBreakdownTests(ReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_students(4)
+        self.gokak = Taluka.objects.create(name='GOKAK', district=self.taluka.district)
+        self.other_school = School.objects.create(
+            udise_code='29020100101', name='GHPS Gokak', taluka=self.gokak,
+            type='coed', school_type='Government', location='urban', medium='kannada',
+        )
+        student = Student.objects.create(
+            name='Other', sts_number='900', gender='female', standard=5, school=self.other_school,
+        )
+        StudentEvaluation.objects.create(
+            student=student, assignment=self.assignments[0], statuses='SS', evaluated_by=self.beo,
+        )
+        refresh_progress()
+
+        self.ddpi = User.objects.create_user(username='belagavi_ddpi')
+        self.ddpi.groups.add(Group.objects.create(name='DDPI'))
+        DDPIProfile.objects.create(user=self.ddpi, district=self.taluka.district)
+        self.principal = User.objects.create_user(username='29010100101')
+        self.principal.groups.add(Group.objects.create(name='Principal'))
+        PrincipalProfile.objects.create(user=self.principal, school=self.school)
+
+    def breakdown(self, user, status=200, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('dashboard_breakdown'), params)
+        self.assertEqual(response.status_code, status)
+        return response.json() if status in (200, 400) else None
+
+    def test_ddpi_drills_down_from_talukas_to_standards(self):
+        data = self.breakdown(self.ddpi)
+        self.assertEqual((data['level'], data['child_level'], data['taluka']), ('taluka', 'school', None))
+        self.assertEqual(
+            [(row['id'], row['name'], row['total_tasks'], row['solved_tasks'], row['unsolved_tasks'])
+             for row in data['rows']],
+            [(self.taluka.pk, 'ATHANI', 12, 4, 4), (self.gokak.pk, 'GOKAK', 3, 2, 0)],
+        )
+        self.assertEqual(data['rows'][1]['solved_percentage'], 66.7)
+
+        data = self.breakdown(self.ddpi, taluka=self.gokak.pk)
+        self.assertEqual((data['level'], data['child_level'], data['taluka']), ('school', 'standard', 'GOKAK'))
+        self.assertEqual([row['name'] for row in data['rows']], ['GHPS Gokak'])
+
+        data = self.breakdown(self.ddpi, taluka=self.taluka.pk, school=self.school.pk)
+        self.assertEqual((data['level'], data['child_level'], data['school']), ('standard', None, 'GHPS Athani'))
+        self.assertEqual(
+            [(row['id'], row['name'], row['total_tasks']) for row in data['rows']],
+            [(5, 'Class 5', 6), (6, 'Class 6', 6)],
+        )
+
+    def test_rows_are_sorted_and_limited(self):
+        data = self.breakdown(self.ddpi, sort='solved_percentage', order='desc', limit=1)
+        self.assertEqual([row['name'] for row in data['rows']], ['GOKAK'])
+        self.assertEqual(self.breakdown(self.ddpi, 400, sort='password'), {'error': 'Unknown sort field: password'})
+
+    def test_drill_down_is_limited_to_the_role_scope(self):
+        # A BEO starts at the schools of their own taluka and cannot pick another one
+        data = self.breakdown(self.beo, taluka=self.gokak.pk)
+        self.assertEqual((data['level'], data['taluka']), ('school', 'ATHANI'))
+        self.assertEqual([row['name'] for row in data['rows']], ['GHPS Athani'])
+        self.breakdown(self.beo, 404, school=self.other_school.pk)
+
+        # A principal only sees the standards of their school
+        data = self.breakdown(self.principal)
+        self.assertEqual((data['level'], data['school']), ('standard', 'GHPS Athani'))
+        self.assertEqual([row['name'] for row in data['rows']], ['Class 5', 'Class 6'])
+        self.breakdown(self.principal, 404, school=self.other_school.pk)
+
+        self.breakdown(User.objects.create_user(username='nobody'), 403)
+
+
+class StatisticsCacheTests(ReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_students(2)
+        self.keys = [
+            stats_key('school', self.school.pk), stats_key('taluka', self.taluka.pk),
+            stats_key('district', self.taluka.district_id),
+        ]
+        self.addCleanup(caches['default'].delete_many, self.keys)
+        caches['default'].set_many({key: {'total_students': 2} for key in self.keys})
+
+    def cached(self):
+        return sorted(caches['default'].get_many(self.keys))
+
+    def test_changes_of_a_transaction_are_evicted_together_after_commit(self):
+        evaluation = StudentEvaluation.objects.first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            # The signals add no queries of their own
+            with self.assertNumQueries(3):
+                student = Student.objects.create(
+                    name='New', sts_number='99', gender='male', standard=5, school=self.school,
+                )
+                StudentEvaluation.objects.create(
+                    student=student, assignment=self.assignments[0], statuses='S', evaluated_by=self.beo,
+                )
+                evaluation.delete()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.cached(), sorted(self.keys))
+
+        callbacks[0]()
+        self.assertEqual(self.cached(), [])
+
+    def test_stats_command_warns_about_a_per_process_cache(self):
+        output = io.StringIO()
+        call_command('dashboard_cache_stats', stdout=output)
+        self.assertIn('The cache backend is per process', output.getvalue())
+
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'prerane_cache'}}
+        with override_settings(CACHES=shared):
+            self.assertFalse(is_per_process())
+
+    def test_deleted_evaluation_is_evicted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentEvaluation.objects.first().delete()
+        self.assertEqual(self.cached(), [])
+
+    def test_deleted_school_evicts_its_taluka_and_district(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.school.delete()
+        self.assertEqual(self.cached(), [])
+
+    def test_rolled_back_changes_are_not_evicted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self._add_students(1)
+                transaction.set_rollback(True)
+        self.assertEqual(self.cached(), sorted(self.keys))
+
+        # The next transaction registers its own callback
+        self.add_students(1)
+        self.assertEqual(self.cached(), [])
+
+
+class RollupTests(ReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_students(4)
+        Student.objects.create(name='Unevaluated', sts_number='99', gender='female', standard=5, school=self.school)
+
+    def progress(self):
+        return sorted(TaskProgress.objects.values_list(
+            'standard', 'assignment__title', 'total_count', 'solved_count', 'unsolved_count',
+        ))
+
+    def test_refresh_progress_counts_students_and_statuses(self):
+        self.assertEqual(len(verify_progress()), 2)
+        self.assertEqual(refresh_progress(school=self.school), 2)
+        self.assertEqual(verify_progress(), [])
+        self.assertEqual(self.progress(), [(5, 'Worksheet 5', 9, 2, 2), (6, 'Worksheet 6', 6, 2, 2)])
+
+        # Rows whose standard lost its students are dropped
+        Student.objects.filter(standard=6).delete()
+        refresh_progress(school=self.school)
+        self.assertEqual(self.progress(), [(5, 'Worksheet 5', 9, 2, 2)])
+
+    def test_refresh_progress_is_limited_to_the_district(self):
+        other = District.objects.create(name='DHARWAD')
+        self.assertEqual(refresh_progress(district=other), 0)
+        self.assertFalse(TaskProgress.objects.exists())
+        self.assertEqual(refresh_progress(district=self.school.taluka.district), 2)
+
+    def test_refresh_of_a_set_of_schools_is_one_grouped_recompute(self):
+        other, untouched = [
+            School.objects.create(
+                udise_code=udise_code, name=name, taluka=self.taluka,
+                type='coed', school_type='Government', location='rural', medium='kannada',
+            )
+            for udise_code, name in [('29010100102', 'GUPS Athani'), ('29010100103', 'KHPS Athani')]
+        ]
+        for number, school in enumerate([other, untouched]):
+            Student.objects.create(name='Other', sts_number=str(900 + number), gender='male', standard=5, school=school)
+
+        with CaptureQueriesContext(connection) as one_school:
+            self.assertEqual(refresh_progress(schools=[self.school.pk]), 2)
+        with CaptureQueriesContext(connection) as two_schools:
+            self.assertEqual(refresh_progress(schools=[self.school.pk, other.pk]), 3)
+        self.assertEqual(len(two_schools), len(one_school))
+        self.assertEqual(
+            sorted(TaskProgress.objects.values_list('school__name', 'standard')),
+            [('GHPS Athani', 5), ('GHPS Athani', 6), ('GUPS Athani', 5)],
+        )
+
+    def test_verify_progress_reports_drift(self):
+        refresh_progress()
+        TaskProgress.objects.filter(standard=5).update(solved_count=7)
+        [(key, expected, actual)] = verify_progress()
+        self.assertEqual(key, (self.school.pk, 5, self.assignments[0].pk))
+        self.assertEqual((expected['solved_count'], actual['solved_count']), (2, 7))
+
+    def test_rebuild_command_checks_and_repairs_the_table(self):
+        with self.assertRaisesMessage(CommandError, '2 rollup rows do not match StudentEvaluation'):
+            call_command('rebuild_task_progress', '--check', stdout=io.StringIO())
+        self.assertFalse(TaskProgress.objects.exists())
+
+        output = io.StringIO()
+        call_command('rebuild_task_progress', stdout=output)
+        self.assertIn('Rollup verified: 2 rows match StudentEvaluation', output.getvalue())
+        call_command('rebuild_task_progress', '--check', stdout=io.StringIO())
+
+    def test_migration_backfills_the_table(self):
+        backfill = import_module('core.migrations.0004_taskprogress').backfill_task_progress
+        # 0004 runs before the evaluations are converted, so it reads them as per-task rows
+        for evaluation in StudentEvaluation.objects.all():
+            for task_index, code in enumerate(evaluation.statuses):
+                TaskEvaluation.objects.create(
+                    student=evaluation.student, assignment=evaluation.assignment, task_index=task_index,
+                    status='solved' if code == StudentEvaluation.SOLVED else 'unsolved',
+                    evaluated_by=evaluation.evaluated_by,
+                )
+        TaskProgress.objects.create(school=self.school, standard=7, assignment=self.assignments[0])
+        backfill(apps, None)
+        self.assertEqual(verify_progress(), [])
+        self.assertEqual(self.progress(), [(5, 'Worksheet 5', 9, 2, 2), (6, 'Worksheet 6', 6, 2, 2)])
+
+
+class BenchmarkReportsTests(TestCase):
+    def test_benchmark_writes_results_and_rolls_back(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        output = f'{output_dir}/results.json'
+
+        call_command(
+            'benchmark_reports', '--talukas', '1', '--schools', '2', '--classes', '1', '--students', '3',
+            '--repeat', '1', '--output', output, stdout=io.StringIO(),
+        )
+
+        with open(output) as f:
+            results = json.load(f)
+        self.assertEqual(results['students'], 6)
+        self.assertEqual(
+            [(row['role'], row['format']) for row in results['results']],
+            [(role, report_format) for role in ('principal', 'beo', 'ddpi') for report_format in ('xlsx', 'csv')],
+        )
+        self.assertTrue(all(row['output_bytes'] > 0 and row['queries'] > 0 for row in results['results']))
+        self.assertFalse(Student.objects.exists())
+
+    def test_storage_benchmark_compares_only_the_growth_of_the_tables(self):
+        command = import_module('core.management.commands.benchmark_evaluation_storage').Command
+        # Sizes of TaskEvaluation and StudentEvaluation before and after the synthetic rows
+        sizes = [100 * 1024, 50 * 1024, 120 * 1024, 52 * 1024]
+        output = io.StringIO()
+        with mock.patch.object(command, 'table_size', side_effect=sizes):
+            call_command(
+                'benchmark_evaluation_storage', '--students', '10', '--assignments', '2', '--tasks', '3',
+                '--repeat', '1', stdout=output,
+            )
+        self.assertRegex(output.getvalue(), r'TaskEvaluation +\d+ +20 ')
+        self.assertRegex(output.getvalue(), r'StudentEvaluation +20 +2 ')
+        self.assertIn('Size ratio:      10.0x smaller', output.getvalue())
+        self.assertFalse(Student.objects.exists())
+
+
+class ChoiceSearchTests(ReportTestCase):
+    def setUp(self):
+        super().setUp()
+        School.objects.bulk_create([
+            School(udise_code=f'2901020{i:04d}', name=f'KHPS Athani {i:02d}', taluka=self.taluka,
+                   type='coed', school_type='Government', location='rural', medium='kannada')
+            for i in range(25)
+        ])
+        other_taluka = Taluka.objects.create(name='GOKAK', district=self.taluka.district)
+        self.outside = School.objects.create(
+            udise_code='29030100101', name='KHPS Athani Road', taluka=other_taluka,
+            type='coed', school_type='Government', location='rural', medium='kannada',
+        )
+
+    def search(self, kind, **params):
+        response = self.client.get(reverse('choice_search', args=[kind]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_report_page_renders_only_the_selected_school(self):
+        response = self.client.get(reverse('reports'))
+        self.assertContains(response, 'data-search-url="/search/schools/"')
+        self.assertNotContains(response, 'KHPS Athani 00')
+
+        response = self.client.post(reverse('reports'), {'show_summary': '1', 'school': self.school.pk})
+        self.assertContains(response, f'<option value="{self.school.pk}" selected>')
+        self.assertNotContains(response, 'KHPS Athani 00')
+
+    def test_search_is_paginated_and_limited_to_the_role_scope(self):
+        first_page = self.search('schools', q='khps')
+        self.assertEqual(len(first_page['results']), 20)
+        self.assertTrue(first_page['more'])
+        second_page = self.search('schools', q='khps', page=2)
+        self.assertEqual(len(second_page['results']), 5)
+        self.assertFalse(second_page['more'])
+        self.assertNotIn(self.outside.pk, [row['id'] for row in first_page['results'] + second_page['results']])
+
+        # UDISE codes match by prefix
+        self.assertEqual(self.search('schools', q='290102000')['results'][0]['text'], 'KHPS Athani 00 (29010200000)')
+        self.assertEqual(len(self.search('assignments', q='worksheet', standard=5)['results']), 1)
+
+    def test_out_of_scope_choice_is_still_rejected(self):
+        response = self.client.post(reverse('report_jobs'), {'school': self.outside.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('school', response.json()['errors'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+
+
+class LoadDataTests(TestCase):
+    SCHOOLS = [
+        # Udise Code, School Name, Block Name, Type, School Location, medinstr1, Management
+        ('29010100101', 'GHPS Athani', 'ATHANI', 'Co-Ed', 'Rural', '05-Kannada', 'Department of Education'),
+        ('29010100102', 'GUPS Urdu Athani', 'ATHANI', 'Boys', 'Urban', '18-Urdu', None),
+        ('29020100101', 'GHPS Gokak', 'GOKAK', 'Girls', 'Rural', '19-English', 'Department of Education'),
+        ('29020100101', 'GHPS Gokak Town', 'GOKAK', 'Girls', 'Urban', '19-English', 'Department of Education'),
+        ('29020100199', None, 'GOKAK', 'Co-Ed', 'Rural', '05-Kannada', None),
+    ]
+    STUDENTS = [
+        # Udise code, SATS  No., Student Name, Gender, Standard
+        ('29010100101', '1001', 'Asha', 'G', 5),
+        ('29010100101', '1002', 'Basu', 'B', 6),
+        ('29010100102', '1001', 'Chand', 'B', None),
+        ('29020100101', '2001', 'Deepa', 'G', 4),
+        ('29020100101', '2001', 'Deepa K', 'G', 5),
+        ('29099999999', '9001', 'Nobody', 'B', 3),
+        ('29010100101', '1003', None, 'B', 3),
+    ]
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.school_file = f'{directory}/schools.xlsx'
+        self.student_file = f'{directory}/students.xlsx'
+        pd.DataFrame(self.SCHOOLS, columns=[
+            'Udise Code', 'School Name', 'Block Name', 'Type', 'School Location', 'medinstr1', 'Management',
+        ]).to_excel(self.school_file, index=False)
+        pd.DataFrame(self.STUDENTS, columns=[
+            'Udise code', 'SATS  No.', 'Student Name', 'Gender', 'Standard',
+        ]).to_excel(self.student_file, index=False)
+
+        # An existing school and student that the load updates
+        with self.captureOnCommitCallbacks(execute=True):
+            district = District.objects.create(name='BELAGAVI')
+            taluka = Taluka.objects.create(name='ATHANI', district=district)
+            school = School.objects.create(
+                udise_code='29010100101', name='Old Name', taluka=taluka,
+                type='coed', school_type='Government', location='urban', medium='english',
+            )
+            Student.objects.create(name='Asha Old', sts_number='1001', gender='female', standard=4, school=school)
+
+    def load(self, *args):
+        output = io.StringIO()
+        call_command(
+            'load_data', '--school-file', self.school_file, '--student-file', self.student_file, *args,
+            stdout=output,
+        )
+        self.assertIn('Data loaded successfully!', output.getvalue())
+        return [line for line in output.getvalue().splitlines() if 'created' in line or 'not found' in line]
+
+    def snapshot(self):
+        return (
+            sorted(School.objects.values_list(
+                'udise_code', 'name', 'taluka__name', 'type', 'school_type', 'location', 'medium',
+            )),
+            sorted(Student.objects.values_list('school__udise_code', 'sts_number', 'name', 'gender', 'standard')),
+            sorted(User.objects.values_list('username', flat=True)),
+        )
+
+    def test_bulk_mode_matches_row_by_row_mode(self):
+        with transaction.atomic():
+            row_output = self.load()
+            row_state = self.snapshot()
+            transaction.set_rollback(True)
+
+        bulk_output = self.load('--bulk', '--batch-size', '2')
+        self.assertEqual(self.snapshot(), row_state)
+        self.assertEqual(bulk_output, row_output)
+        self.assertIn('2 schools created, 2 schools updated', bulk_output)
+        self.assertIn('3 students created, 2 students updated', bulk_output)
+        self.assertIn(('29020100101', 'GHPS Gokak Town', 'GOKAK', 'girls', 'Department of Education', 'urban', 'english'),
+                      row_state[0])
+        self.assertIn(('29010100102', '1001', 'Chand', 'male', 1), row_state[1])
+
+        # Loading the same files again only updates
+        self.assertIn('0 students created, 5 students updated', self.load('--bulk'))
+
+    def test_every_load_mode_refreshes_task_progress(self):
+        beo = User.objects.create_user(username='beo-athani')
+        assignment = Assignment.objects.create(
+            title='Worksheet 5', tasks=['Add', 'Subtract', 'Multiply'], subject=Subject.objects.create(name='Maths'),
+            standard=5, start_date=date(2025, 6, 1), end_date=date(2025, 6, 30), created_by=beo,
+        )
+        # Asha moves from standard 4 to the assignment's standard 5 with the load
+        StudentEvaluation.objects.create(
+            student=Student.objects.get(sts_number='1001'), assignment=assignment, statuses='SU-', evaluated_by=beo,
+        )
+        for mode in ([], ['--bulk'], ['--bulk', '--commit-every', '2'], ['--incremental']):
+            with self.subTest(mode=mode), transaction.atomic():
+                self.load(*mode)
+                self.assertEqual(verify_progress(), [])
+                self.assertEqual(
+                    sorted(TaskProgress.objects.values_list(
+                        'school__udise_code', 'total_count', 'solved_count', 'unsolved_count',
+                    )),
+                    [('29010100101', 3, 1, 1), ('29020100101', 3, 0, 0)],
+                )
+                transaction.set_rollback(True)
+
+    def test_bulk_load_evicts_cached_statistics_after_commit(self):
+        school = School.objects.get(udise_code='29010100101')
+        keys = [stats_key('school', school.pk), stats_key('district', school.taluka.district_id)]
+        self.addCleanup(caches['default'].delete_many, keys)
+        caches['default'].set_many({key: {} for key in keys})
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.load('--bulk')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(caches['default'].get_many(keys)), 2)
+
+        callbacks[0]()
+        self.assertEqual(caches['default'].get_many(keys), {})
+    @skipIf(connection.vendor != 'postgresql', 'The COPY path needs PostgreSQL')
+    def test_copy_path_matches_orm_path(self):
+        district = District.objects.get(name='BELAGAVI')
+        Taluka.objects.create(name='GOKAK', district=district)
+        school_df = read_schools(self.school_file)
+        results = []
+        for load_schools, load_students in (
+            (bulk_load_schools, bulk_load_students), (copy_load_schools, copy_load_students),
+        ):
+            warnings = []
+            with transaction.atomic():
+                counts = (
+                    load_schools(school_rows(school_df), district, 2, warnings.append),
+                    load_students(student_rows(self.student_file), 2, warnings.append),
+                )
+                results.append((counts, warnings, self.snapshot()))
+                transaction.set_rollback(True)
+
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[0][0], ((2, 2), (3, 2)))
+
+    def test_incremental_load_writes_only_changes(self):
+        self.load('--bulk')
+        asha = Student.objects.get(sts_number='1001', school__udise_code='29010100101')
+        pd.DataFrame([
+            ('29010100101', '1001', 'Asha', 'G', 5),
+            ('29010100101', '1002', 'Basavaraj', 'B', 6),
+            ('29020100101', '2001', 'Deepa K', 'G', 5),
+            ('29020100101', '2002', 'Eshwar', 'B', 5),
+        ], columns=['Udise code', 'SATS  No.', 'Student Name', 'Gender', 'Standard']).to_excel(
+            self.student_file, index=False,
+        )
+
+        state = self.snapshot()
+        output = io.StringIO()
+        call_command(
+            'load_data', '--school-file', self.school_file, '--student-file', self.student_file,
+            '--dry-run', '--delete-missing', stdout=output,
+        )
+        self.assertIn('Schools: 0 to create, 0 to update, 3 unchanged, 0 to delete', output.getvalue())
+        self.assertIn('Students: 1 to create, 1 to update, 2 unchanged, 1 to delete', output.getvalue())
+        self.assertEqual(self.snapshot(), state)
+
+        output = self.load('--incremental', '--delete-missing', '--batch-size', '2')
+        self.assertIn('1 students created, 1 students updated, 2 unchanged, 1 deleted', output)
+        self.assertEqual(
+            sorted(Student.objects.values_list('sts_number', 'name')),
+            [('1001', 'Asha'), ('1002', 'Basavaraj'), ('2001', 'Deepa K'), ('2002', 'Eshwar')],
+        )
+        # Unchanged students keep their rows (and with them their evaluations)
+        self.assertTrue(Student.objects.filter(pk=asha.pk, name='Asha').exists())
+
+    def test_incremental_load_evicts_cached_statistics_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.load('--bulk')
+        school = School.objects.get(udise_code='29010100101')
+        athani, gokak = school.taluka, Taluka.objects.get(name='GOKAK')
+        keys = [
+            stats_key('school', school.pk), stats_key('taluka', athani.pk), stats_key('taluka', gokak.pk),
+            stats_key('district', athani.district_id),
+        ]
+        self.addCleanup(caches['default'].delete_many, keys)
+        caches['default'].set_many({key: {} for key in keys})
+
+        # The school moves from ATHANI to GOKAK
+        pd.DataFrame([('29010100101', 'GHPS Athani', 'GOKAK', 'Co-Ed', 'Rural', '05-Kannada', None)], columns=[
+            'Udise Code', 'School Name', 'Block Name', 'Type', 'School Location', 'medinstr1', 'Management',
+        ]).to_excel(self.school_file, index=False)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.load('--incremental')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(caches['default'].get_many(keys)), 4)
+
+        callbacks[0]()
+        self.assertEqual(caches['default'].get_many(keys), {})
+    def test_manifest_loads_each_district_and_reports_failures(self):
+        manifest = f'{os.path.dirname(self.school_file)}/manifest.csv'
+        with open(manifest, 'w') as f:
+            f.write('district,school_file,student_file\n')
+            f.write('belagavi,schools.xlsx,students.xlsx\n')
+            f.write('Dharwad,schools.xlsx,bad.xlsx\n')
+        # Fails on reading the students, after the district's schools were written
+        pd.DataFrame({'Name': ['Asha']}).to_excel(f'{os.path.dirname(self.school_file)}/bad.xlsx', index=False)
+
+        output = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 of 2 districts failed: DHARWAD'):
+            call_command('load_data', '--manifest', manifest, stdout=output)
+        self.assertRegex(output.getvalue(), r'BELAGAVI +loaded in .*2 schools created, 2 schools updated; '
+                                            r'3 students created, 2 students updated')
+        self.assertRegex(output.getvalue(), r'DHARWAD +failed in .*Columns not found')
+        # The failed district rolled back on its own; the other one stayed loaded
+        self.assertEqual(list(District.objects.values_list('name', flat=True)), ['BELAGAVI'])
+        self.assertEqual(Student.objects.count(), 4)
+        self.assertEqual(set(School.objects.values_list('taluka__district__name', flat=True)), {'BELAGAVI'})
+        self.assertTrue(User.objects.filter(username='belagavi_ddpi', ddpiprofile__district__name='BELAGAVI').exists())
+
+    def test_accounts_are_provisioned_in_bulk(self):
+        self.load('--bulk')
+        principal = User.objects.get(username='29010100101')
+        principal.set_password('changed')
+        principal.save()
+        # The load must not reset it, and must point the principal at its school again
+        PrincipalProfile.objects.filter(user=principal).update(school=School.objects.get(udise_code='29020100101'))
+
+        output = self.load('--bulk')
+        self.assertIn('0 Principal accounts created', output[-1])
+        principal.refresh_from_db()
+        self.assertTrue(principal.check_password('changed'))
+        self.assertEqual(principal.principalprofile.school.udise_code, '29010100101')
+        self.assertTrue(User.objects.get(username='29020100101').check_password('10100102092'))
+        beo = User.objects.get(username='belagavi_athani')
+        self.assertTrue(beo.check_password('inahta'))
+        self.assertEqual(beo.beoprofile.taluka.name, 'ATHANI')
+        self.assertEqual(
+            sorted(User.objects.filter(groups__name='Principal').values_list('username', flat=True)),
+            ['29010100101', '29010100102', '29020100101'],
+        )
+        self.assertEqual(list(beo.groups.values_list('name', flat=True)), ['BEO'])
+
+    def test_beo_usernames_include_the_district(self):
+        # An account from before usernames carried the district keeps its password
+        self.load()
+        User.objects.filter(username='belagavi_athani').update(username='athani')
+        beo = User.objects.get(username='athani')
+        beo.set_password('changed')
+        beo.save()
+        # Another district with a taluka of the same name
+        Taluka.objects.create(name='ATHANI', district=District.objects.create(name='DHARWAD'))
+
+        self.load()
+        beo.refresh_from_db()
+        self.assertEqual(beo.username, 'belagavi_athani')
+        self.assertTrue(beo.check_password('changed'))
+        command = import_module('core.management.commands.load_data').Command(stdout=io.StringIO())
+        groups = [Group.objects.get(name=name) for name in ('DDPI', 'BEO', 'Principal')]
+        command.create_accounts(District.objects.get(name='DHARWAD'), *groups)
+        self.assertEqual(
+            dict(User.objects.filter(username__endswith='_athani')
+                 .values_list('username', 'beoprofile__taluka__district__name')),
+            {'belagavi_athani': 'BELAGAVI', 'dharwad_athani': 'DHARWAD'},
+        )
+
+    def test_chunked_load_resumes_after_last_committed_chunk(self):
+        # An interrupted run over the same student file committed its first two rows
+        LoadCheckpoint.objects.create(
+            district='BELAGAVI', phase=LoadCheckpoint.STUDENTS, file_path=self.student_file,
+            checksum=file_checksum(self.student_file), rows_done=2,
+        )
+        output = self.load('--bulk', '--commit-every', '2', '--resume')
+        self.assertIn('2 schools created, 2 schools updated', output)
+        self.assertIn('2 students created, 1 students updated', output)
+        self.assertFalse(Student.objects.filter(sts_number='1002').exists())
+        checkpoint = LoadCheckpoint.objects.get(phase=LoadCheckpoint.STUDENTS)
+        self.assertEqual((checkpoint.rows_done, checkpoint.completed), (6, True))
+
+        # Completed files are skipped on resume, and loaded again without it
+        self.assertIn('0 students created, 0 students updated', self.load('--commit-every', '2', '--resume'))
+        self.assertIn('1 students created, 4 students updated', self.load('--commit-every', '2'))
+        self.assertTrue(Student.objects.filter(sts_number='1002').exists())
+
+    def test_ids_stored_with_a_float_suffix_are_normalized(self):
+        # As the pandas reader stored ids from numeric columns with blank cells
+        Student.objects.filter(sts_number='1001').update(sts_number='1001.0')
+        School.objects.filter(udise_code='29010100101').update(udise_code='29010100101.0')
+        school = School.objects.get()
+        Student.objects.create(name='Basu', sts_number='1002.0', gender='male', standard=6, school=school)
+        # Both forms of one student: left for a person to merge
+        Student.objects.create(name='Chand', sts_number='1003.0', gender='male', standard=3, school=school)
+        Student.objects.create(name='Chand', sts_number='1003', gender='male', standard=3, school=school)
+
+        import_module('core.migrations.0013_strip_float_id_suffix').strip_float_suffix(apps, None)
+        self.assertEqual(School.objects.get().udise_code, '29010100101')
+        self.assertEqual(
+            sorted(Student.objects.values_list('sts_number', flat=True)), ['1001', '1002', '1003', '1003.0'],
+        )
+
+        # Reloading now updates Asha and Basu instead of adding a copy of each
+        self.assertIn('2 students created, 3 students updated', self.load())
+        self.assertEqual(Student.objects.filter(name__in=['Asha', 'Basu']).count(), 2)
+
+    def test_student_file_is_read_in_chunks(self):
+        # Numeric SATS numbers next to a blank cell and an unreadable standard
+        pd.DataFrame([
+            (29010100101, 1001, 'Asha', 'G', 5),
+            (29010100101, None, 'Nobody', 'B', 6),
+            (29010100101, 1002, 'Basu', 'b', 'V'),
+            (29010100101, 1003, 'Chand', 'B', 7.0),
+        ], columns=['Udise code', 'SATS  No.', 'Student Name', 'Gender', 'Standard']).to_excel(
+            self.student_file, index=False,
+        )
+        output = io.StringIO()
+        call_command(
+            'load_data', '--school-file', self.school_file, '--student-file', self.student_file,
+            '--chunk-size', '1', stdout=output,
+        )
+        self.assertIn("Error processing student 1002: invalid standard 'V'", output.getvalue())
+        self.assertIn('1 students created, 1 students updated', output.getvalue())
+        self.assertEqual(
+            sorted(Student.objects.values_list('sts_number', 'name', 'gender', 'standard')),
+            [('1001', 'Asha', 'female', 5), ('1003', 'Chand', 'male', 7)],
+        )
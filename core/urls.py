@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.CustomLoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+    path('dashboard/breakdown/', views.DashboardBreakdownView.as_view(), name='dashboard_breakdown'),
     
     # DDPI URLs
     path('ddpi/talukas/', views.ManageTalukaListView.as_view(), name='manage_talukas'),
@@ -49,7 +50,12 @@ urlpatterns = [
     
     path('principal/assignments/', views.EvaluateAssignmentListView.as_view(), name='assignment_evaluations'),
     path('principal/assignments/<int:pk>/evaluate/', views.EvaluateAssignmentView.as_view(), name='evaluate_assignment'),
+    path('principal/assignments/<int:pk>/evaluate/cells/', views.EvaluateAssignmentCellsView.as_view(), name='evaluate_assignment_cells'),
 
     path('reports/', views.GenerateReportView.as_view(), name='reports'),
+    path('reports/jobs/', views.ReportJobCreateView.as_view(), name='report_jobs'),
+    path('reports/jobs/<int:pk>/', views.ReportJobStatusView.as_view(), name='report_job_status'),
+    path('reports/jobs/<int:pk>/download/', views.ReportJobDownloadView.as_view(), name='report_job_download'),
+    path('search/<str:kind>/', views.ChoiceSearchView.as_view(), name='choice_search'),
     path('change-password/', views.PasswordChangeView.as_view(), name='password_change'),
 ]
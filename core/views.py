@@ -3,20 +3,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import Group
-from django.views.generic import CreateView, UpdateView, DeleteView, ListView, DetailView, TemplateView
+from django.views.generic import CreateView, UpdateView, DeleteView, ListView, DetailView, TemplateView, View
+from django.core.exceptions import PermissionDenied
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.db import transaction
-import openpyxl
-from datetime import datetime
-from django.http import HttpResponse
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
+from django.db.models import Q
+import json
+import os
+import tempfile
 from datetime import datetime
 from .mixin import *
 from .models import *
 from .forms import *
+from .evaluations import evaluation_grid, save_evaluations
+from .reports import REPORT_FORMATS, cache_csv_stream, cached_report, enqueue_report
+from .rollup import refresh_progress
+from .stats_cache import get_statistics
+from .task_statistics import (
+    BREAKDOWN_SORTS, StatisticsScope, breakdown_statistics, rollup_statistics, task_statistics
+)
 
 class CustomLoginView(LoginView):
     template_name = 'registration/login.html'
@@ -29,37 +36,34 @@ class DashboardView(LoginRequiredMixin, RoleContextMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
+        role = self.request.role
         
         try:
-            if user.groups.filter(name='DDPI').exists():
-                ddpi_profile = DDPIProfile.objects.select_related('district').get(user=user)
+            if role.is_ddpi:
                 context.update({
-                    'talukas_count': Taluka.objects.filter(district=ddpi_profile.district).count(),
-                    'beos_count': BEOProfile.objects.filter(taluka__district=ddpi_profile.district).count(),
+                    'talukas_count': Taluka.objects.filter(district=role.district).count(),
+                    'beos_count': BEOProfile.objects.filter(taluka__district=role.district).count(),
                     'subjects_count': Subject.objects.count(),
                     'assignments_count': Assignment.objects.count(),
                 })
                 # Get task statistics for district
-                context.update(self.get_task_statistics_for_district(ddpi_profile.district))
+                context.update(self.get_task_statistics_for_district(role.district))
                 
-            elif user.groups.filter(name='BEO').exists():
-                beo_profile = BEOProfile.objects.select_related('taluka').get(user=user)
+            elif role.is_beo:
                 context.update({
-                    'schools_count': School.objects.filter(taluka=beo_profile.taluka).count(),
-                    'principals_count': PrincipalProfile.objects.filter(school__taluka=beo_profile.taluka).count(),
+                    'schools_count': School.objects.filter(taluka=role.taluka).count(),
+                    'principals_count': PrincipalProfile.objects.filter(school__taluka=role.taluka).count(),
                 })
                 # Get task statistics for taluka
-                context.update(self.get_task_statistics_for_taluka(beo_profile.taluka))
+                context.update(self.get_task_statistics_for_taluka(role.taluka))
                 
-            elif user.groups.filter(name='Principal').exists():
-                principal_profile = PrincipalProfile.objects.select_related('school').get(user=user)
+            elif role.is_principal:
                 context.update({
-                    'students_count': Student.objects.filter(school=principal_profile.school).count(),
+                    'students_count': Student.objects.filter(school=role.school).count(),
                     'assignments_count': Assignment.objects.count(),
                 })
                 # Get task statistics for school
-                context.update(self.get_task_statistics_for_school(principal_profile.school))
+                context.update(self.get_task_statistics_for_school(role.school))
                 
         except:
             # Handle case where profile doesn't exist
@@ -68,99 +72,75 @@ class DashboardView(LoginRequiredMixin, RoleContextMixin, TemplateView):
         return context
     
     def get_task_statistics_for_district(self, district):
-        students = Student.objects.filter(school__taluka__district=district).select_related('school', 'school__taluka')
-        return self.calculate_task_statistics(students)
+        scope = StatisticsScope(district=district)
+        return get_statistics('district', district.pk, lambda: rollup_statistics(scope))
     
     def get_task_statistics_for_taluka(self, taluka):
-        students = Student.objects.filter(school__taluka=taluka).select_related('school')
-        return self.calculate_task_statistics(students)
+        scope = StatisticsScope(taluka=taluka)
+        return get_statistics('taluka', taluka.pk, lambda: rollup_statistics(scope))
     
     def get_task_statistics_for_school(self, school):
-        students = Student.objects.filter(school=school).select_related('school')
-        return self.calculate_task_statistics(students)
-    
-    def calculate_task_statistics(self, students):
-        from django.db.models import Count, Q
-        from collections import defaultdict
-        
-        # Get all assignments that have tasks for the standards in our student set
-        student_standards = set(students.values_list('standard', flat=True))
-        if not student_standards:
-            return {
-                'total_tasks': 0,
-                'solved_tasks': 0,
-                'unsolved_tasks': 0,
-                'unassigned_tasks': 0,
-                'solved_percentage': 0,
-                'unsolved_percentage': 0,
-                'unassigned_percentage': 0,
-            }
-        
-        # Get assignments with optimized query
-        assignments = Assignment.objects.filter(
-            standard__in=student_standards
-        ).select_related('subject')
-        
-        if not assignments:
-            return {
-                'total_tasks': 0,
-                'solved_tasks': 0,
-                'unsolved_tasks': 0,
-                'unassigned_tasks': 0,
-                'solved_percentage': 0,
-                'unsolved_percentage': 0,
-                'unassigned_percentage': 0,
-            }
-        
-        # Calculate total possible tasks efficiently using group counting
-        students_by_standard = defaultdict(int)
-        for standard in students.values('standard').annotate(count=Count('id')):
-            students_by_standard[standard['standard']] = standard['count']
-        
-        total_tasks = 0
-        for assignment in assignments:
-            student_count = students_by_standard.get(assignment.standard, 0)
-            total_tasks += student_count * len(assignment.tasks)
+        scope = StatisticsScope(school=school)
+        return get_statistics('school', school.pk, lambda: rollup_statistics(scope))
+      
+class DashboardBreakdownView(LoginRequiredMixin, View):
+    """JSON drill-down (taluka -> school -> standard) of the user's task statistics"""
+    CHILD_LEVELS = {'taluka': 'school', 'school': 'standard', 'standard': None}
+    
+    def get(self, request, *args, **kwargs):
+        role = request.role
+        filters = {}
+        talukas = None
+        if role.is_ddpi:
+            filters['district'] = role.district
+            talukas = Taluka.objects.filter(district=role.district)
+            schools = School.objects.filter(taluka__district=role.district)
+            level = 'taluka'
+        elif role.is_beo:
+            filters['taluka'] = role.taluka
+            schools = School.objects.filter(taluka=role.taluka)
+            level = 'school'
+        elif role.is_principal:
+            filters['school'] = role.school
+            schools = School.objects.none()
+            level = 'standard'
+        else:
+            raise PermissionDenied("You do not have access to task statistics.")
+        if None in filters.values():
+            # In a role group without its profile
+            raise PermissionDenied("Your account has no profile for its role.")
         
-        if total_tasks == 0:
-            return {
-                'total_tasks': 0,
-                'solved_tasks': 0,
-                'unsolved_tasks': 0,
-                'unassigned_tasks': 0,
-                'solved_percentage': 0,
-                'unsolved_percentage': 0,
-                'unassigned_percentage': 0,
-            }
+        # Drill into a child scope, which must lie inside the user's own scope
+        if request.GET.get('taluka') and talukas is not None:
+            filters['taluka'] = get_object_or_404(talukas, pk=request.GET['taluka'])
+            level = 'school'
+        if request.GET.get('school'):
+            filters['school'] = get_object_or_404(schools, pk=request.GET['school'])
+            level = 'standard'
         
-        # Get all evaluations for these students and assignments in one optimized query
-        student_ids = list(students.values_list('id', flat=True))
-        assignment_ids = list(assignments.values_list('id', flat=True))
+        sort = request.GET.get('sort', 'name')
+        if sort not in BREAKDOWN_SORTS:
+            return JsonResponse({'error': f'Unknown sort field: {sort}'}, status=400)
+        try:
+            limit = int(request.GET.get('limit') or 0)
+        except ValueError:
+            return JsonResponse({'error': 'limit must be a number'}, status=400)
         
-        # Use aggregate query for better performance
-        evaluation_counts = TaskEvaluation.objects.filter(
-            student_id__in=student_ids,
-            assignment_id__in=assignment_ids
-        ).aggregate(
-            solved_count=Count('id', filter=Q(status='solved')),
-            unsolved_count=Count('id', filter=Q(status='unsolved'))
+        rows = breakdown_statistics(
+            StatisticsScope(**filters),
+            level,
+            sort=sort,
+            descending=request.GET.get('order') == 'desc',
+            limit=max(limit, 0) or None,
         )
-        
-        solved_tasks = evaluation_counts['solved_count'] or 0
-        unsolved_tasks = evaluation_counts['unsolved_count'] or 0
-        total_evaluated = solved_tasks + unsolved_tasks
-        unassigned_tasks = total_tasks - total_evaluated
-        
-        return {
-            'total_tasks': total_tasks,
-            'solved_tasks': solved_tasks,
-            'unsolved_tasks': unsolved_tasks,
-            'unassigned_tasks': unassigned_tasks,
-            'solved_percentage': round((solved_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1),
-            'unsolved_percentage': round((unsolved_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1),
-            'unassigned_percentage': round((unassigned_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1),
-        }
-      
+        return JsonResponse({
+            'level': level,
+            'child_level': self.CHILD_LEVELS[level],
+            'taluka': filters['taluka'].name if 'taluka' in filters else None,
+            'school': filters['school'].name if 'school' in filters else None,
+            'rows': rows,
+        })
+
 # DDPI Views
 class ManageTalukaListView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixin, ListView):
     model = Taluka
@@ -168,8 +148,7 @@ class ManageTalukaListView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMix
     context_object_name = 'talukas'
     
     def get_queryset(self):
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        return Taluka.objects.filter(district=ddpi_profile.district)
+        return Taluka.objects.filter(district=self.request.role.district)
 
 class ManageTalukaCreateView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixin, CreateView):
     model = Taluka
@@ -179,9 +158,8 @@ class ManageTalukaCreateView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextM
     
     def get_form(self):
         form = super().get_form()
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        form.fields['district'].queryset = District.objects.filter(id=ddpi_profile.district.id)
-        form.fields['district'].initial = ddpi_profile.district
+        form.fields['district'].queryset = District.objects.filter(id=self.request.role.district_id)
+        form.fields['district'].initial = self.request.role.district
         return form
     
     def form_valid(self, form):
@@ -195,8 +173,7 @@ class ManageTalukaUpdateView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextM
     success_url = reverse_lazy('manage_talukas')
     
     def get_queryset(self):
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        return Taluka.objects.filter(district=ddpi_profile.district)
+        return Taluka.objects.filter(district=self.request.role.district)
     
     def form_valid(self, form):
         messages.success(self.request, 'Taluka updated successfully.')
@@ -208,8 +185,7 @@ class ManageTalukaDeleteView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextM
     success_url = reverse_lazy('manage_talukas')
     
     def get_queryset(self):
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        return Taluka.objects.filter(district=ddpi_profile.district)
+        return Taluka.objects.filter(district=self.request.role.district)
     
     def delete(self, request, *args, **kwargs):
         messages.success(request, 'Taluka deleted successfully.')
@@ -255,8 +231,7 @@ class ManageBEOListView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixin,
     context_object_name = 'beos'
     
     def get_queryset(self):
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        return BEOProfile.objects.filter(taluka__district=ddpi_profile.district)
+        return BEOProfile.objects.filter(taluka__district=self.request.role.district)
 
 class ManageBEOCreateView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixin, CreateView):
     form_class = BEOCreationForm
@@ -265,8 +240,7 @@ class ManageBEOCreateView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixi
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        kwargs['district'] = ddpi_profile.district
+        kwargs['district'] = self.request.role.district
         return kwargs
     
     def form_valid(self, form):
@@ -290,8 +264,7 @@ class ManageBEOUpdateView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixi
     success_url = reverse_lazy('manage_beos')
     
     def get_queryset(self):
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        return BEOProfile.objects.filter(taluka__district=ddpi_profile.district)
+        return BEOProfile.objects.filter(taluka__district=self.request.role.district)
     
     def form_valid(self, form):
         messages.success(self.request, 'BEO updated successfully.')
@@ -303,8 +276,7 @@ class ManageBEODeleteView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixi
     success_url = reverse_lazy('manage_beos')
     
     def get_queryset(self):
-        ddpi_profile = DDPIProfile.objects.get(user=self.request.user)
-        return BEOProfile.objects.filter(taluka__district=ddpi_profile.district)
+        return BEOProfile.objects.filter(taluka__district=self.request.role.district)
     
     def delete(self, request, *args, **kwargs):
         beo = self.get_object()
@@ -326,7 +298,10 @@ class ManageAssignmentCreateView(LoginRequiredMixin, DDPIRequiredMixin, RoleCont
     def form_valid(self, form):
         form.instance.created_by = self.request.user
         messages.success(self.request, 'Assignment created successfully.')
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            refresh_progress(assignment=self.object)
+        return response
 
 class ManageAssignmentUpdateView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixin, UpdateView):
     model = Assignment
@@ -342,7 +317,11 @@ class ManageAssignmentUpdateView(LoginRequiredMixin, DDPIRequiredMixin, RoleCont
     
     def form_valid(self, form):
         messages.success(self.request, 'Assignment updated successfully.')
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            # Standard or task list may have changed
+            refresh_progress(assignment=self.object)
+        return response
 
 class ManageAssignmentDeleteView(LoginRequiredMixin, DDPIRequiredMixin, RoleContextMixin, DeleteView):
     model = Assignment
@@ -360,8 +339,7 @@ class ManageSchoolListView(LoginRequiredMixin, BEORequiredMixin, RoleContextMixi
     context_object_name = 'schools'
     
     def get_queryset(self):
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        return School.objects.filter(taluka=beo_profile.taluka)
+        return School.objects.filter(taluka=self.request.role.taluka)
 
 class ManageSchoolCreateView(LoginRequiredMixin, BEORequiredMixin, RoleContextMixin, CreateView):
     model = School
@@ -371,8 +349,7 @@ class ManageSchoolCreateView(LoginRequiredMixin, BEORequiredMixin, RoleContextMi
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        kwargs['taluka'] = beo_profile.taluka
+        kwargs['taluka'] = self.request.role.taluka
         return kwargs
     
     def form_valid(self, form):
@@ -386,8 +363,7 @@ class ManageSchoolUpdateView(LoginRequiredMixin, BEORequiredMixin, RoleContextMi
     success_url = reverse_lazy('manage_schools')
     
     def get_queryset(self):
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        return School.objects.filter(taluka=beo_profile.taluka)
+        return School.objects.filter(taluka=self.request.role.taluka)
     
     def form_valid(self, form):
         messages.success(self.request, 'School updated successfully.')
@@ -399,8 +375,7 @@ class ManageSchoolDeleteView(LoginRequiredMixin, BEORequiredMixin, RoleContextMi
     success_url = reverse_lazy('manage_schools')
     
     def get_queryset(self):
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        return School.objects.filter(taluka=beo_profile.taluka)
+        return School.objects.filter(taluka=self.request.role.taluka)
     
     def delete(self, request, *args, **kwargs):
         messages.success(request, 'School deleted successfully.')
@@ -412,8 +387,7 @@ class ManagePrincipalListView(LoginRequiredMixin, BEORequiredMixin, RoleContextM
     context_object_name = 'principals'
     
     def get_queryset(self):
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        return PrincipalProfile.objects.filter(school__taluka=beo_profile.taluka)
+        return PrincipalProfile.objects.filter(school__taluka=self.request.role.taluka)
 
 class ManagePrincipalCreateView(LoginRequiredMixin, BEORequiredMixin, RoleContextMixin, CreateView):
     form_class = PrincipalCreationForm
@@ -422,8 +396,7 @@ class ManagePrincipalCreateView(LoginRequiredMixin, BEORequiredMixin, RoleContex
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        kwargs['taluka'] = beo_profile.taluka
+        kwargs['taluka'] = self.request.role.taluka
         return kwargs
     
     def form_valid(self, form):
@@ -447,13 +420,11 @@ class ManagePrincipalUpdateView(LoginRequiredMixin, BEORequiredMixin, RoleContex
     success_url = reverse_lazy('manage_principals')
     
     def get_queryset(self):
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        return PrincipalProfile.objects.filter(school__taluka=beo_profile.taluka)
+        return PrincipalProfile.objects.filter(school__taluka=self.request.role.taluka)
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        kwargs['taluka'] = beo_profile.taluka
+        kwargs['taluka'] = self.request.role.taluka
         return kwargs
     
     def form_valid(self, form):
@@ -474,8 +445,7 @@ class ManagePrincipalDeleteView(LoginRequiredMixin, BEORequiredMixin, RoleContex
     success_url = reverse_lazy('manage_principals')
     
     def get_queryset(self):
-        beo_profile = BEOProfile.objects.get(user=self.request.user)
-        return PrincipalProfile.objects.filter(school__taluka=beo_profile.taluka)
+        return PrincipalProfile.objects.filter(school__taluka=self.request.role.taluka)
     
     def delete(self, request, *args, **kwargs):
         principal = self.get_object()
@@ -490,8 +460,7 @@ class ManageStudentListView(LoginRequiredMixin, PrincipalRequiredMixin, RoleCont
     context_object_name = 'students'
     
     def get_queryset(self):
-        principal_profile = PrincipalProfile.objects.get(user=self.request.user)
-        return Student.objects.filter(school=principal_profile.school)
+        return Student.objects.filter(school=self.request.role.school)
 
 class ManageStudentCreateView(LoginRequiredMixin, PrincipalRequiredMixin, RoleContextMixin, CreateView):
     model = Student
@@ -500,10 +469,12 @@ class ManageStudentCreateView(LoginRequiredMixin, PrincipalRequiredMixin, RoleCo
     success_url = reverse_lazy('manage_students')
     
     def form_valid(self, form):
-        principal_profile = PrincipalProfile.objects.get(user=self.request.user)
-        form.instance.school = principal_profile.school
+        form.instance.school = self.request.role.school
         messages.success(self.request, 'Student created successfully.')
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            refresh_progress(school=self.request.role.school)
+        return response
 
 class ManageStudentUpdateView(LoginRequiredMixin, PrincipalRequiredMixin, RoleContextMixin, UpdateView):
     model = Student
@@ -512,12 +483,15 @@ class ManageStudentUpdateView(LoginRequiredMixin, PrincipalRequiredMixin, RoleCo
     success_url = reverse_lazy('manage_students')
     
     def get_queryset(self):
-        principal_profile = PrincipalProfile.objects.get(user=self.request.user)
-        return Student.objects.filter(school=principal_profile.school)
+        return Student.objects.filter(school=self.request.role.school)
     
     def form_valid(self, form):
         messages.success(self.request, 'Student updated successfully.')
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            # Standard may have changed, so refresh every standard of the school
+            refresh_progress(school=self.object.school)
+        return response
 
 class ManageStudentDeleteView(LoginRequiredMixin, PrincipalRequiredMixin, RoleContextMixin, DeleteView):
     model = Student
@@ -525,8 +499,14 @@ class ManageStudentDeleteView(LoginRequiredMixin, PrincipalRequiredMixin, RoleCo
     success_url = reverse_lazy('manage_students')
     
     def get_queryset(self):
-        principal_profile = PrincipalProfile.objects.get(user=self.request.user)
-        return Student.objects.filter(school=principal_profile.school)
+        return Student.objects.filter(school=self.request.role.school)
+    
+    def form_valid(self, form):
+        school = self.object.school
+        with transaction.atomic():
+            response = super().form_valid(form)
+            refresh_progress(school=school, standard=self.object.standard)
+        return response
     
     def delete(self, request, *args, **kwargs):
         messages.success(request, 'Student deleted successfully.')
@@ -543,62 +523,67 @@ class EvaluateAssignmentView(LoginRequiredMixin, PrincipalRequiredMixin, RoleCon
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         assignment = get_object_or_404(Assignment, pk=kwargs['pk'])
-        principal_profile = PrincipalProfile.objects.get(user=self.request.user)
         students = Student.objects.filter(
-            school=principal_profile.school,
+            school=self.request.role.school,
             standard=assignment.standard
         )
         
         context['assignment'] = assignment
         context['students'] = students
         context['tasks'] = assignment.tasks
-        
-        # Get existing evaluations
-        evaluations = {}
-        for student in students:
-            evaluations[student.id] = {}
-            for i in range(len(assignment.tasks)):
-                try:
-                    eval_obj = TaskEvaluation.objects.get(
-                        student=student,
-                        assignment=assignment,
-                        task_index=i
-                    )
-                    evaluations[student.id][i] = eval_obj.status
-                except TaskEvaluation.DoesNotExist:
-                    evaluations[student.id][i] = 'unsolved'
-        
-        context['evaluations'] = evaluations
+        context['rows'] = evaluation_grid(assignment, students)
         return context
     
     def post(self, request, *args, **kwargs):
         assignment = get_object_or_404(Assignment, pk=kwargs['pk'])
-        principal_profile = PrincipalProfile.objects.get(user=request.user)
         students = Student.objects.filter(
-            school=principal_profile.school,
+            school=request.role.school,
             standard=assignment.standard
         )
         
-        with transaction.atomic():
-            for student in students:
-                for i in range(len(assignment.tasks)):
-                    field_name = f'student_{student.id}_task_{i}'
-                    status = request.POST.get(field_name, 'unsolved')
-                    
-                    TaskEvaluation.objects.update_or_create(
-                        student=student,
-                        assignment=assignment,
-                        task_index=i,
-                        defaults={
-                            'status': status,
-                            'evaluated_by': request.user
-                        }
-                    )
+        # Unchecked cells are saved as unsolved, as before
+        cells = {}
+        for student_id in students.values_list('id', flat=True):
+            for i in range(len(assignment.tasks)):
+                cells[(student_id, i)] = request.POST.get(f'student_{student_id}_task_{i}', 'unsolved')
         
-        messages.success(request, 'Assignment evaluation updated successfully.')
+        try:
+            changed = save_evaluations(assignment, request.role.school, cells, request.user)
+        except ValueError as e:
+            messages.error(request, f'Evaluation not saved: {e}')
+            return redirect('evaluate_assignment', pk=assignment.pk)
+        
+        messages.success(request, f'Assignment evaluation updated successfully ({changed} cells changed).')
         return redirect('evaluate_assignment', pk=assignment.pk)
     
 
+class EvaluateAssignmentCellsView(LoginRequiredMixin, PrincipalRequiredMixin, View):
+    """Save a batch of edited grid cells sent as JSON by the grading page.
+
+    Expects {"cells": [{"student_id": 1, "task_index": 0, "status": "solved"}, ...]}
+    and answers {"changed": <number of rows written>}.
+    """
+    
+    def post(self, request, *args, **kwargs):
+        assignment = get_object_or_404(Assignment, pk=kwargs['pk'])
+        
+        try:
+            payload = json.loads(request.body)
+            cells = {
+                (int(cell['student_id']), int(cell['task_index'])): cell['status']
+                for cell in payload['cells']
+            }
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'error': 'Expected a JSON list of cells'}, status=400)
+        
+        try:
+            changed = save_evaluations(assignment, request.role.school, cells, request.user)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        return JsonResponse({'changed': changed})
+    
+
 class PasswordChangeView(LoginRequiredMixin, RoleContextMixin, TemplateView):
     template_name = 'core/password_change.html'
     
@@ -620,171 +605,162 @@ class PasswordChangeView(LoginRequiredMixin, RoleContextMixin, TemplateView):
             context['form'] = form
             return self.render_to_response(context)
 
-class GenerateReportView(LoginRequiredMixin, RoleContextMixin, TemplateView):
+class ReportScopeMixin:
+    def get_scope(self, form):
+        """StatisticsScope for the user's role narrowed by the report filters"""
+        filters = {}
+        if form.is_valid():
+            filters = {
+                key: form.cleaned_data[key]
+                for key in ('standard', 'taluka', 'school', 'subject', 'assignment', 'start_date', 'end_date')
+            }
+        return StatisticsScope.for_role(self.request.role, **filters)
+
+class GenerateReportView(LoginRequiredMixin, ReportScopeMixin, RoleContextMixin, TemplateView):
     template_name = 'core/reports/report_generator.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['form'] = ReportFilterForm(user=self.request.user)
+        context['form'] = ReportFilterForm(role=self.request.role)
         return context
     
     def post(self, request, *args, **kwargs):
         if 'download' in request.POST:
-            return self.generate_excel_report(request)
+            return self.generate_report(request)
+        if 'show_summary' in request.POST:
+            form = ReportFilterForm(request.POST, role=request.role)
+            context = self.get_context_data(**kwargs)
+            context['form'] = form
+            context['statistics'] = task_statistics(self.get_scope(form))
+            return self.render_to_response(context)
         return self.get(request, *args, **kwargs)
     
-    def generate_excel_report(self, request):
-        form = ReportFilterForm(request.POST, user=request.user)
-        
-        # Get filtered data
-        students = Student.objects.all()
-        
-        # Apply user-specific filters
-        user = request.user
-        if user.groups.filter(name='Principal').exists():
-            principal_profile = PrincipalProfile.objects.get(user=user)
-            students = students.filter(school=principal_profile.school)
-        elif user.groups.filter(name='BEO').exists():
-            beo_profile = BEOProfile.objects.get(user=user)
-            students = students.filter(school__taluka=beo_profile.taluka)
-        elif user.groups.filter(name='DDPI').exists():
-            ddpi_profile = DDPIProfile.objects.get(user=user)
-            students = students.filter(school__taluka__district=ddpi_profile.district)
-        
-        # Apply form filters
-        if form.is_valid():
-            if form.cleaned_data['standard']:
-                students = students.filter(standard=form.cleaned_data['standard'])
-            if form.cleaned_data['school']:
-                students = students.filter(school=form.cleaned_data['school'])
-            if form.cleaned_data['taluka']:
-                students = students.filter(school__taluka=form.cleaned_data['taluka'])
+    def generate_report(self, request):
+        form = ReportFilterForm(request.POST, role=request.role)
         
-        # Get assignment data
-        assignment = None
-        if form.is_valid() and form.cleaned_data['assignment']:
-            assignment = form.cleaned_data['assignment']
-            students = students.filter(standard=assignment.standard)
-        
-        # Create Excel workbook
-        wb = Workbook()
-        
-        if assignment:
-            # Single assignment selected - create one worksheet
-            ws = wb.active
-            ws.title = f"{assignment.title[:20]}..."[:31] if len(assignment.title) > 20 else assignment.title
-            self._create_assignment_worksheet(ws, students.filter(standard=assignment.standard), assignment)
-        else:
-            # No assignment selected - create worksheets for all assignments
-            wb.remove(wb.active)  # Remove default sheet
-            
-            # Get all assignments filtered by user permissions and form filters
-            assignments = Assignment.objects.all()
-            
-            # Apply user-specific filters to assignments (filter by standards available in user's scope)
-            available_standards = set()
-            if user.groups.filter(name='Principal').exists():
-                principal_profile = PrincipalProfile.objects.get(user=user)
-                school_students = Student.objects.filter(school=principal_profile.school)
-                available_standards = set(school_students.values_list('standard', flat=True).distinct())
-            elif user.groups.filter(name='BEO').exists():
-                beo_profile = BEOProfile.objects.get(user=user)
-                taluka_students = Student.objects.filter(school__taluka=beo_profile.taluka)
-                available_standards = set(taluka_students.values_list('standard', flat=True).distinct())
-            elif user.groups.filter(name='DDPI').exists():
-                ddpi_profile = DDPIProfile.objects.get(user=user)
-                district_students = Student.objects.filter(school__taluka__district=ddpi_profile.district)
-                available_standards = set(district_students.values_list('standard', flat=True).distinct())
-            
-            if available_standards:
-                assignments = assignments.filter(standard__in=available_standards)
-            
-            # Apply additional form filters to assignments
-            if form.is_valid():
-                if form.cleaned_data['standard']:
-                    assignments = assignments.filter(standard=form.cleaned_data['standard'])
-                if form.cleaned_data['subject']:
-                    assignments = assignments.filter(subject=form.cleaned_data['subject'])
-                if form.cleaned_data['start_date']:
-                    assignments = assignments.filter(start_date__gte=form.cleaned_data['start_date'])
-                if form.cleaned_data['end_date']:
-                    assignments = assignments.filter(end_date__lte=form.cleaned_data['end_date'])
-            
-            assignments = assignments.distinct().order_by('standard', 'subject__name', 'title')
-            
-            if not assignments.exists():
-                # Create a default worksheet if no assignments found
-                ws = wb.create_sheet("No Assignments Found")
-                ws.cell(row=1, column=1, value="No assignments found matching the selected criteria.")
-            else:
-                for assignment in assignments:
-                    # Create worksheet name (max 31 chars for Excel)
-                    sheet_name = f"Class{assignment.standard}-{assignment.subject.name[:10]}-{assignment.title[:10]}"
-                    if len(sheet_name) > 31:
-                        sheet_name = sheet_name[:31]
-                    
-                    ws = wb.create_sheet(sheet_name)
-                    assignment_students = students.filter(standard=assignment.standard)
-                    self._create_assignment_worksheet(ws, assignment_students, assignment)
+        # Role scoping and form filters are applied as joins by the scope
+        scope = self.get_scope(form)
+        report_format = (form.cleaned_data.get('format') if form.is_valid() else None) or 'xlsx'
+        summary = form.cleaned_data.get('summary', '') if form.is_valid() else ''
+        content_type, extension = REPORT_FORMATS[report_format]
         
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"student_report_{timestamp}.xlsx"
+        filename = f"student_report_{timestamp}.{extension}"
         
-        # Create HTTP response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if report_format == 'csv':
+            # Rows are sent as they are read, nothing is buffered
+            response = StreamingHttpResponse(cache_csv_stream(scope), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
         
-        wb.save(response)
-        return response
+        # Spooled to a temporary file and streamed back in chunks; the file is
+        # removed when the response closes it
+        report = tempfile.TemporaryFile(suffix=f'.{extension}')
+        cached_report(scope, report_format, report, summary)
+        report.seek(0)
+        
+        return FileResponse(report, as_attachment=True, filename=filename, content_type=content_type)
+
+
+class ReportJobMixin:
+    """Looks up a report job the signed-in user's role is allowed to read"""
+    
+    def get_job(self):
+        job = get_object_or_404(ReportJob, pk=self.kwargs['pk'])
+        # Jobs always carry the district/taluka/school of the role that queued them
+        role_scope = StatisticsScope.for_role(self.request.role).to_parameters()
+        if not role_scope.items() <= job.parameters.items():
+            raise PermissionDenied("This report belongs to another scope.")
+        return job
+    
+    def job_data(self, job):
+        data = {
+            'id': job.pk,
+            'status': job.status,
+            'error': job.error,
+            'status_url': reverse('report_job_status', args=[job.pk]),
+        }
+        if job.status == ReportJob.DONE:
+            data['download_url'] = reverse('report_job_download', args=[job.pk])
+        return data
+
+
+class ReportJobCreateView(LoginRequiredMixin, ReportScopeMixin, ReportJobMixin, View):
+    """Queue a report for the posted ReportFilterForm filters (or reuse an identical one)"""
     
-    def _create_assignment_worksheet(self, ws, students, assignment):
-        """Helper method to create a worksheet for a specific assignment"""
-        # Headers
-        headers = ['Student Name', 'STS Number', 'Gender', 'Class', 'School', 'Taluka']
+    def post(self, request, *args, **kwargs):
+        form = ReportFilterForm(request.POST, role=request.role)
+        if not form.is_valid():
+            return JsonResponse({'error': 'Invalid filters', 'errors': form.errors}, status=400)
         
-        for i, task in enumerate(assignment.tasks):
-            headers.append(f'Task {i+1}: {task[:30]}...' if len(task) > 30 else f'Task {i+1}: {task}')
+        job = enqueue_report(
+            self.get_scope(form), request.user, form.cleaned_data['format'] or 'xlsx', form.cleaned_data['summary']
+        )
+        return JsonResponse(self.job_data(job), status=202)
+
+
+class ReportJobStatusView(LoginRequiredMixin, ReportJobMixin, View):
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.job_data(self.get_job()))
+
+
+class ReportJobDownloadView(LoginRequiredMixin, ReportJobMixin, View):
+    def get(self, request, *args, **kwargs):
+        job = self.get_job()
+        if job.status != ReportJob.DONE:
+            return JsonResponse({'error': 'Report is not ready'}, status=409)
         
-        # Apply header styling
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.file.name),
+            content_type=REPORT_FORMATS[job.format][0],
+        )
+
+
+class ChoiceSearchView(LoginRequiredMixin, View):
+    """Paginated JSON search over the role-scoped choices of a SearchSelect field.
+    
+    Choices come from the ReportFilterForm field querysets for the user's
+    role, the same querysets that validate a submitted value, so search
+    results and validation can't disagree about the scope.
+    """
+    PAGE_SIZE = 20
+    # kind: (ReportFilterForm field, lookups matched against ?q=, narrowing parameters, ordering)
+    SEARCHES = {
+        'schools': ('school', ['name__icontains', 'udise_code__startswith'], ['taluka'], ['name', 'pk']),
+        'assignments': ('assignment', ['title__icontains'], ['standard', 'subject'], ['title', 'pk']),
+    }
+    
+    def get(self, request, kind, *args, **kwargs):
+        if kind not in self.SEARCHES:
+            raise Http404("Unknown choice search.")
+        field_name, lookups, narrowing, ordering = self.SEARCHES[kind]
+        field = ReportFilterForm(role=request.role).fields[field_name]
+        choices = field.queryset
         
-        # Data rows
-        for row, student in enumerate(students, 2):
-            ws.cell(row=row, column=1, value=student.name)
-            ws.cell(row=row, column=2, value=student.sts_number)
-            ws.cell(row=row, column=3, value=student.get_gender_display())
-            ws.cell(row=row, column=4, value=f'Class {student.standard}')
-            ws.cell(row=row, column=5, value=student.school.name)
-            ws.cell(row=row, column=6, value=student.school.taluka.name)
-            
-            for i, task in enumerate(assignment.tasks):
-                try:
-                    evaluation = TaskEvaluation.objects.get(
-                        student=student,
-                        assignment=assignment,
-                        task_index=i
-                    )
-                    status = evaluation.status.upper()
-                except TaskEvaluation.DoesNotExist:
-                    status = 'UNSOLVED'
-                
-                ws.cell(row=row, column=7+i, value=status)
+        term = request.GET.get('q', '').strip()
+        if term:
+            match = Q()
+            for lookup in lookups:
+                match |= Q(**{lookup: term})
+            choices = choices.filter(match)
+        for name in narrowing:
+            value = request.GET.get(name)
+            if value:
+                if not value.isdigit():
+                    return JsonResponse({'error': f'{name} must be a number'}, status=400)
+                choices = choices.filter(**{name: value})
         
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
\ No newline at end of file
+        try:
+            page = max(int(request.GET.get('page') or 1), 1)
+        except ValueError:
+            return JsonResponse({'error': 'page must be a number'}, status=400)
+        offset = (page - 1) * self.PAGE_SIZE
+        # One extra row tells whether there is a next page without a COUNT
+        rows = list(choices.order_by(*ordering)[offset:offset + self.PAGE_SIZE + 1])
+        return JsonResponse({
+            'results': [{'id': obj.pk, 'text': field.label_from_instance(obj)} for obj in rows[:self.PAGE_SIZE]],
+            'more': len(rows) > self.PAGE_SIZE,
+        })
@@ -0,0 +1,18 @@
+# core/workers.py
+# Initializer of the spawned process pools. The pool unpickles it before Django
+# is set up, so this module must not import the models.
+import django
+from django.conf import settings
+from django.db import connections
+
+
+def database_names():
+    """Names of the databases this process uses (the test databases under test)"""
+    return {alias: connections[alias].settings_dict['NAME'] for alias in connections}
+
+
+def setup_worker(names):
+    """Point a spawned worker at the parent's databases, then set up Django"""
+    for alias, name in names.items():
+        settings.DATABASES[alias]['NAME'] = name
+    django.setup()
@@ -27,6 +27,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,9 +56,42 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than in-memory, so report worker processes can open it too
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Cache used for dashboard statistics. LocMemCache is per process, so point
+# CACHE_BACKEND at a shared backend (e.g. DatabaseCache) to share entries and
+# hit/miss counters between workers and management commands.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'prerane-cache'),
+    },
+    # Generated report files (their data versions and sizes are in the database)
+    'reports': {
+        'BACKEND': os.environ.get('REPORT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('REPORT_CACHE_LOCATION', 'prerane-reports'),
+    },
+}
+
+# Fallback expiry (seconds) for cached dashboard statistics; writes evict earlier
+DASHBOARD_STATS_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_STATS_CACHE_TIMEOUT', 300))
+
+# Finished report jobs are handed out again for identical filters within this window (seconds)
+REPORT_JOB_REUSE_SECONDS = int(os.environ.get('REPORT_JOB_REUSE_SECONDS', 600))
+
+# Report cache budget: least recently used reports are evicted beyond MAX_BYTES
+# and reports larger than MAX_ENTRY_BYTES are never cached. Kept small, as a
+# LocMemCache holds its reports in the memory of every process.
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+REPORT_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('REPORT_CACHE_MAX_ENTRY_BYTES', 10 * 1024 * 1024))
+REPORT_CACHE_TIMEOUT = int(os.environ.get('REPORT_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Processes preparing the worksheets of multi-assignment Excel reports (1 = serial)
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 1))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -82,6 +116,10 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Generated report files; served through the report job download view, not MEDIA_URL
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'
@@ -34,6 +34,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +86,38 @@ DATABASES = {
     'default': get_database_config()
 }
 
+# Cache used for dashboard statistics. Shared through the database so entries,
+# evictions and hit/miss counters are the same for every instance, worker and
+# management command; create its table with `manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'prerane_cache'),
+    },
+    # Generated report files, shared like the statistics and kept out of the
+    # processes' memory; REPORT_CACHE_MAX_BYTES rather than MAX_ENTRIES bounds it
+    'reports': {
+        'BACKEND': os.environ.get('REPORT_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('REPORT_CACHE_LOCATION', 'prerane_report_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Fallback expiry (seconds) for cached dashboard statistics; writes evict earlier
+DASHBOARD_STATS_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_STATS_CACHE_TIMEOUT', 300))
+
+# Finished report jobs are handed out again for identical filters within this window (seconds)
+REPORT_JOB_REUSE_SECONDS = int(os.environ.get('REPORT_JOB_REUSE_SECONDS', 600))
+
+# Report cache budget, shared by all processes: least recently used reports are
+# evicted beyond MAX_BYTES and reports larger than MAX_ENTRY_BYTES are never cached
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+REPORT_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('REPORT_CACHE_MAX_ENTRY_BYTES', 10 * 1024 * 1024))
+REPORT_CACHE_TIMEOUT = int(os.environ.get('REPORT_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Processes preparing the worksheets of multi-assignment Excel reports (1 = serial)
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 1))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -109,6 +142,10 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Generated report files; served through the report job download view, not MEDIA_URL
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
 # Whitenoise static files configuration
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
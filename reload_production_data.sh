@@ -47,6 +47,7 @@ echo "   • Multiple Talukas"
 echo "   • Schools from school_list.xlsx"
 echo "   • Students from student_list.xlsx"
 echo "   • User accounts (DDPI, BEOs, Principals)"
+echo "   • Task progress rollup (check with: python manage.py rebuild_task_progress --check)"
 echo ""
 echo "🔑 Login credentials:"
 echo "   • Superuser: superadmin / wrecK_567*"